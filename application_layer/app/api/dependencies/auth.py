@@ -0,0 +1,60 @@
+# api/dependencies/auth.py
+
+from core.config.settings import settings
+from core.services.user_service import UserService
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from schemas.user import UserResponse
+from utils.cache import TTLCache
+from utils.security import decode_access_token
+
+bearer_scheme = HTTPBearer(auto_error=False)
+user_service = UserService()
+
+# Shared by every router, so a caller's record is read from Firestore at most
+# once per TTL no matter which endpoints they hit
+user_cache = TTLCache(
+    ttl=settings.USER_CACHE_TTL_SECONDS, max_size=settings.USER_CACHE_SIZE
+)
+
+
+def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+) -> UserResponse:
+    """
+    Resolve the authenticated caller from the bearer token.
+
+    FastAPI evaluates this once per request even when several dependencies
+    ask for it, and the user record itself comes from the shared cache. The
+    caller's ID is left in `request.state.actor` for the audit trail.
+    """
+    unauthorized = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if credentials is None:
+        raise unauthorized
+
+    claims = decode_access_token(credentials.credentials)
+    if not claims or not claims.get("sub"):
+        raise unauthorized
+
+    user_id = str(claims["sub"])
+    user = user_cache.get(user_id)
+    if user is None:
+        try:
+            user = user_service.get_user_by_id(user_id)
+        except HTTPException as exc:
+            if exc.status_code == status.HTTP_404_NOT_FOUND:
+                raise unauthorized
+            raise
+        user_cache.set(user_id, user)
+    request.state.actor = user_id
+    return user
+
+
+def invalidate_user(user_id: str):
+    """Drop a cached user record after it changes."""
+    user_cache.invalidate(str(user_id))
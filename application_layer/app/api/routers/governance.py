@@ -1,60 +1,109 @@
-# from fastapi import APIRouter, HTTPException, status, Depends
-# from typing import List
-# from core.services.goverenance_service import GovernanceService
-# from schemas.governance import (
-#     ProposalCreate,
-#     ProposalResponse,
-#     VoteCreate,
-#     VoteResponse,
-# )
-
-# router = APIRouter()
-
-
-# # Dependency injection for governance service
-# def get_governance_service():
-#     return GovernanceService()
-
-
-# @router.post(
-#     "/proposals", response_model=ProposalResponse, status_code=status.HTTP_201_CREATED
-# )
-# async def create_proposal(
-#     proposal: ProposalCreate,
-#     service: GovernanceService = Depends(get_governance_service),
-# ):
-#     """
-#     Submit a new governance proposal.
-#     """
-#     new_proposal = service.create_proposal(proposal)
-#     if new_proposal is None:
-#         raise HTTPException(
-#             status_code=status.HTTP_400_BAD_REQUEST, detail="Error creating proposal"
-#         )
-#     return new_proposal
-
-
-# @router.get("/proposals", response_model=List[ProposalResponse])
-# async def list_proposals(service: GovernanceService = Depends(get_governance_service)):
-#     """
-#     Retrieve a list of governance proposals.
-#     """
-#     proposals = service.get_all_proposals()
-#     return proposals
-
-
-# @router.post("/proposals/{proposal_id}/votes", response_model=VoteResponse)
-# async def vote_on_proposal(
-#     proposal_id: int,
-#     vote: VoteCreate,
-#     service: GovernanceService = Depends(get_governance_service),
-# ):
-#     """
-#     Cast a vote on a governance proposal.
-#     """
-#     new_vote = service.vote_on_proposal(proposal_id, vote)
-#     if new_vote is None:
-#         raise HTTPException(
-#             status_code=404, detail="Proposal not found or error casting vote"
-#         )
-#     return new_vote
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+from api.dependencies.auth import get_current_user
+from core.services.goverenance_service import GovernanceService
+from schemas.governance import (
+    ProposalCreate,
+    ProposalResponse,
+    SnapshotResponse,
+    TallyResponse,
+    VoteCreate,
+    VoteResponse,
+    WeightedTallyResponse,
+)
+from schemas.user import UserResponse
+
+router = APIRouter()
+
+# Shared so each request reuses one Firestore client
+governance_service = GovernanceService()
+
+
+@router.post(
+    "/proposals", response_model=ProposalResponse, status_code=status.HTTP_201_CREATED
+)
+def create_proposal(
+    proposal: ProposalCreate, current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Submit a new governance proposal on behalf of the caller.
+    """
+    new_proposal = governance_service.create_proposal(proposal, current_user.id)
+    if new_proposal is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Error creating proposal"
+        )
+    return new_proposal
+
+
+@router.get("/proposals", response_model=List[ProposalResponse])
+def list_proposals():
+    """
+    Retrieve a list of governance proposals.
+    """
+    proposals = governance_service.get_all_proposals()
+    return proposals
+
+
+@router.get("/proposals/{proposal_id}", response_model=ProposalResponse)
+def get_proposal(proposal_id: str):
+    """
+    Retrieve a governance proposal by its ID.
+    """
+    proposal = governance_service.get_proposal_by_id(proposal_id)
+    if proposal is None:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    return proposal
+
+
+@router.post("/proposals/{proposal_id}/votes", response_model=VoteResponse)
+def vote_on_proposal(
+    proposal_id: str, vote: VoteCreate, current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Cast the caller's vote on a governance proposal. Each voter has one vote
+    per proposal; voting again replaces it.
+    """
+    new_vote = governance_service.vote_on_proposal(proposal_id, current_user.id, vote)
+    if new_vote is None:
+        raise HTTPException(
+            status_code=404, detail="Proposal not found or error casting vote"
+        )
+    return new_vote
+
+
+@router.get("/proposals/{proposal_id}/tally", response_model=TallyResponse)
+def get_tally(proposal_id: str):
+    """
+    Retrieve the current vote counts for a proposal.
+    """
+    tally = governance_service.get_tally(proposal_id)
+    if tally is None:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    return tally
+
+
+@router.post("/proposals/{proposal_id}/snapshot", response_model=SnapshotResponse)
+def create_snapshot(proposal_id: str, current_user: UserResponse = Depends(get_current_user)):
+    """
+    Capture the token balances of every user with a verified wallet and open
+    a token-weighted proposal for voting. Only the proposal's creator or a
+    governance admin may take it, and only while the proposal is Pending, so
+    it is taken once and before any vote; weighted tallies always use these
+    balances.
+    """
+    new_snapshot = governance_service.create_snapshot(proposal_id, current_user.id)
+    if new_snapshot is None:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    return new_snapshot
+
+
+@router.get("/proposals/{proposal_id}/tally/weighted", response_model=WeightedTallyResponse)
+def get_weighted_tally(proposal_id: str):
+    """
+    Retrieve vote totals weighted by each voter's snapshot token balance.
+    """
+    tally = governance_service.get_weighted_tally(proposal_id)
+    if tally is None:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    return tally
@@ -1,30 +1,168 @@
-from typing import List
+from datetime import datetime
+from typing import Optional
 
+from api.dependencies.auth import get_current_user
+from core.services.order_book import MatchingEngine
+from core.services.trade_analytics import trade_analytics
 from core.services.trade_service import TradeService
-from fastapi import APIRouter, Depends, HTTPException, status
-from schemas.trade import TradeCreate, TradeResponse, TradeUpdate
+from core.services.trade_summary import participants
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from schemas.trade import (
+    AssetStats,
+    BookSnapshot,
+    OrderCreate,
+    OrderResponse,
+    TradeCreate,
+    TradePage,
+    TradeResponse,
+    TradeStats,
+    TradeSummary,
+    TradeUpdate,
+)
+from schemas.user import UserResponse
 
 router = APIRouter()
 
+
+def check_acting_user(user_id: str, current_user: UserResponse):
+    """Writes may only be made on behalf of the authenticated caller."""
+    if str(user_id) != str(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to trade on behalf of another user",
+        )
+
+
+def check_own_history(user_id: str, current_user: UserResponse):
+    """Trade history is only visible to the user it belongs to."""
+    if str(user_id) != str(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to view another user's trades",
+        )
+
+
+def check_trade_participant(trade_id: str, current_user: UserResponse):
+    """Trades may only be changed by a user they belong to."""
+    trade = trade_service.get_trade_by_id(trade_id)
+    if str(current_user.id) not in participants(trade.dict()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to change another user's trade",
+        )
+
 trade_service = TradeService()
+matching_engine = MatchingEngine()
+
+
+@router.on_event("startup")
+def load_trade_stats():
+    """Seed the rolling statistics from trades already in the window."""
+    trade_service.backfill_analytics()
 
 
 @router.post("/", response_model=TradeResponse)
-async def create_trade(trade: TradeCreate):
+def create_trade(trade: TradeCreate, current_user: UserResponse = Depends(get_current_user)):
     """
     Create a new trade record for a robotic asset.
+
+    Runs in the threadpool: the call waits for the trade ledger's fsync, and
+    concurrent requests share one.
     """
+    check_acting_user(trade.user_id, current_user)
     new_trade = trade_service.create_trade(trade)
     return new_trade
 
 
-@router.get("/", response_model=List[TradeResponse])
-async def list_trades(service: TradeService = Depends()):
+@router.post("/orders", response_model=OrderResponse)
+def place_order(order: OrderCreate, current_user: UserResponse = Depends(get_current_user)):
+    """
+    Place a limit or market order on an asset's order book.
+
+    Matching follows price-time priority; each fill is recorded as a trade
+    before the order is accepted, and the order is rejected with 503 if they
+    cannot be. An order never matches the same user's resting orders; its
+    remainder is cancelled instead.
+    """
+    check_acting_user(order.user_id, current_user)
+    return matching_engine.submit(
+        order, record=lambda fills: trade_service.record_fills(order, fills)
+    )
+
+
+@router.delete("/orders/{order_id}", response_model=OrderResponse)
+async def cancel_order(order_id: str, current_user: UserResponse = Depends(get_current_user)):
+    """
+    Cancel one of the caller's resting orders.
+    """
+    try:
+        cancelled = matching_engine.cancel(order_id, user_id=str(current_user.id))
+    except PermissionError:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to cancel another user's order",
+        )
+    if not cancelled:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return cancelled
+
+
+@router.get("/book/{asset_id}", response_model=BookSnapshot)
+async def get_order_book(asset_id: str, depth: int = 20):
+    """
+    Retrieve the best `depth` price levels on each side of an asset's book.
+    """
+    snapshot = matching_engine.snapshot(asset_id, depth)
+    if snapshot is None:
+        return BookSnapshot(asset_id=asset_id, bids=[], asks=[])
+    return snapshot
+
+
+@router.get("/stats", response_model=TradeStats)
+async def get_trade_stats():
+    """
+    Retrieve marketplace volume, VWAP and trending assets over the rolling window.
+    """
+    return trade_analytics.stats()
+
+
+@router.get("/stats/{asset_id}", response_model=AssetStats)
+async def get_asset_stats(asset_id: str):
+    """
+    Retrieve rolling-window volume and VWAP for one robot or software asset.
+    """
+    return trade_analytics.asset_stats(asset_id)
+
+
+@router.get("/", response_model=TradePage)
+def list_trades(
+    user_id: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    trade_status: Optional[str] = Query(None, alias="status"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: UserResponse = Depends(get_current_user),
+):
+    """
+    Retrieve the caller's trade records (as creator, buyer or seller), newest
+    first, optionally for a date range and a status. `user_id` defaults to the
+    caller and may not name anyone else.
+
+    Results are paginated; pass the returned `next_cursor` to get the next page.
+    """
+    user_id = user_id or str(current_user.id)
+    check_own_history(user_id, current_user)
+    return trade_service.query_trades(user_id, start, end, trade_status, limit, cursor)
+
+
+@router.get("/summary/{user_id}", response_model=TradeSummary)
+def get_trade_summary(user_id: str, current_user: UserResponse = Depends(get_current_user)):
     """
-    Retrieve a list of all trade records.
+    Retrieve the caller's trade totals and most recent trades in a single read.
     """
-    trades = trade_service.list_all_trades()
-    return trades
+    check_own_history(user_id, current_user)
+    return trade_service.get_trade_summary(user_id)
 
 
 @router.get("/{trade_id}", response_model=TradeResponse)
@@ -39,10 +177,13 @@ async def retrieve_trade(trade_id: str):
 
 
 @router.put("/{trade_id}", response_model=TradeResponse)
-async def update_trade(trade_id: str, trade: TradeUpdate):
+def update_trade(
+    trade_id: str, trade: TradeUpdate, current_user: UserResponse = Depends(get_current_user)
+):
     """
     Update a specific trade record.
     """
+    check_trade_participant(trade_id, current_user)
     updated_trade = trade_service.update_trade(trade_id, trade)
     if not updated_trade:
         raise HTTPException(status_code=404, detail="Trade not found")
@@ -50,10 +191,11 @@ async def update_trade(trade_id: str, trade: TradeUpdate):
 
 
 @router.delete("/{trade_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_trade(trade_id: str):
+def delete_trade(trade_id: str, current_user: UserResponse = Depends(get_current_user)):
     """
     Delete a specific trade record by its ID.
     """
+    check_trade_participant(trade_id, current_user)
     deleted = trade_service.delete_trade(trade_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Trade not found")
@@ -1,10 +1,25 @@
-from core.services.user_service import UserService
-from fastapi import APIRouter, Depends, HTTPException, status
-from schemas.user import UserCreate, UserResponse, UserUpdate
+from datetime import datetime, timezone
+from typing import Union
 
-router = APIRouter()
+from api.dependencies.auth import get_current_user, invalidate_user, user_service
+from core.services.password_service import password_hasher
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from schemas.user import (
+    WALLET_ADDRESS_PATTERN,
+    Token,
+    UserCreate,
+    UserLogin,
+    UserPublic,
+    UserResponse,
+    UserUpdate,
+    WalletChallenge,
+    WalletProof,
+)
+from utils.security import create_access_token
+from utils.wallet import ownership_message, verify_ownership
 
-user_service = UserService()
+router = APIRouter()
 
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -12,7 +27,8 @@ async def create_user(new_user_data: UserCreate):
     """
     Create a new user account.
     """
-    new_user = user_service.create_user(new_user_data)
+    hashed_password = await password_hasher.hash(new_user_data.password)
+    new_user = await run_in_threadpool(user_service.create_user, new_user_data, hashed_password)
     if not new_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Error creating user"
@@ -20,34 +36,106 @@ async def create_user(new_user_data: UserCreate):
     return new_user
 
 
-@router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int):
+@router.post("/login", response_model=Token)
+async def login(credentials: UserLogin):
+    """
+    Exchange a username and password for an access token.
+
+    Firestore calls run in the threadpool and hashing in the process pool,
+    so a login burst never blocks the event loop.
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Incorrect username or password",
+    )
+    record = await run_in_threadpool(user_service.get_user_record_by_username, credentials.username)
+    if not record or not record.get("hashed_password"):
+        raise invalid
+    valid, new_hash = await password_hasher.verify(
+        credentials.password, record["hashed_password"]
+    )
+    if not valid:
+        raise invalid
+    if new_hash:
+        # Stored hash used outdated cost parameters
+        await run_in_threadpool(user_service.update_password_hash, record["id"], new_hash)
+    return Token(access_token=create_access_token({"sub": record["id"]}))
+
+
+@router.get("/me", response_model=UserResponse)
+async def get_me(current_user: UserResponse = Depends(get_current_user)):
+    """
+    Retrieve the authenticated user.
+    """
+    return current_user
+
+
+@router.get("/me/wallet/challenge", response_model=WalletChallenge)
+async def get_wallet_challenge(
+    wallet_address: str = Query(..., regex=WALLET_ADDRESS_PATTERN),
+    current_user: UserResponse = Depends(get_current_user),
+):
+    """
+    Get the message to sign with a wallet to link it to the caller's account.
+    """
+    issued_at = datetime.now(timezone.utc).replace(microsecond=0)
+    return WalletChallenge(
+        wallet_address=wallet_address,
+        issued_at=issued_at,
+        message=ownership_message(str(current_user.id), wallet_address, issued_at),
+    )
+
+
+@router.put("/me/wallet", response_model=UserResponse)
+async def link_wallet(proof: WalletProof, current_user: UserResponse = Depends(get_current_user)):
+    """
+    Link a wallet to the caller's account, proven by the wallet's signature of
+    the challenge message. Only linked wallets back governance votes.
+    """
+    user_id = str(current_user.id)
+    if not verify_ownership(user_id, proof.wallet_address, proof.issued_at, proof.signature):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or expired wallet signature",
+        )
+    user = await run_in_threadpool(user_service.link_wallet, user_id, proof.wallet_address)
+    invalidate_user(user_id)
+    return user
+
+
+@router.get("/{user_id}", response_model=Union[UserResponse, UserPublic])
+async def get_user(user_id: str, current_user: UserResponse = Depends(get_current_user)):
     """
     Retrieve a specific user by their user ID.
+
+    Callers other than the user themselves only get the public profile.
     """
-    user = user_service.get_user_by_id(user_id)
+    if str(current_user.id) == str(user_id):
+        return current_user
+    user = await run_in_threadpool(user_service.get_user_by_id, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
-    return user
+    return UserPublic.from_orm(user)
 
 
 @router.put("/{user_id}", response_model=UserResponse)
 async def update_user(
     user_id: str,
     update_data: UserUpdate,
+    current_user: UserResponse = Depends(get_current_user),
 ):
     """
     Update user details.
     """
-    current_user = user_service.get_user_by_id(user_id)
-    if current_user.id != user_id:
+    if str(current_user.id) != str(user_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not allowed to update this user's information",
         )
-    updated_user = user_service.update_user(user_id, update_data)
+    updated_user = await run_in_threadpool(user_service.update_user, user_id, update_data)
+    invalidate_user(user_id)
     if not updated_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -57,18 +145,19 @@ async def update_user(
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
-    user_id: int,
+    user_id: str,
+    current_user: UserResponse = Depends(get_current_user),
 ):
     """
     Delete a user account.
     """
-    current_user = user_service.get_user_by_id(user_id)
-    if current_user.id != user_id:
+    if str(current_user.id) != str(user_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not allowed to delete this user",
         )
-    success = user_service.delete_user(user_id)
+    success = await run_in_threadpool(user_service.delete_user, user_id)
+    invalidate_user(user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -41,10 +41,64 @@ class Settings(BaseSettings):
     DATABASE_URL: str = "database.db"
     # SECRET_KEY: str = get_secret("database_api_key")
 
+    # Auth tokens. SECRET_KEY signs HS256 tokens; set JWT_JWKS to a JWK Set
+    # (JSON) to verify against rotating keys, with JWT_SIGNING_KID naming the
+    # key used for new tokens. The app refuses to start with neither set.
+    SECRET_KEY: str = ""
+    JWT_JWKS: str | None = None
+    JWT_SIGNING_KID: str = "default"
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    JWT_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 30
+    USER_CACHE_SIZE: int = 10000
+
+    # Password hashing runs in a process pool so it never blocks the event
+    # loop. Requests beyond PASSWORD_HASH_MAX_PENDING are rejected with 503.
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
     # Will add CORS setttings here
     ALLOWED_HOSTS: list = []
     # os.environ.get("ALLOWED_HOSTS").split(",") |
 
+    # Rate limiting (requests per second and burst size). Buckets are kept in
+    # memory unless REDIS_URL is set, in which case instances share them.
+    REDIS_URL: str | None = None
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # Only behind the API gateway
+    RATE_LIMIT_IP_RATE: float = 20
+    RATE_LIMIT_IP_BURST: int = 40
+    RATE_LIMIT_KEY_RATE: float = 50
+    RATE_LIMIT_KEY_BURST: int = 100
+    RATE_LIMIT_TRADES_RATE: float = 5
+    RATE_LIMIT_TRADES_BURST: int = 10
+
+    # Trade ledger. Writes are fsynced in groups every
+    # TRADE_WAL_FSYNC_INTERVAL_MS (0 fsyncs each write) and the state is
+    # snapshotted every TRADE_SNAPSHOT_EVERY records. The directory is locked
+    # by one process, so run a single worker (or one directory per worker).
+    TRADE_WAL_DIR: str = "trade_wal"
+    TRADE_WAL_FSYNC_INTERVAL_MS: float = 5
+    TRADE_SNAPSHOT_EVERY: int = 10000
+    TRADE_REPLICATION_BATCH: int = 500
+
+    # Marketplace statistics cover the last TRADE_STATS_WINDOW_MINUTES and
+    # list the TRADE_STATS_TOP_K most traded assets
+    TRADE_STATS_WINDOW_MINUTES: int = 1440
+    TRADE_STATS_TOP_K: int = 10
+
+    # Per-user trade summary documents, with the most recent trades embedded
+    TRADE_SUMMARIES_ENABLED: bool = True
+    TRADE_SUMMARY_RECENT_SIZE: int = 20
+
+    # Vote counts per proposal are split over this many shard documents so
+    # concurrent votes do not contend on one document
+    GOVERNANCE_TALLY_SHARDS: int = 20
+    # Network holder balances are snapshotted from: MAINNET, DEVNET or TESTNET
+    GOVERNANCE_SOLANA_NETWORK: str = "DEVNET"
+    # Users who may take the balance snapshot of any proposal, besides its creator
+    GOVERNANCE_ADMIN_IDS: list = []
+
     ENVIR = "test" # options: test, stage, production. Changes firestore database
     
     class Config:
@@ -1,56 +1,281 @@
-# # core/services/governance_service.py
-
-# from typing import List, Optional
-# from schemas.governance import (
-#     ProposalCreate,
-#     ProposalResponse,
-#     VoteCreate,
-#     VoteResponse,
-# )
-# from core.models import ProposalModel, VoteModel
-# from core.database.database import SessionLocal
-# from sqlalchemy.orm import Session
-
-
-# class GovernanceService:
-#     """Governance Service"""
-
-#     def __init__(self, db: Session = SessionLocal()):
-#         self.db = db
-
-#     def create_proposal(self, proposal: ProposalCreate) -> ProposalResponse:
-#         """Create Proposal"""
-#         new_proposal = ProposalModel(**proposal.dict())
-#         self.db.add(new_proposal)
-#         self.db.commit()
-#         self.db.refresh(new_proposal)
-#         return ProposalResponse.from_orm(new_proposal)
-
-#     def get_all_proposals(self) -> List[ProposalResponse]:
-#         """Retrieve all proposals"""
-#         proposals = self.db.query(ProposalModel).all()
-#         return [ProposalResponse.from_orm(proposal) for proposal in proposals]
-
-#     def get_proposal_by_id(self, proposal_id: int) -> Optional[ProposalResponse]:
-#         """Retrieve Proposal by ID"""
-#         proposal = (
-#             self.db.query(ProposalModel).filter(ProposalModel.id == proposal_id).first()
-#         )
-#         if proposal:
-#             return ProposalResponse.from_orm(proposal)
-#         return None
-
-#     def vote_on_proposal(self, proposal_id: int, vote: VoteCreate) -> VoteResponse:
-#         """Vote on Proposal"""
-#         proposal = (
-#             self.db.query(ProposalModel).filter(ProposalModel.id == proposal_id).first()
-#         )
-#         if not proposal:
-#             return None  # Proposal not found
-#         new_vote = VoteModel(**vote.dict(), proposal_id=proposal_id)
-#         self.db.add(new_vote)
-#         self.db.commit()
-#         self.db.refresh(new_vote)
-#         return VoteResponse.from_orm(new_vote)
-
-#     # Add service methods i.e. vote updates, deletion, etc.
+# core/services/governance_service.py
+
+import random
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+from google.api_core.exceptions import FailedPrecondition
+
+from core.config.settings import settings
+from core.services.vote_snapshot import SnapshotError, VoteSnapshot, fetch_wallet_balances
+from fastapi import HTTPException, status
+from google.cloud import firestore
+from schemas.governance import (
+    VOTE_CHOICES,
+    ProposalCreate,
+    ProposalResponse,
+    SnapshotResponse,
+    TallyResponse,
+    VoteCreate,
+    VoteResponse,
+    WeightedTallyResponse,
+)
+from utils.cache import TTLCache
+
+# Layout of a proposal in Firestore:
+#   {ENVIR}_proposals/{proposal_id}                      proposal fields
+#   {ENVIR}_proposals/{proposal_id}/votes/{voter_id}     one vote per voter
+#   {ENVIR}_proposals/{proposal_id}/tally_shards/{n}     partial counts per choice
+#   {ENVIR}_proposals/{proposal_id}/snapshot/{n}         holder balances, sorted by voter
+#
+# A vote increments a randomly chosen shard, so concurrent votes on one
+# proposal spread their writes over `tally_shards` documents instead of
+# contending on one. A tally reads and sums the shards.
+#
+# Token-weighted proposals (those with a token_mint) are created "Pending" and
+# open for voting only when their one-off snapshot of holder balances is
+# taken, so balances cannot be captured after votes are seen. The electorate
+# is every user with a verified wallet (see PUT /users/me/wallet), weighted by
+# that wallet's balance of the mint. Weighted tallies are computed from the
+# snapshot without any RPC calls, so they are reproducible.
+
+
+class GovernanceService:
+    """Governance Service"""
+
+    def __init__(self):
+        self.db = firestore.Client()
+        self.collection = f"{settings.ENVIR}_proposals"
+        # Snapshots never change once taken
+        self._snapshots = TTLCache(ttl=3600, max_size=32)
+
+    def create_proposal(self, proposal: ProposalCreate, creator_id: str) -> Optional[ProposalResponse]:
+        """Create Proposal"""
+        try:
+            proposal_ref = self.db.collection(self.collection).document()
+            proposal_data = {
+                **proposal.dict(),
+                "creator_id": creator_id,
+                "created_at": datetime.now(),
+                "status": "Pending" if proposal.token_mint else "Voting",
+                "tally_shards": settings.GOVERNANCE_TALLY_SHARDS,
+            }
+            proposal_ref.set(proposal_data)
+            return ProposalResponse(id=proposal_ref.id, **proposal_data)
+        except Exception as exc:
+            print(f"Error creating proposal: {exc}")
+
+    def get_all_proposals(self) -> List[ProposalResponse]:
+        """Retrieve all proposals"""
+        proposal_docs = self.db.collection(self.collection).stream()
+        return [ProposalResponse(id=doc.id, **doc.to_dict()) for doc in proposal_docs]
+
+    def _get_proposal_doc(self, proposal_id: str):
+        proposal_doc = self.db.collection(self.collection).document(proposal_id).get()
+        return proposal_doc if proposal_doc.exists else None
+
+    def get_proposal_by_id(self, proposal_id: str) -> Optional[ProposalResponse]:
+        """Retrieve Proposal by ID"""
+        proposal_doc = self._get_proposal_doc(proposal_id)
+        if proposal_doc:
+            return ProposalResponse(id=proposal_id, **proposal_doc.to_dict())
+        return None
+
+    def vote_on_proposal(
+        self, proposal_id: str, voter_id: str, vote: VoteCreate
+    ) -> Optional[VoteResponse]:
+        """Vote on Proposal
+
+        Voting again with the same choice changes nothing; voting with a
+        different choice moves the voter's vote. The proposal's status is read
+        and the vote document and shard increments written in one
+        transaction, so no vote lands after a proposal closes and the tally
+        always matches the stored votes.
+        """
+        proposal_ref = self.db.collection(self.collection).document(proposal_id)
+        vote_ref = proposal_ref.collection("votes").document(voter_id)
+        shards_ref = proposal_ref.collection("tally_shards")
+
+        @firestore.transactional
+        def cast(transaction) -> Optional[dict]:
+            proposal_doc = proposal_ref.get(transaction=transaction)
+            if not proposal_doc.exists or proposal_doc.get("status") != "Voting":
+                return None  # Proposal not found or closed
+            shards = proposal_doc.to_dict().get("tally_shards", settings.GOVERNANCE_TALLY_SHARDS)
+            vote_doc = vote_ref.get(transaction=transaction)
+            if vote_doc.exists:
+                existing = vote_doc.to_dict()
+                if existing["vote"] == vote.vote:
+                    return existing
+                # Moving a vote: take it off the old choice in any shard
+                transaction.set(
+                    shards_ref.document(str(random.randrange(shards))),
+                    {existing["vote"]: firestore.Increment(-1)},
+                    merge=True,
+                )
+            vote_data = {
+                "proposal_id": proposal_id,
+                "voter_id": voter_id,
+                "vote": vote.vote,
+                "voted_at": datetime.now(),
+            }
+            transaction.set(vote_ref, vote_data)
+            transaction.set(
+                shards_ref.document(str(random.randrange(shards))),
+                {vote.vote: firestore.Increment(1)},
+                merge=True,
+            )
+            return vote_data
+
+        try:
+            vote_data = cast(self.db.transaction())
+            if vote_data is None:
+                return None
+            return VoteResponse(id=voter_id, **vote_data)
+        except Exception as exc:
+            print(f"Error casting vote: {exc}")
+
+    def get_tally(self, proposal_id: str) -> Optional[TallyResponse]:
+        """Sum the proposal's tally shards"""
+        if not self._get_proposal_doc(proposal_id):
+            return None
+        shard_docs = (
+            self.db.collection(self.collection)
+            .document(proposal_id)
+            .collection("tally_shards")
+            .stream()
+        )
+        counts = dict.fromkeys(VOTE_CHOICES, 0)
+        for shard_doc in shard_docs:
+            for choice, count in shard_doc.to_dict().items():
+                counts[choice] = counts.get(choice, 0) + count
+        return TallyResponse(
+            proposal_id=proposal_id, counts=counts, total=sum(counts.values())
+        )
+
+    def create_snapshot(self, proposal_id: str, requester_id: str) -> Optional[SnapshotResponse]:
+        """Capture verified wallet balances for a token-weighted proposal"""
+        proposal_doc = self._get_proposal_doc(proposal_id)
+        if not proposal_doc:
+            return None
+        proposal = proposal_doc.to_dict()
+        if requester_id != str(proposal.get("creator_id")) and requester_id not in settings.GOVERNANCE_ADMIN_IDS:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only the proposal's creator can take its snapshot",
+            )
+        if proposal.get("status") != "Pending":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Snapshots can only be taken before voting opens",
+            )
+
+        wallets = self._verified_wallets()
+        endpoint = getattr(settings, f"SOLANA_RPC_ENDPOINT_{settings.GOVERNANCE_SOLANA_NETWORK}")
+        try:
+            slot, balances = fetch_wallet_balances(
+                endpoint, sorted(set(wallets.values())), proposal.get("token_mint")
+            )
+        except (SnapshotError, requests.RequestException) as exc:
+            print(f"Error capturing balance snapshot: {exc}")
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY, detail="Could not read balances"
+            )
+        snapshot = VoteSnapshot.from_balances(
+            slot,
+            {voter: balances[wallet] for voter, wallet in wallets.items() if balances[wallet] > 0},
+        )
+
+        proposal_ref = self.db.collection(self.collection).document(proposal_id)
+        batch = self.db.batch()
+        chunks = snapshot.to_chunks()
+        for n, chunk in enumerate(chunks):
+            batch.set(proposal_ref.collection("snapshot").document(str(n)), chunk)
+        # Only if the proposal is unchanged since it was read as Pending
+        batch.update(
+            proposal_ref,
+            {
+                "snapshot_slot": slot,
+                "snapshot_chunks": len(chunks),
+                "status": "Voting",
+            },
+            option=self.db.write_option(last_update_time=proposal_doc.update_time),
+        )
+        try:
+            batch.commit()
+        except FailedPrecondition:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Proposal changed while the snapshot was taken",
+            )
+        self._snapshots.set(proposal_id, snapshot)
+        return SnapshotResponse(
+            proposal_id=proposal_id,
+            slot=slot,
+            holders=len(snapshot.voters),
+            total_weight=snapshot.total_weight,
+        )
+
+    def _verified_wallets(self) -> Dict[str, str]:
+        """Verified wallet of each user; a wallet claimed by several users backs none of them"""
+        user_docs = (
+            self.db.collection("users")
+            .where("wallet_verified", "==", True)
+            .select(["wallet_address"])
+            .stream()
+        )
+        wallets = {user_doc.id: user_doc.get("wallet_address") for user_doc in user_docs}
+        claims = Counter(wallets.values())
+        return {
+            user_id: wallet for user_id, wallet in wallets.items() if wallet and claims[wallet] == 1
+        }
+
+    def _load_snapshot(self, proposal_id: str, proposal: dict) -> VoteSnapshot:
+        snapshot = self._snapshots.get(proposal_id)
+        if snapshot is None:
+            snapshot_ref = (
+                self.db.collection(self.collection).document(proposal_id).collection("snapshot")
+            )
+            chunks = [
+                snapshot_ref.document(str(n)).get().to_dict()
+                for n in range(proposal["snapshot_chunks"])
+            ]
+            snapshot = VoteSnapshot.from_chunks(proposal["snapshot_slot"], chunks)
+            self._snapshots.set(proposal_id, snapshot)
+        return snapshot
+
+    def get_weighted_tally(self, proposal_id: str) -> Optional[WeightedTallyResponse]:
+        """Weight each vote by the voter's snapshot balance"""
+        proposal_doc = self._get_proposal_doc(proposal_id)
+        if not proposal_doc:
+            return None
+        proposal = proposal_doc.to_dict()
+        if proposal.get("snapshot_slot") is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail="No balance snapshot taken"
+            )
+        snapshot = self._load_snapshot(proposal_id, proposal)
+
+        vote_docs = (
+            self.db.collection(self.collection)
+            .document(proposal_id)
+            .collection("votes")
+            .select(["voter_id", "vote"])
+            .stream()
+        )
+        voter_ids, choices = [], []
+        for vote_doc in vote_docs:
+            vote_data = vote_doc.to_dict()
+            voter_ids.append(vote_data["voter_id"])
+            choices.append(vote_data["vote"])
+
+        weights = snapshot.tally(voter_ids, choices, VOTE_CHOICES)
+        return WeightedTallyResponse(
+            proposal_id=proposal_id,
+            slot=snapshot.slot,
+            weights=weights,
+            total=sum(weights.values()),
+            snapshot_weight=snapshot.total_weight,
+        )
@@ -0,0 +1,338 @@
+# core/services/order_book.py
+
+import heapq
+import threading
+import uuid
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from schemas.trade import (
+    BookLevel,
+    BookSnapshot,
+    Fill,
+    OrderCreate,
+    OrderResponse,
+    OrderSide,
+)
+
+# Quantities below this are treated as fully filled (float rounding)
+EPSILON = 1e-9
+
+
+class Order:
+    """A resting or incoming order."""
+
+    __slots__ = ("order_id", "user_id", "side", "price", "quantity", "remaining", "cancelled")
+
+    def __init__(self, order_id, user_id, side, price, quantity):
+        self.order_id = order_id
+        self.user_id = user_id
+        self.side = side
+        self.price = price
+        self.quantity = quantity
+        self.remaining = quantity
+        self.cancelled = False
+
+    @property
+    def status(self) -> str:
+        if self.remaining <= EPSILON:
+            return "Filled"
+        if self.remaining < self.quantity:
+            return "PartiallyFilled"
+        return "Open"
+
+
+class PriceLevel:
+    """
+    FIFO queue of orders resting at one price.
+
+    Cancelled orders stay in the queue, flagged, until they reach the front
+    or the level is compacted; `count` and `quantity` cover live orders only.
+    """
+
+    __slots__ = ("price", "orders", "count", "quantity")
+
+    def __init__(self, price: float):
+        self.price = price
+        self.orders = deque()
+        self.count = 0
+        self.quantity = 0.0
+
+    def head(self) -> Optional[Order]:
+        """The oldest live order, dropping cancelled ones ahead of it."""
+        orders = self.orders
+        while orders and orders[0].cancelled:
+            orders.popleft()
+        return orders[0] if orders else None
+
+    def compact(self):
+        self.orders = deque(order for order in self.orders if not order.cancelled)
+
+
+class BookSide:
+    """
+    One side of a book: price levels in a dict plus a heap of their prices.
+
+    The heap gives the best price in O(1) and new levels in O(log n). Emptied
+    levels are left in place and discarded lazily when they reach the top of
+    the heap, and a level is in `levels` exactly while its price is in the
+    heap.
+    """
+
+    def __init__(self, descending: bool):
+        self._sign = -1 if descending else 1
+        self.levels: Dict[float, PriceLevel] = {}
+        self._heap: List[float] = []
+
+    def best(self) -> Optional[PriceLevel]:
+        while self._heap:
+            price = self._heap[0] * self._sign
+            level = self.levels.get(price)
+            if level is not None and level.head() is not None:
+                return level
+            heapq.heappop(self._heap)
+            if level is not None:
+                del self.levels[price]
+        return None
+
+    def level(self, price: float) -> PriceLevel:
+        level = self.levels.get(price)
+        if level is None:
+            level = self.levels[price] = PriceLevel(price)
+            heapq.heappush(self._heap, price * self._sign)
+        return level
+
+    def add(self, order: Order):
+        level = self.level(order.price)
+        level.orders.append(order)
+        level.count += 1
+        level.quantity += order.remaining
+
+    def depth(self, limit: int) -> List[BookLevel]:
+        prices = heapq.nsmallest(
+            limit,
+            (price for price, level in self.levels.items() if level.count),
+            key=lambda price: price * self._sign,
+        )
+        return [
+            BookLevel(
+                price=price,
+                quantity=self.levels[price].quantity,
+                orders=self.levels[price].count,
+            )
+            for price in prices
+        ]
+
+
+class OrderBook:
+    """
+    Price-time priority order book for a single asset.
+
+    Orders never trade against another order from the same user. When the
+    best resting order belongs to the incoming order's user, matching stops
+    and the incoming order's remainder is cancelled rather than rested
+    (cancel-newest self-trade prevention).
+    """
+
+    def __init__(self, asset_id: str, asset_type: str):
+        self.asset_id = asset_id
+        self.asset_type = asset_type
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.orders: Dict[str, Order] = {}
+        self.lock = threading.Lock()
+
+    def _side(self, order: Order) -> BookSide:
+        return self.bids if order.side == OrderSide.buy else self.asks
+
+    def match(
+        self, order: Order, record: Optional[Callable[[List[Fill]], None]] = None
+    ) -> List[Fill]:
+        """
+        Match `order` against the opposite side, then rest any limit remainder.
+
+        `record`, if given, is called with the fills before the order rests.
+        If it raises, the book is restored to its state before the match and
+        the exception propagates, so no fill is applied that was not recorded.
+        """
+        fills = []
+        makers = []
+        is_buy = order.side == OrderSide.buy
+        opposite = self.asks if is_buy else self.bids
+        self_trade = False
+
+        while order.remaining > EPSILON:
+            level = opposite.best()
+            if level is None:
+                break
+            if order.price is not None and (
+                level.price > order.price if is_buy else level.price < order.price
+            ):
+                break
+
+            maker = level.head()
+            if maker.user_id == order.user_id:
+                self_trade = True
+                break
+            quantity = min(order.remaining, maker.remaining)
+            maker.remaining -= quantity
+            order.remaining -= quantity
+            level.quantity -= quantity
+            fills.append(
+                Fill(
+                    maker_order_id=maker.order_id,
+                    taker_order_id=order.order_id,
+                    buyer_id=order.user_id if is_buy else maker.user_id,
+                    seller_id=maker.user_id if is_buy else order.user_id,
+                    price=level.price,
+                    quantity=quantity,
+                )
+            )
+            makers.append(maker)
+            if maker.remaining <= EPSILON:
+                level.orders.popleft()
+                level.count -= 1
+                del self.orders[maker.order_id]
+
+        if fills and record is not None:
+            try:
+                record(fills)
+            except BaseException:
+                self._unmatch(order, opposite, fills, makers)
+                raise
+
+        # Market orders never rest; whatever did not fill is dropped
+        if order.remaining > EPSILON and order.price is not None and not self_trade:
+            self._side(order).add(order)
+            self.orders[order.order_id] = order
+        return fills
+
+    def _unmatch(self, order: Order, opposite: BookSide, fills: List[Fill], makers: List[Order]):
+        # Fully filled makers left the front of their levels in fill order, so
+        # putting them back in reverse order restores their time priority
+        for fill, maker in zip(reversed(fills), reversed(makers)):
+            level = opposite.level(fill.price)
+            if maker.remaining <= EPSILON:
+                level.orders.appendleft(maker)
+                level.count += 1
+                self.orders[maker.order_id] = maker
+            maker.remaining += fill.quantity
+            level.quantity += fill.quantity
+            order.remaining += fill.quantity
+
+    def cancel(self, order_id: str) -> Optional[Order]:
+        """
+        Remove a resting order in O(1).
+
+        The order is only flagged; it leaves its level's queue when it reaches
+        the front, or when cancelled orders outnumber live ones there.
+        """
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+        order.cancelled = True
+        level = self._side(order).levels[order.price]
+        level.count -= 1
+        level.quantity -= order.remaining
+        if len(level.orders) > 2 * level.count + 16:
+            level.compact()
+        return order
+
+    def snapshot(self, depth: int) -> BookSnapshot:
+        return BookSnapshot(
+            asset_id=self.asset_id,
+            bids=self.bids.depth(depth),
+            asks=self.asks.depth(depth),
+        )
+
+
+class MatchingEngine:
+    """Holds one in-memory order book per asset."""
+
+    def __init__(self):
+        self.books: Dict[str, OrderBook] = {}
+        self._order_assets: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _get_book(self, asset_id: str, asset_type: str) -> OrderBook:
+        with self._lock:
+            book = self.books.get(asset_id)
+            if book is None:
+                book = self.books[asset_id] = OrderBook(asset_id, asset_type)
+            return book
+
+    def submit(
+        self, order_data: OrderCreate, record: Optional[Callable[[List[Fill]], None]] = None
+    ) -> OrderResponse:
+        """
+        Match a new order and return its state along with any fills.
+
+        `record` persists the fills while the book is locked; if it raises the
+        order is rejected and the book left untouched (see OrderBook.match).
+        """
+        book = self._get_book(order_data.asset_id, order_data.asset_type.value)
+        order = Order(
+            order_id=uuid.uuid4().hex,
+            user_id=order_data.user_id,
+            side=order_data.side,
+            price=order_data.price,
+            quantity=order_data.quantity,
+        )
+        with book.lock:
+            fills = book.match(order, record)
+            for fill in fills:
+                if fill.maker_order_id not in book.orders:
+                    self._order_assets.pop(fill.maker_order_id, None)
+            if order.order_id in book.orders:
+                self._order_assets[order.order_id] = book.asset_id
+            status = order.status
+            # Market orders and self-trades leave an unfilled remainder behind
+            if order.remaining > EPSILON and order.order_id not in book.orders:
+                status = "Cancelled" if not fills else "PartiallyFilled"
+
+        return OrderResponse(
+            order_id=order.order_id,
+            asset_id=book.asset_id,
+            side=order.side,
+            price=order.price,
+            quantity=order.quantity,
+            remaining=order.remaining,
+            status=status,
+            fills=fills,
+        )
+
+    def cancel(self, order_id: str, user_id: Optional[str] = None) -> Optional[OrderResponse]:
+        """
+        Cancel a resting order, or return None if it is not in a book.
+
+        With `user_id` set, raises PermissionError if the order belongs to
+        another user, and leaves it in the book.
+        """
+        asset_id = self._order_assets.get(order_id)
+        if asset_id is None:
+            return None
+        book = self.books[asset_id]
+        with book.lock:
+            resting = book.orders.get(order_id)
+            if resting is not None and user_id is not None and resting.user_id != user_id:
+                raise PermissionError(f"Order {order_id} belongs to another user")
+            self._order_assets.pop(order_id, None)
+            order = book.cancel(order_id)
+        if order is None:
+            return None
+        return OrderResponse(
+            order_id=order.order_id,
+            asset_id=asset_id,
+            side=order.side,
+            price=order.price,
+            quantity=order.quantity,
+            remaining=order.remaining,
+            status="Cancelled",
+        )
+
+    def snapshot(self, asset_id: str, depth: int) -> Optional[BookSnapshot]:
+        book = self.books.get(asset_id)
+        if book is None:
+            return None
+        with book.lock:
+            return book.snapshot(depth)
@@ -0,0 +1,68 @@
+# core/services/password_service.py
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from core.config.settings import settings
+from fastapi import HTTPException, status
+from utils.security import get_password_hash, verify_and_update_password
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded process pool.
+
+    A hash costs roughly 100ms of CPU, so running it on the event loop would
+    stall every other request during a login burst. Work is handed to
+    `workers` processes instead, and once `max_pending` operations are queued
+    or running new ones are refused with a 503 rather than piling up.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured cost."""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str):
+        """Check a password.
+
+        Returns:
+            tuple: Whether the password matched, and a replacement hash when the
+            stored one was made with outdated parameters (otherwise None).
+        """
+        return await self._run(verify_and_update_password, password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
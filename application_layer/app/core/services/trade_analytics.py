@@ -0,0 +1,232 @@
+# core/services/trade_analytics.py
+
+import hashlib
+import heapq
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from core.config.settings import settings
+from schemas.trade import AssetStats, TradeResponse, TradeStats
+
+
+def _asset_id(trade: TradeResponse) -> str:
+    return trade.robot_id or trade.software_id
+
+
+def counted(trade: TradeResponse) -> bool:
+    """Only completed order book fills count; client-created trades set their own price."""
+    return trade.status == "Completed" and bool(trade.buyer_id and trade.seller_id)
+
+
+def _minute(trade: TradeResponse) -> int:
+    trade_date = trade.trade_date or datetime.now()
+    return int(trade_date.timestamp() // 60)
+
+
+class CountMinSketch:
+    """
+    Approximate per-key counts in fixed memory.
+
+    Counts never fall below the true value. Because every decrement here
+    undoes an earlier increment, the estimates stay valid as the window
+    slides.
+    """
+
+    def __init__(self, width: int, depth: int):
+        self.width = width
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self._rows = np.arange(depth)
+
+    def _columns(self, key: str) -> np.ndarray:
+        digest = hashlib.blake2b(key.encode(), digest_size=8 * len(self._rows)).digest()
+        return np.frombuffer(digest, dtype=np.uint64) % self.width
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Add `count` to `key` and return its new estimate."""
+        columns = self._columns(key)
+        self.table[self._rows, columns] += count
+        return int(self.table[self._rows, columns].min())
+
+    def estimate(self, key: str) -> int:
+        return int(self.table[self._rows, self._columns(key)].min())
+
+
+class TradeAnalytics:
+    """
+    Rolling-window marketplace statistics, updated as trades are recorded.
+
+    Trades are added to per-minute buckets holding each asset's volume,
+    notional and count. Running totals per asset and for the whole market are
+    adjusted as trades arrive and as buckets fall out of the window, so every
+    trade costs O(1) amortised and a read never scans the trade history.
+
+    Only completed order book fills are counted (see `counted`), so trades
+    a client records at a price of its choosing never move the statistics.
+
+    Trending assets are ranked by trade count in the window. Counts come from
+    a count-min sketch, and a candidate set of at most `top_k` assets is kept
+    alongside it.
+    """
+
+    def __init__(self, window_minutes: int, top_k: int, sketch_width: int = 2048, sketch_depth: int = 4):
+        self.window_minutes = window_minutes
+        self.top_k = top_k
+        self.sketch = CountMinSketch(sketch_width, sketch_depth)
+        # minute -> {asset_id: [volume, notional, count]}
+        self._buckets: deque = deque()
+        self._bucket_index: Dict[int, Dict[str, list]] = {}
+        self._assets: Dict[str, list] = {}  # asset_id -> [volume, notional, count]
+        self._totals = [0.0, 0.0, 0]
+        self._trending: Dict[str, int] = {}  # asset_id -> estimated count
+        self._lock = threading.Lock()
+
+    def _current_minute(self) -> int:
+        return int(time.time() // 60)
+
+    def _expire(self, now_minute: int):
+        cutoff = now_minute - self.window_minutes
+        while self._buckets and self._buckets[0] <= cutoff:
+            minute = self._buckets.popleft()
+            for asset_id, (volume, notional, count) in self._bucket_index.pop(minute).items():
+                self._apply(asset_id, -volume, -notional, -count)
+
+    def _apply(self, asset_id: str, volume: float, notional: float, count: int):
+        totals = self._assets.setdefault(asset_id, [0.0, 0.0, 0])
+        totals[0] += volume
+        totals[1] += notional
+        totals[2] += count
+        if totals[2] <= 0:
+            del self._assets[asset_id]
+        self._totals[0] += volume
+        self._totals[1] += notional
+        self._totals[2] += count
+        if self._totals[2] <= 0:
+            # Clear float residue once the window is empty
+            self._totals = [0.0, 0.0, 0]
+        self._rank(asset_id, self.sketch.add(asset_id, count))
+
+    def _rank(self, asset_id: str, score: int):
+        if asset_id in self._trending or len(self._trending) < self.top_k:
+            if score > 0:
+                self._trending[asset_id] = score
+            else:
+                self._trending.pop(asset_id, None)
+            return
+        weakest = min(self._trending, key=self._trending.get)
+        if score > self._trending[weakest]:
+            del self._trending[weakest]
+            self._trending[asset_id] = score
+
+    def _add(self, minute: int, asset_id: str, volume: float, notional: float, count: int):
+        if minute <= self._current_minute() - self.window_minutes:
+            return
+        bucket = self._bucket_index.get(minute)
+        if bucket is None:
+            bucket = self._bucket_index[minute] = {}
+            # Trades normally arrive in time order; insert late ones in place
+            if self._buckets and minute < self._buckets[-1]:
+                self._buckets.insert(
+                    sum(1 for existing in self._buckets if existing < minute), minute
+                )
+            else:
+                self._buckets.append(minute)
+        entry = bucket.setdefault(asset_id, [0.0, 0.0, 0])
+        entry[0] += volume
+        entry[1] += notional
+        entry[2] += count
+        self._apply(asset_id, volume, notional, count)
+
+    def record(self, trade: TradeResponse, previous: Optional[TradeResponse] = None):
+        """Count a new trade, or replace `previous` with its updated version."""
+        with self._lock:
+            self._expire(self._current_minute())
+            if previous is not None and counted(previous):
+                self._remove(previous)
+            if not counted(trade):
+                return
+            quantity = trade.quantity or 1
+            self._add(_minute(trade), _asset_id(trade), quantity, quantity * trade.price, 1)
+
+    def discard(self, trade: TradeResponse):
+        """Remove a deleted trade from the window."""
+        if not counted(trade):
+            return
+        with self._lock:
+            self._remove(trade)
+
+    def _remove(self, trade: TradeResponse):
+        minute, asset_id = _minute(trade), _asset_id(trade)
+        entry = self._bucket_index.get(minute, {}).get(asset_id)
+        if entry is None:
+            return
+        quantity = trade.quantity or 1
+        entry[0] -= quantity
+        entry[1] -= quantity * trade.price
+        entry[2] -= 1
+        if entry[2] <= 0:
+            del self._bucket_index[minute][asset_id]
+        self._apply(asset_id, -quantity, -quantity * trade.price, -1)
+
+    def backfill(self, trades: Iterable[TradeResponse]):
+        """Load historical trades, aggregating them per minute and asset with NumPy."""
+        trades = [trade for trade in trades if counted(trade)]
+        if not trades:
+            return
+        minutes = np.fromiter((_minute(trade) for trade in trades), dtype=np.int64, count=len(trades))
+        quantities = np.fromiter((trade.quantity or 1 for trade in trades), dtype=np.float64, count=len(trades))
+        prices = np.fromiter((trade.price for trade in trades), dtype=np.float64, count=len(trades))
+        asset_ids, asset_index = np.unique([_asset_id(trade) for trade in trades], return_inverse=True)
+
+        in_window = minutes > self._current_minute() - self.window_minutes
+        minutes, quantities, prices, asset_index = (
+            minutes[in_window], quantities[in_window], prices[in_window], asset_index[in_window]
+        )
+        # One group per (minute, asset) pair
+        keys, group = np.unique(minutes * len(asset_ids) + asset_index, return_inverse=True)
+        volumes = np.bincount(group, weights=quantities, minlength=len(keys))
+        notionals = np.bincount(group, weights=quantities * prices, minlength=len(keys))
+        counts = np.bincount(group, minlength=len(keys))
+
+        with self._lock:
+            for key, volume, notional, count in zip(keys.tolist(), volumes.tolist(), notionals.tolist(), counts.tolist()):
+                minute, index = divmod(key, len(asset_ids))
+                self._add(minute, str(asset_ids[index]), volume, notional, count)
+
+    def _asset_stats(self, asset_id: str, score: Optional[int] = None) -> AssetStats:
+        volume, notional, count = self._assets.get(asset_id, (0.0, 0.0, 0))
+        return AssetStats(
+            asset_id=asset_id,
+            volume=volume,
+            notional=notional,
+            trade_count=count,
+            vwap=notional / volume if volume > 0 else None,
+            score=score,
+        )
+
+    def stats(self) -> TradeStats:
+        """Market-wide totals and the top trending assets; O(top_k)."""
+        with self._lock:
+            self._expire(self._current_minute())
+            volume, notional, count = self._totals
+            trending = heapq.nlargest(self.top_k, self._trending.items(), key=lambda item: item[1])
+            return TradeStats(
+                window_minutes=self.window_minutes,
+                volume=volume,
+                notional=notional,
+                trade_count=count,
+                vwap=notional / volume if volume > 0 else None,
+                trending=[self._asset_stats(asset_id, score) for asset_id, score in trending],
+            )
+
+    def asset_stats(self, asset_id: str) -> AssetStats:
+        with self._lock:
+            self._expire(self._current_minute())
+            return self._asset_stats(asset_id, self.sketch.estimate(asset_id))
+
+
+trade_analytics = TradeAnalytics(settings.TRADE_STATS_WINDOW_MINUTES, settings.TRADE_STATS_TOP_K)
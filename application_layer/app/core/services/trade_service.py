@@ -1,32 +1,196 @@
+import base64
+import binascii
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
 from typing import List, Optional
 
 from core.config.settings import settings
+from core.services.trade_analytics import counted, trade_analytics
+from core.services.trade_summary import TradeSummaryProjector, participants
+from core.services.trade_wal import FirestoreReplicator, LogUnavailable, TradeLedger
 from fastapi import HTTPException, status
 from google.cloud import firestore
-from schemas.trade import TradeCreate, TradeResponse, TradeUpdate
+from schemas.trade import (
+    Fill,
+    OrderCreate,
+    TradeCreate,
+    TradePage,
+    TradeResponse,
+    TradeSummary,
+    TradeUpdate,
+)
 
 # For demo purposes firestore will be used to record transactional data. For production a more suitable database will be used i.e. Cloud SQL and BigQuery
+#
+# Trade mutations are committed to a local write-ahead log (see
+# core/services/trade_wal.py) before they are acknowledged, and Firestore is
+# kept up to date from it in the background. Reads of trades Firestore may
+# not have yet are served from the ledger; the rest come from Firestore. The
+# log has a single writer, so run one worker per TRADE_WAL_DIR.
+#
+# Trade history queries (`query_trades`) need these composite indexes on the
+# {ENVIR}_trades collection (defined in application_layer/firestore.indexes.json):
+#   participants ARRAY_CONTAINS, trade_date DESC, __name__ DESC
+#   participants ARRAY_CONTAINS, status ASC, trade_date DESC, __name__ DESC
+#   status ASC, trade_date DESC, __name__ DESC
+
+_ledger: Optional[TradeLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def _project(data: dict) -> dict:
+    """Shape a ledger record as the Firestore trade document."""
+    document = TradeResponse(**data).dict(exclude={"id"})
+    # Lets one indexed query find a user's trades whichever side they were on
+    document["participants"] = participants(document)
+    return document
+
+
+def get_trade_ledger(db) -> TradeLedger:
+    """Open the process-wide trade ledger, recovering it from disk on first use."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            ledger = TradeLedger(
+                settings.TRADE_WAL_DIR,
+                settings.TRADE_WAL_FSYNC_INTERVAL_MS / 1000,
+                settings.TRADE_SNAPSHOT_EVERY,
+            )
+            ledger.attach_replicator(
+                FirestoreReplicator(
+                    db,
+                    f"{settings.ENVIR}_trades",
+                    ledger.wal,
+                    os.path.join(settings.TRADE_WAL_DIR, "replicated.seq"),
+                    settings.TRADE_REPLICATION_BATCH,
+                    _project,
+                    on_replicated=TradeSummaryProjector(
+                        db,
+                        f"{settings.ENVIR}_trade_summaries",
+                        settings.TRADE_SUMMARY_RECENT_SIZE,
+                        ledger.wal.writer_id,
+                    )
+                    if settings.TRADE_SUMMARIES_ENABLED
+                    else None,
+                )
+            )
+            _ledger = ledger
+        return _ledger
+
+
+def _encode_cursor(trade_date: datetime, trade_id: str) -> str:
+    payload = json.dumps({"trade_date": trade_date.isoformat(), "id": trade_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> dict:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return {
+            "trade_date": datetime.fromisoformat(payload["trade_date"]),
+            "__name__": payload["id"],
+        }
+    except (binascii.Error, KeyError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
 
 class TradeService:
     def __init__(self):
         self.db = firestore.Client()
+        self.ledger = get_trade_ledger(self.db)
+
+    def _commit(self, op: str, trade_id: str, data: Optional[dict] = None, previous: Optional[dict] = None):
+        """Commit to the ledger, answering 503 while its log is failing"""
+        try:
+            return self.ledger.commit(op, trade_id, data, previous)
+        except LogUnavailable as exc:
+            print(f"Error committing trade {trade_id}: {exc}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Trade ledger unavailable",
+            )
 
-    def create_trade(self, trade_data: TradeCreate) -> Optional[TradeResponse]:
+    def create_trade(
+        self, trade_data: TradeCreate, status: str = "Pending"
+    ) -> Optional[TradeResponse]:
         """Create Trade"""
         try:
-            self.db.collection(f"{settings.ENVIR}_trades").add(trade_data.dict())
-            return TradeResponse(**trade_data.dict())
+            trade = TradeResponse(
+                **trade_data.dict(), id=uuid.uuid4().hex, status=status
+            )
+            self._commit("create", trade.id, trade.dict())
+            trade_analytics.record(trade)
+            return trade
+        except HTTPException:
+            raise
         except Exception as exc:
             print(f"Error creating trade: {exc}")
 
-    def get_trade_by_id(self, trade_id: str) -> Optional[TradeResponse]:
-        """Retrieve Trade by ID"""
+    def record_fills(self, order: OrderCreate, fills: List[Fill]) -> List[TradeResponse]:
+        """
+        Durably record an order's fills as Completed trades.
+
+        Unlike `create_trade` this raises if the fills cannot be committed, so
+        the matching engine can reject the order instead of losing them.
+        """
+        trades = [
+            TradeResponse(
+                robot_id=order.asset_id if order.asset_type == "robot" else "",
+                software_id=order.asset_id if order.asset_type == "software" else "",
+                user_id=order.user_id,
+                price=fill.price,
+                quantity=fill.quantity,
+                buyer_id=fill.buyer_id,
+                seller_id=fill.seller_id,
+                id=uuid.uuid4().hex,
+                status="Completed",
+            )
+            for fill in fills
+        ]
+        try:
+            self.ledger.commit_many([("create", trade.id, trade.dict(), None) for trade in trades])
+        except Exception as exc:
+            print(f"Error recording fills: {exc}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Order could not be recorded",
+            )
+        for trade in trades:
+            trade_analytics.record(trade)
+        return trades
+
+    def _load_trade(self, trade_id: str) -> Optional[dict]:
+        """Trade data from the ledger, falling back to Firestore for older trades"""
+        trade_data = self.ledger.get(trade_id)
+        if trade_data is not None:
+            return dict(trade_data)
         trade_doc = (
             self.db.collection(f"{settings.ENVIR}_trades").document(trade_id).get()
         )
         if trade_doc.exists:
             trade_data = trade_doc.to_dict()
             trade_data["id"] = trade_id
+            return trade_data
+        return None
+
+    @staticmethod
+    def _check_mutable(trade: TradeResponse):
+        """Completed order book fills feed the market statistics and cannot be changed"""
+        if counted(trade):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Order book fills cannot be changed",
+            )
+
+    def get_trade_by_id(self, trade_id: str) -> Optional[TradeResponse]:
+        """Retrieve Trade by ID"""
+        trade_data = self._load_trade(trade_id)
+        if trade_data is not None:
             return TradeResponse(**trade_data)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Trade not found"
@@ -36,28 +200,86 @@ class TradeService:
         self, trade_id: str, trade_data: TradeUpdate
     ) -> Optional[TradeResponse]:
         """Update Trade"""
-        trade_ref = self.db.collection(f"{settings.ENVIR}_trades").document(trade_id)
-        trade_doc = trade_ref.get()
-        if trade_doc.exists:
-            trade_ref.update(trade_data.dict(exclude_unset=True))
-            trade_data = trade_ref.get().to_dict()
-            trade_data["id"] = trade_id
-            return TradeResponse(**trade_data)
+        trade = self._load_trade(trade_id)
+        if trade is not None:
+            previous = TradeResponse(**trade)
+            self._check_mutable(previous)
+            trade.update(trade_data.dict(exclude_unset=True))
+            updated = TradeResponse(**trade)
+            self._commit("update", trade_id, updated.dict(), previous.dict())
+            trade_analytics.record(updated, previous=previous)
+            return updated
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Trade not found"
         )
 
     def delete_trade(self, trade_id: str) -> bool:
         """Delete Trade"""
-        trade_ref = self.db.collection(f"{settings.ENVIR}_trades").document(trade_id)
-        trade_doc = trade_ref.get()
-        if trade_doc.exists:
-            trade_ref.delete()
+        trade = self._load_trade(trade_id)
+        if trade is not None:
+            self._check_mutable(TradeResponse(**trade))
+            self._commit("delete", trade_id, previous=TradeResponse(**trade).dict())
+            trade_analytics.discard(TradeResponse(**trade))
             return True
         return False
 
     def list_all_trades(self) -> List[TradeResponse]:
         """List all Trades"""
         trade_docs = self.db.collection(f"{settings.ENVIR}_trades").stream()
-        trades = [TradeResponse(**doc.to_dict()) for doc in trade_docs]
+        trades = [TradeResponse(**doc.to_dict(), id=doc.id) for doc in trade_docs]
         return trades
+
+    def query_trades(
+        self,
+        user_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        trade_status: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> TradePage:
+        """List Trades, newest first, one page at a time"""
+        query = self.db.collection(f"{settings.ENVIR}_trades")
+        if user_id:
+            query = query.where("participants", "array_contains", user_id)
+        if trade_status:
+            query = query.where("status", "==", trade_status)
+        if start:
+            query = query.where("trade_date", ">=", start)
+        if end:
+            query = query.where("trade_date", "<", end)
+        # Document ID breaks ties between trades with the same timestamp
+        query = query.order_by("trade_date", direction=firestore.Query.DESCENDING)
+        query = query.order_by("__name__", direction=firestore.Query.DESCENDING)
+        if cursor:
+            query = query.start_after(_decode_cursor(cursor))
+
+        trade_docs = list(query.limit(limit).stream())
+        items = [TradeResponse(**doc.to_dict(), id=doc.id) for doc in trade_docs]
+        next_cursor = None
+        if len(items) == limit:
+            next_cursor = _encode_cursor(items[-1].trade_date, items[-1].id)
+        return TradePage(items=items, next_cursor=next_cursor)
+
+    def get_trade_summary(self, user_id: str) -> TradeSummary:
+        """Retrieve a user's denormalised trade summary"""
+        summary_doc = (
+            self.db.collection(f"{settings.ENVIR}_trade_summaries").document(user_id).get()
+        )
+        if summary_doc.exists:
+            return TradeSummary(**summary_doc.to_dict())
+        return TradeSummary(user_id=user_id)
+
+    def backfill_analytics(self):
+        """Load trades inside the statistics window into the analytics engine"""
+        cutoff = datetime.now() - timedelta(minutes=settings.TRADE_STATS_WINDOW_MINUTES)
+        trade_docs = (
+            self.db.collection(f"{settings.ENVIR}_trades")
+            .where("trade_date", ">=", cutoff)
+            .stream()
+        )
+        trades = {doc.id: TradeResponse(**doc.to_dict(), id=doc.id) for doc in trade_docs}
+        # The ledger may hold trades Firestore has not caught up with yet
+        for trade_data in self.ledger.pending():
+            trades[trade_data["id"]] = TradeResponse(**trade_data)
+        trade_analytics.backfill(trades.values())
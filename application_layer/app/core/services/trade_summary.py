@@ -0,0 +1,119 @@
+# core/services/trade_summary.py
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from google.cloud import firestore
+from schemas.trade import TradeResponse
+
+
+def participants(trade: dict) -> List[str]:
+    """Users a trade belongs to: its creator and, for fills, both sides."""
+    users = []
+    for key in ("user_id", "buyer_id", "seller_id"):
+        user_id = trade.get(key)
+        if user_id and user_id not in users:
+            users.append(user_id)
+    return users
+
+
+def _contribution(trade: dict) -> Tuple[float, float]:
+    quantity = trade.get("quantity") or 1
+    return quantity, quantity * trade["price"]
+
+
+class TradeSummaryProjector:
+    """
+    Keeps one denormalised summary document per user.
+
+    Each summary holds the user's trade count, volume, notional, counts by
+    status and their most recent trades, so an orders page can load from a
+    single read. Summaries cover trades written since they were enabled.
+
+    Documents are updated from replicated ledger records inside a
+    transaction. Each summary keeps the last sequence applied from every
+    ledger (`applied`, keyed by the log's writer ID), and records at or
+    below it are skipped. That makes redelivered batches harmless without
+    mixing up sequence numbers from different workers, or from a log
+    directory that was recreated.
+    """
+
+    def __init__(self, db, collection: str, recent_size: int, writer_id: str):
+        self.db = db
+        self.collection = collection
+        self.recent_size = recent_size
+        self.writer_id = writer_id
+
+    def __call__(self, records: List[Tuple[int, dict]]):
+        by_user: Dict[str, List[Tuple[int, dict]]] = defaultdict(list)
+        for seq, record in records:
+            users = participants(record["data"] or {}) + participants(record["previous"] or {})
+            for user_id in dict.fromkeys(users):
+                by_user[user_id].append((seq, record))
+        for user_id, user_records in by_user.items():
+            self._apply(self.db.transaction(), user_id, user_records)
+
+    def _apply(self, transaction, user_id: str, records: List[Tuple[int, dict]]):
+        doc_ref = self.db.collection(self.collection).document(user_id)
+
+        @firestore.transactional
+        def update(transaction):
+            snapshot = doc_ref.get(transaction=transaction)
+            summary = snapshot.to_dict() if snapshot.exists else self._empty(user_id)
+            if "applied" not in summary:
+                # Written before writer IDs, when a single ledger fed summaries
+                summary["applied"] = {self.writer_id: summary.get("last_seq", 0)}
+            summary.pop("last_seq", None)
+            applied = summary["applied"]
+            changed = False
+            for seq, record in records:
+                if seq <= applied.get(self.writer_id, 0):
+                    continue
+                self._fold(summary, user_id, record)
+                applied[self.writer_id] = seq
+                changed = True
+            if changed:
+                transaction.set(doc_ref, summary)
+
+        update(transaction)
+
+    @staticmethod
+    def _empty(user_id: str) -> dict:
+        return {
+            "user_id": user_id,
+            "trade_count": 0,
+            "volume": 0.0,
+            "notional": 0.0,
+            "status_counts": {},
+            "recent": [],
+            "applied": {},
+        }
+
+    def _fold(self, summary: dict, user_id: str, record: dict):
+        previous: Optional[dict] = record["previous"]
+        data: Optional[dict] = record["data"]
+        status_counts = summary["status_counts"]
+        if previous and user_id in participants(previous):
+            volume, notional = _contribution(previous)
+            summary["trade_count"] -= 1
+            summary["volume"] -= volume
+            summary["notional"] -= notional
+            status_counts[previous["status"]] = status_counts.get(previous["status"], 0) - 1
+            if status_counts[previous["status"]] <= 0:
+                del status_counts[previous["status"]]
+
+        recent = summary["recent"]
+        index = next((i for i, trade in enumerate(recent) if trade["id"] == record["id"]), None)
+        if index is not None:
+            del recent[index]
+
+        if record["op"] != "delete" and user_id in participants(data):
+            volume, notional = _contribution(data)
+            summary["trade_count"] += 1
+            summary["volume"] += volume
+            summary["notional"] += notional
+            status_counts[data["status"]] = status_counts.get(data["status"], 0) + 1
+            # Records arrive in commit order, so new trades go to the front and
+            # updated ones keep their place
+            recent.insert(0 if index is None else index, TradeResponse(**data).dict())
+            del recent[self.recent_size :]
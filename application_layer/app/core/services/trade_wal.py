@@ -0,0 +1,554 @@
+# core/services/trade_wal.py
+
+import fcntl
+import json
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Frame header: payload length, CRC32 of (sequence + payload), sequence number
+FRAME_HEADER = struct.Struct(">IIQ")
+SEGMENT_SUFFIX = ".wal"
+LOCK_FILE = "LOCK"
+WRITER_FILE = "WRITER"
+
+
+class LogUnavailable(Exception):
+    """The log failed to write or fsync and is not accepting records."""
+
+
+def _encode(record: dict) -> bytes:
+    return json.dumps(record, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class WriteAheadLog:
+    """
+    Append-only, CRC-framed log split into segment files.
+
+    Records are written to the OS immediately but fsynced by a background
+    thread every `fsync_interval` seconds, so concurrent writers share one
+    fsync (group commit). `append` returns once its record is durable. With
+    an interval of 0 every write fsyncs inline.
+
+    On open, a torn or corrupt tail left by a crash is truncated away.
+
+    If a write or fsync fails (ENOSPC, EIO), the log stops accepting records
+    and waiters raise `LogUnavailable`. Records that were not yet durable are
+    in doubt; `heal` truncates them away and resumes with fresh sequence
+    numbers, so a discarded record is never mistaken for a later one.
+
+    A log has a single writer: the directory is locked for the life of the
+    process, and opening it from a second process (e.g. another uvicorn
+    worker) fails rather than interleaving sequence numbers. Sequence
+    numbers are only unique within one log, so `writer_id`, generated when
+    the directory is first used, tells logs apart; (writer_id, seq) names a
+    record globally.
+    """
+
+    def __init__(self, directory: str, fsync_interval: float):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, LOCK_FILE), "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise RuntimeError(
+                f"Write-ahead log {directory} is in use by another process; "
+                "run a single worker per log directory"
+            )
+
+        self.writer_id = self._load_writer_id()
+        self._lock = threading.Lock()
+        self._durable = threading.Condition(self._lock)
+        self.last_seq = self._recover()
+        self._durable_seq = self.last_seq
+        self._file = open(self._segment_path(self._active_start), "ab")
+        self._durable_offset = self._file.tell()
+        self._failure: Optional[Exception] = None
+        self._discarded: List[Tuple[int, int]] = []  # (first, last) ranges dropped by heal
+
+        if fsync_interval > 0:
+            threading.Thread(target=self._sync_loop, name="trade-wal-fsync", daemon=True).start()
+
+    def _load_writer_id(self) -> str:
+        path = os.path.join(self.directory, WRITER_FILE)
+        if os.path.exists(path):
+            with open(path) as writer:
+                return writer.read().strip()
+        writer_id = uuid.uuid4().hex
+        with open(path + ".tmp", "w") as writer:
+            writer.write(writer_id)
+            writer.flush()
+            os.fsync(writer.fileno())
+        os.replace(path + ".tmp", path)
+        return writer_id
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        """Return (first_seq, path) for each segment, oldest first."""
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.endswith(SEGMENT_SUFFIX):
+                segments.append((int(name[: -len(SEGMENT_SUFFIX)]), os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def _segment_path(self, first_seq: int) -> str:
+        return os.path.join(self.directory, f"{first_seq:020d}{SEGMENT_SUFFIX}")
+
+    def _recover(self) -> int:
+        segments = self._segments()
+        if not segments:
+            self._active_start = 1
+            return 0
+        last_seq = segments[-1][0] - 1
+        for _, path in segments:
+            good_offset = 0
+            for seq, _, offset in self._read_segment(path):
+                last_seq, good_offset = seq, offset
+            if good_offset < os.path.getsize(path):
+                print(f"Truncating torn write-ahead log tail in {path}")
+                with open(path, "r+b") as segment:
+                    segment.truncate(good_offset)
+        self._active_start = segments[-1][0]
+        return last_seq
+
+    @staticmethod
+    def _read_segment(path: str) -> Iterator[Tuple[int, dict, int]]:
+        """Yield (seq, record, end_offset) for each intact frame in a segment."""
+        with open(path, "rb") as segment:
+            data = segment.read()
+        offset = 0
+        while offset + FRAME_HEADER.size <= len(data):
+            length, crc, seq = FRAME_HEADER.unpack_from(data, offset)
+            start = offset + FRAME_HEADER.size
+            payload = data[start : start + length]
+            if len(payload) < length or zlib.crc32(struct.pack(">Q", seq) + payload) != crc:
+                return
+            offset = start + length
+            yield seq, json.loads(payload), offset
+
+    @property
+    def failed(self) -> bool:
+        return self._failure is not None
+
+    def write(self, record: dict) -> int:
+        """Write a record without waiting for it to be durable. Returns its sequence."""
+        payload = _encode(record)
+        with self._lock:
+            self._check()
+            seq = self.last_seq + 1
+            crc = zlib.crc32(struct.pack(">Q", seq) + payload)
+            try:
+                self._file.write(FRAME_HEADER.pack(len(payload), crc, seq) + payload)
+            except OSError as exc:
+                self._fail(exc)
+            self.last_seq = seq
+            if self.fsync_interval <= 0:
+                self._sync()
+        return seq
+
+    def is_durable(self, seq: int) -> bool:
+        """Whether record `seq` has been fsynced (and not discarded by `heal`)."""
+        with self._lock:
+            return seq <= self._durable_seq and not self._was_discarded(seq)
+
+    def _was_discarded(self, seq: int) -> bool:
+        return any(first <= seq <= last for first, last in self._discarded)
+
+    def wait_durable(self, seq: int):
+        """Block until every record up to `seq` has been fsynced.
+
+        Raises `LogUnavailable` if the log fails first, or if `seq` was
+        discarded by `heal`.
+        """
+        with self._lock:
+            while True:
+                if self._was_discarded(seq):
+                    raise LogUnavailable(f"Record {seq} was discarded after a log failure")
+                if self._durable_seq >= seq:
+                    return
+                self._check()
+                self._durable.wait()
+
+    def _check(self):
+        if self._failure is not None:
+            raise LogUnavailable(f"Write-ahead log failed: {self._failure}")
+
+    def _fail(self, exc: Exception):
+        """Stop accepting records and wake every waiter with the failure. Call with the lock held."""
+        if self._failure is None:
+            print(f"Write-ahead log {self.directory} failed: {type(exc).__name__}: {exc}")
+        self._failure = exc
+        self._durable.notify_all()
+        raise LogUnavailable(f"Write-ahead log failed: {exc}") from exc
+
+    def heal(self) -> Optional[Tuple[int, int]]:
+        """Try to recover a failed log. Returns the (first, last) sequences discarded.
+
+        Truncates the active segment back to its last fsynced byte. Raises
+        `LogUnavailable` if that or the following fsync fails too. Returns
+        None when the log had not failed.
+        """
+        with self._lock:
+            if self._failure is None:
+                return None
+            try:
+                try:
+                    self._file.close()
+                except OSError:
+                    pass  # Unflushed bytes are discarded by the truncate below
+                path = self._segment_path(self._active_start)
+                with open(path, "r+b") as segment:
+                    segment.truncate(self._durable_offset)
+                    os.fsync(segment.fileno())
+                self._file = open(path, "ab")
+            except OSError as exc:
+                self._fail(exc)
+            discarded = (self._durable_seq + 1, self.last_seq)
+            if discarded[0] <= discarded[1]:
+                self._discarded.append(discarded)
+                print(f"Write-ahead log {self.directory} recovered; discarded records {discarded[0]}-{discarded[1]}")
+            self._durable_seq = self.last_seq
+            self._failure = None
+            return discarded
+
+    def append(self, record: dict) -> int:
+        """Append a record and wait until it is durable. Returns its sequence."""
+        seq = self.write(record)
+        self.wait_durable(seq)
+        return seq
+
+    def _sync(self):
+        self._check()
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError as exc:
+            self._fail(exc)
+        self._durable_offset = self._file.tell()
+        self._durable_seq = self.last_seq
+        self._durable.notify_all()
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self.fsync_interval)
+            with self._lock:
+                if self._failure is None and self._durable_seq < self.last_seq:
+                    try:
+                        self._sync()
+                    except LogUnavailable:
+                        pass  # Waiters were woken with the failure; the next commit tries to heal
+
+    def replay(self, after_seq: int = 0) -> Iterator[Tuple[int, dict]]:
+        """Yield (seq, record) for every durable record after `after_seq`."""
+        with self._lock:
+            self._file.flush()
+            segments = self._segments()
+        for index, (first_seq, path) in enumerate(segments):
+            next_first = segments[index + 1][0] if index + 1 < len(segments) else None
+            if next_first is not None and next_first <= after_seq + 1:
+                continue
+            for seq, record, _ in self._read_segment(path):
+                if seq > after_seq:
+                    yield seq, record
+
+    def rotate(self):
+        """Start a new segment so older ones can be removed after a snapshot."""
+        with self._lock:
+            self._sync()
+            self._file.close()
+            self._active_start = self.last_seq + 1
+            self._file = open(self._segment_path(self._active_start), "ab")
+            self._durable_offset = 0
+
+    def remove_through(self, seq: int):
+        """Delete segments whose records are all at or before `seq`."""
+        with self._lock:
+            segments = self._segments()
+        for index, (_, path) in enumerate(segments[:-1]):
+            if segments[index + 1][0] - 1 <= seq:
+                os.remove(path)
+
+
+class SnapshotStore:
+    """Point-in-time copy of the ledger state, replaced atomically."""
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, "snapshot.json")
+
+    def load(self) -> Tuple[int, Dict[str, dict]]:
+        if not os.path.exists(self.path):
+            return 0, {}
+        with open(self.path, "rb") as snapshot:
+            data = json.load(snapshot)
+        return data["seq"], data["trades"]
+
+    def save(self, seq: int, trades: Dict[str, dict]):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as snapshot:
+            snapshot.write(_encode({"seq": seq, "trades": trades}))
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temp_path, self.path)
+
+
+class FirestoreReplicator:
+    """
+    Projects committed ledger records into Firestore in the background.
+
+    Records are queued in sequence order and only written once durable in
+    the log. They are upserted by trade ID in batches, so redelivering one is
+    harmless. The last replicated sequence is persisted after each batch
+    commit and replication resumes from it after a restart (at-least-once).
+    """
+
+    def __init__(
+        self,
+        db,
+        collection: str,
+        wal: WriteAheadLog,
+        cursor_path: str,
+        batch_size: int,
+        transform: Callable[[dict], dict],
+        on_replicated: Optional[Callable[[List[Tuple[int, dict]]], None]] = None,
+    ):
+        self.db = db
+        self.collection = collection
+        self.wal = wal
+        self.cursor_path = cursor_path
+        self.batch_size = batch_size
+        self.transform = transform
+        self.on_replicated = on_replicated
+        self.replicated_seq = self._load_cursor()
+        self._queue = deque(wal.replay(self.replicated_seq))
+        self._condition = threading.Condition()
+        threading.Thread(target=self._run, name="trade-replicator", daemon=True).start()
+
+    def _load_cursor(self) -> int:
+        if not os.path.exists(self.cursor_path):
+            return 0
+        with open(self.cursor_path) as cursor:
+            return int(cursor.read().strip() or 0)
+
+    def _save_cursor(self, seq: int):
+        temp_path = self.cursor_path + ".tmp"
+        with open(temp_path, "w") as cursor:
+            cursor.write(str(seq))
+        os.replace(temp_path, self.cursor_path)
+
+    def enqueue(self, seq: int, record: dict):
+        with self._condition:
+            self._queue.append((seq, record))
+            self._condition.notify()
+
+    def discard(self, first: int, last: int):
+        """Drop queued records the log discarded after a failure."""
+        with self._condition:
+            self._queue = deque(item for item in self._queue if not first <= item[0] <= last)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                pending = [
+                    self._queue.popleft()
+                    for _ in range(min(self.batch_size, len(self._queue)))
+                ]
+            try:
+                self.wal.wait_durable(pending[-1][0])
+            except LogUnavailable:
+                # Anything not durable when the log failed is discarded when it heals
+                pending = [item for item in pending if self.wal.is_durable(item[0])]
+                if not pending:
+                    continue
+            while True:
+                try:
+                    self._commit(pending)
+                    break
+                except Exception as exc:
+                    print(f"Error replicating trades to Firestore: {exc}")
+                    time.sleep(1)
+
+    def _commit(self, pending: List[Tuple[int, dict]]):
+        batch = self.db.batch()
+        collection_ref = self.db.collection(self.collection)
+        for _, record in pending:
+            doc_ref = collection_ref.document(record["id"])
+            if record["op"] == "delete":
+                batch.delete(doc_ref)
+            else:
+                batch.set(doc_ref, self.transform(record["data"]))
+        batch.commit()
+        if self.on_replicated:
+            # Must be idempotent: a failure here retries the whole batch
+            self.on_replicated(pending)
+        self.replicated_seq = pending[-1][0]
+        self._save_cursor(self.replicated_seq)
+
+
+class TradeLedger:
+    """
+    Authoritative trade state: WAL first, then memory, then Firestore.
+
+    Each mutation is written to the write-ahead log and applied to the
+    in-memory state in sequence order, and the caller is released once the
+    log has fsynced it. Holding the lock only for the write lets concurrent
+    commits share an fsync.
+
+    If the log fails, commits raise `LogUnavailable` until it heals. The
+    next commit tries to heal it, and reverts the in-memory changes whose
+    records were discarded.
+
+    Memory only holds trades whose latest change may not have reached
+    Firestore yet; older ones are read from Firestore. Every `snapshot_every`
+    records a background thread drops trades Firestore has caught up with,
+    snapshots the rest and removes fully replicated segments, which bounds
+    both memory and recovery (one snapshot load plus a short replay).
+    """
+
+    def __init__(self, directory: str, fsync_interval: float, snapshot_every: int):
+        self.snapshots = SnapshotStore(directory)
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_due = threading.Event()
+
+        self.wal = WriteAheadLog(directory, fsync_interval)
+        snapshot_seq, self.trades = self.snapshots.load()
+        # Sequence of each trade's latest change; snapshotted trades get the
+        # snapshot's, which is an upper bound
+        self._seqs = dict.fromkeys(self.trades, snapshot_seq)
+        for seq, record in self.wal.replay(snapshot_seq):
+            self._apply(seq, record)
+        self._snapshot_seq = snapshot_seq
+        # Records applied to memory but maybe not yet durable, oldest first
+        self._unsynced: deque = deque()
+        self.replicator: Optional[FirestoreReplicator] = None
+        threading.Thread(target=self._snapshot_loop, name="trade-snapshot", daemon=True).start()
+
+    def _apply(self, seq: int, record: dict):
+        if record["op"] == "delete":
+            self.trades.pop(record["id"], None)
+            self._seqs.pop(record["id"], None)
+        else:
+            self.trades[record["id"]] = record["data"]
+            self._seqs[record["id"]] = seq
+
+    def attach_replicator(self, replicator: FirestoreReplicator):
+        self.replicator = replicator
+
+    def commit(
+        self, op: str, trade_id: str, data: Optional[dict] = None, previous: Optional[dict] = None
+    ) -> int:
+        """Durably record a create, update or delete and apply it.
+
+        `previous` is the trade before an update or delete, kept in the record
+        for projections that work from deltas.
+        """
+        return self.commit_many([(op, trade_id, data, previous)])
+
+    def commit_many(
+        self, mutations: List[Tuple[str, str, Optional[dict], Optional[dict]]]
+    ) -> int:
+        """Durably record several (op, trade_id, data, previous) mutations.
+
+        They are logged back to back and share one fsync. Returns the last
+        record's sequence.
+        """
+        # Serialise and parse so memory holds exactly what recovery would
+        records = [
+            json.loads(_encode({"op": op, "id": trade_id, "data": data, "previous": previous}))
+            for op, trade_id, data, previous in mutations
+        ]
+        with self._lock:
+            if self.wal.failed:
+                self._heal()
+            while self._unsynced and self.wal.is_durable(self._unsynced[0][0]):
+                self._unsynced.popleft()
+            for record in records:
+                seq = self.wal.write(record)
+                self._apply(seq, record)
+                self._unsynced.append((seq, record))
+                if self.replicator:
+                    self.replicator.enqueue(seq, record)
+        self.wal.wait_durable(seq)
+        if seq - self._snapshot_seq >= self.snapshot_every:
+            self._snapshot_due.set()
+        return seq
+
+    def _heal(self):
+        """Recover the log and undo the records it discarded. Call with the lock held."""
+        discarded = self.wal.heal()
+        if discarded is None:
+            return
+        first, last = discarded
+        # Newest first, so each trade ends up as its last durable change left it
+        for seq, record in reversed(self._unsynced):
+            if seq < first:
+                break
+            if record["op"] == "create" or record["previous"] is None:
+                self.trades.pop(record["id"], None)
+                self._seqs.pop(record["id"], None)
+            else:
+                self.trades[record["id"]] = record["previous"]
+                # Upper bound on when the restored version was logged
+                self._seqs[record["id"]] = first - 1
+        self._unsynced.clear()
+        if self.replicator:
+            self.replicator.discard(first, last)
+
+    def get(self, trade_id: str) -> Optional[dict]:
+        return self.trades.get(trade_id)
+
+    def pending(self) -> List[dict]:
+        """Trades held in memory, which Firestore may not have yet."""
+        with self._lock:
+            return list(self.trades.values())
+
+    def _compact(self):
+        """Drop trades whose latest change Firestore already has. Call with the lock held."""
+        if self.replicator is None:
+            return
+        replicated = self.replicator.replicated_seq
+        for trade_id in [trade_id for trade_id, seq in self._seqs.items() if seq <= replicated]:
+            del self.trades[trade_id]
+            del self._seqs[trade_id]
+
+    def _snapshot_loop(self):
+        while True:
+            self._snapshot_due.wait()
+            self._snapshot_due.clear()
+            try:
+                self.snapshot(min_records=self.snapshot_every)
+            except Exception as exc:
+                print(f"Error snapshotting the trade ledger: {exc}")
+
+    def snapshot(self, min_records: int = 1):
+        """Snapshot the state if at least `min_records` were logged since the last one.
+
+        Only compacting and copying the state hold the commit lock; writing
+        the snapshot does not.
+        """
+        with self._snapshot_lock:
+            with self._lock:
+                seq = self.wal.last_seq
+                if seq - self._snapshot_seq < min_records:
+                    return
+                self._compact()
+                # Records are replaced, never mutated, so a shallow copy is stable
+                trades = dict(self.trades)
+                self._snapshot_seq = seq
+            # Records logged after the copy may land in the old segment; it
+            # stays until a later snapshot covers them
+            self.wal.rotate()
+            self.snapshots.save(seq, trades)
+            # Segments may only go once both the snapshot and Firestore have them
+            replicated = self.replicator.replicated_seq if self.replicator else seq
+            self.wal.remove_through(min(seq, replicated))
@@ -1,9 +1,9 @@
 # core/services/user_service.py
 
-from typing import List
+from typing import List, Optional
 from fastapi import HTTPException, status
 from google.cloud import firestore
-from schemas.user import UserResponse, UserUpdate
+from schemas.user import UserCreate, UserResponse, UserUpdate
 
 
 class UserService:
@@ -11,6 +11,25 @@ class UserService:
         self.db = firestore.Client()
         self.users_collection = self.db.collection("users")
 
+    def create_user(self, user_data: UserCreate, hashed_password: str) -> UserResponse:
+        """Create a user; the password must already be hashed"""
+        if self.get_user_record_by_username(user_data.username):
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Username already taken")
+        user_ref = self.users_collection.document()
+        user = UserResponse(id=user_ref.id, **user_data.dict(exclude={"password"}))
+        user_ref.set({**user.dict(), "hashed_password": hashed_password})
+        return user
+
+    def get_user_record_by_username(self, username: str) -> Optional[dict]:
+        """Retrieve the stored user document, including the password hash"""
+        docs = self.users_collection.where("username", "==", username).limit(1).stream()
+        for doc in docs:
+            return {**doc.to_dict(), "id": doc.id}
+        return None
+
+    def update_password_hash(self, user_id: str, hashed_password: str) -> None:
+        self.users_collection.document(user_id).update({"hashed_password": hashed_password})
+
     def get_user_by_id(self, user_id: str) -> UserResponse:
         user_ref = self.users_collection.document(user_id)
         user = user_ref.get()
@@ -33,15 +52,32 @@ class UserService:
         if not user.exists:
             raise HTTPException(status.HTTP_404_NOT_FOUND, detail="User not found")
 
-        update_data_dict = vars(update_data)
+        # Only the fields sent, so an update never clears the others
+        update_data_dict = update_data.dict(exclude_unset=True)
 
         user_ref.update(update_data_dict)
-        return UserResponse(**update_data_dict)
+        return UserResponse(**{**user.to_dict(), **update_data_dict})
+
+    def link_wallet(self, user_id: str, wallet_address: str) -> UserResponse:
+        """Record a wallet whose ownership the caller has proven"""
+        for doc in self.users_collection.where("wallet_address", "==", wallet_address).limit(2).stream():
+            if doc.id != user_id:
+                raise HTTPException(
+                    status.HTTP_409_CONFLICT, detail="Wallet is linked to another user"
+                )
+        user_ref = self.users_collection.document(user_id)
+        user = user_ref.get()
+        if not user.exists:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="User not found")
+        wallet = {"wallet_address": wallet_address, "wallet_verified": True}
+        user_ref.update(wallet)
+        return UserResponse(**{**user.to_dict(), **wallet})
 
-    def delete_user(self, user_id: str) -> None:
+    def delete_user(self, user_id: str) -> bool:
         user_ref = self.users_collection.document(user_id)
         user = user_ref.get()
         if not user.exists:
             raise HTTPException(status.HTTP_404_NOT_FOUND, detail="User not found")
 
         user_ref.delete()
+        return True
@@ -0,0 +1,146 @@
+# core/services/vote_snapshot.py
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+# Owner lookups per JSON-RPC batch request; providers cap batch size around 100
+RPC_CHUNK_SIZE = 100
+# Voters per Firestore snapshot document; keeps each well under the 1MB limit
+STORAGE_CHUNK_SIZE = 10000
+
+
+class SnapshotError(Exception):
+    """Raised when holder balances cannot be captured"""
+
+
+def fetch_wallet_balances(
+    endpoint: str,
+    wallets: List[str],
+    mint: str,
+    timeout: float = 30,
+) -> Tuple[int, Dict[str, int]]:
+    """
+    Read each wallet's total balance of `mint` across all its token accounts.
+
+    Wallets are looked up with getTokenAccountsByOwner, RPC_CHUNK_SIZE per
+    JSON-RPC batch request. Returns the slot the balances were read at and
+    raw token amounts by wallet. Every batch after the first is pinned to at
+    least the first one's slot with `minContextSlot`, and the highest slot
+    seen is returned.
+    """
+    balances: Dict[str, int] = {}
+    slot = 0
+    with requests.Session() as session:
+        for start in range(0, len(wallets), RPC_CHUNK_SIZE):
+            chunk = wallets[start : start + RPC_CHUNK_SIZE]
+            config = {"encoding": "jsonParsed", "commitment": "finalized"}
+            if slot:
+                config["minContextSlot"] = slot
+            response = session.post(
+                endpoint,
+                json=[
+                    {
+                        "jsonrpc": "2.0",
+                        "id": n,
+                        "method": "getTokenAccountsByOwner",
+                        "params": [wallet, {"mint": mint}, config],
+                    }
+                    for n, wallet in enumerate(chunk)
+                ],
+                timeout=timeout,
+            )
+            response.raise_for_status()
+            replies = response.json()
+            if not isinstance(replies, list):
+                raise SnapshotError(replies.get("error", {}).get("message", "RPC error"))
+
+            for reply in sorted(replies, key=lambda reply: reply["id"]):
+                if "error" in reply:
+                    raise SnapshotError(reply["error"].get("message", "RPC error"))
+                wallet = chunk[reply["id"]]
+                slot = max(slot, reply["result"]["context"]["slot"])
+                balances[wallet] = sum(
+                    _token_amount(account["account"], mint, wallet)
+                    for account in reply["result"]["value"]
+                )
+            if len(replies) != len(chunk):
+                raise SnapshotError(f"RPC answered {len(replies)} of {len(chunk)} balance requests")
+    return slot, balances
+
+
+def _token_amount(value: Optional[dict], mint: Optional[str], owner: Optional[str]) -> int:
+    try:
+        info = value["data"]["parsed"]["info"]
+    except (KeyError, TypeError):
+        return 0  # Missing account or not a token account
+    if mint and info.get("mint") != mint:
+        return 0
+    if owner and info.get("owner") != owner:
+        return 0  # Someone else's tokens
+    return int(info["tokenAmount"]["amount"])
+
+
+class VoteSnapshot:
+    """
+    Holder balances frozen at one slot.
+
+    Voter IDs are kept sorted in a NumPy array with raw balances as uint64
+    alongside, so weights for a whole set of votes are found with one
+    vectorised binary search.
+    """
+
+    def __init__(self, slot: int, voters: np.ndarray, balances: np.ndarray):
+        self.slot = slot
+        self.voters = voters
+        self.balances = balances
+
+    @classmethod
+    def from_balances(cls, slot: int, balances: Dict[str, int]) -> "VoteSnapshot":
+        voters = np.array(sorted(balances), dtype=str)
+        return cls(
+            slot,
+            voters,
+            np.fromiter((balances[voter] for voter in voters.tolist()), dtype=np.uint64, count=len(voters)),
+        )
+
+    @property
+    def total_weight(self) -> int:
+        return sum(self.balances.tolist())
+
+    def to_chunks(self) -> List[dict]:
+        """Split into Firestore documents; balances are packed as bytes."""
+        return [
+            {
+                "voters": self.voters[start : start + STORAGE_CHUNK_SIZE].tolist(),
+                "balances": self.balances[start : start + STORAGE_CHUNK_SIZE].astype("<u8").tobytes(),
+            }
+            for start in range(0, len(self.voters), STORAGE_CHUNK_SIZE)
+        ]
+
+    @classmethod
+    def from_chunks(cls, slot: int, chunks: List[dict]) -> "VoteSnapshot":
+        voters = [voter for chunk in chunks for voter in chunk["voters"]]
+        balances = b"".join(chunk["balances"] for chunk in chunks)
+        return cls(
+            slot,
+            np.array(voters, dtype=str),
+            np.frombuffer(balances, dtype="<u8").astype(np.uint64),
+        )
+
+    def tally(self, voter_ids: List[str], choices: List[str], options: Tuple[str, ...]) -> Dict[str, int]:
+        """Sum snapshot balances per choice; voters outside the snapshot weigh 0."""
+        if not voter_ids or not len(self.voters):
+            return dict.fromkeys(options, 0)
+        voter_ids = np.array(voter_ids, dtype=str)
+        index = np.searchsorted(self.voters, voter_ids)
+        index[index == len(self.voters)] = 0
+        weights = np.where(self.voters[index] == voter_ids, self.balances[index], np.uint64(0))
+        choice_index = np.array([options.index(choice) for choice in choices])
+        # Masked uint64 sums stay exact where float-weighted bincount would
+        # not; balances of one mint cannot sum past its u64 supply
+        return {
+            option: int(weights[choice_index == n].sum(dtype=np.uint64))
+            for n, option in enumerate(options)
+        }
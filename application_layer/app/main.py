@@ -1,13 +1,17 @@
 import os
 
 import uvicorn
-from api.routers import robot, software, trade, design
+from api.routers import robot, software, trade, design, governance, user
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
+from construct_shared.audit import AuditLog, install_audit
+from construct_shared.rate_limit import RateLimit, RateLimitMiddleware, create_backend
+from core.config.settings import settings
+
 # Initializes FastAPI app instance
 app = FastAPI(title="The Construct DEX", version="1.0.0")
 
@@ -15,7 +19,30 @@ app = FastAPI(title="The Construct DEX", version="1.0.0")
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
 
-# Set up CORS middleware
+# Per-IP, per-API-key and per-route token buckets; trade writes hit Firestore
+# hardest so they get their own tighter bucket
+app.add_middleware(
+    RateLimitMiddleware,
+    limits=[
+        RateLimit("ip", settings.RATE_LIMIT_IP_RATE, settings.RATE_LIMIT_IP_BURST),
+        RateLimit("api_key", settings.RATE_LIMIT_KEY_RATE, settings.RATE_LIMIT_KEY_BURST),
+        RateLimit(
+            "route",
+            settings.RATE_LIMIT_TRADES_RATE,
+            settings.RATE_LIMIT_TRADES_BURST,
+            path_prefix="/trades",
+        ),
+    ],
+    backend=create_backend(settings.REDIS_URL),
+    trust_forwarded=settings.RATE_LIMIT_TRUST_FORWARDED,
+)
+
+# Audit trail of every write, with the actor taken from the verified access
+# token (see get_current_user). Configured by the AUDIT_* environment variables.
+install_audit(app, AuditLog.from_env(service="application_layer"))
+
+# Set up CORS middleware. Added after the rate limiter so it wraps it and
+# 429s carry CORS headers too.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -39,9 +66,9 @@ app.add_exception_handler(HTTPException, error_response_handler)
 app.include_router(robot.router, prefix="/robots", tags=["robots"])
 app.include_router(software.router, prefix="/software", tags=["software"])
 app.include_router(design.router, prefix="/design", tags=["design"])
-# app.include_router(user.router, prefix="/users", tags=["users"])
+app.include_router(user.router, prefix="/users", tags=["users"])
 app.include_router(trade.router, prefix="/trades", tags=["trades"])
-# app.include_router(governance.router, prefix="/governance", tags=["governance"])
+app.include_router(governance.router, prefix="/governance", tags=["governance"])
 
 
 # Define root route
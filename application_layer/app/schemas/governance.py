@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field, validator
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
+
+VOTE_CHOICES = ("For", "Against", "Abstain")
 
 
 class ProposalCreate(BaseModel):
@@ -10,14 +12,16 @@ class ProposalCreate(BaseModel):
     description: Optional[str] = Field(
         None, description="A detailed description of the governance proposal"
     )
-    creator_id: int = Field(..., description="The ID of the user creating the proposal")
+    token_mint: Optional[str] = Field(
+        None, description="SPL token mint whose holders' votes are weighted by balance"
+    )
 
     class Config:
         schema_extra = {
             "example": {
                 "title": "Upgrade DEX Protocol",
                 "description": "A proposal to upgrade the underlying DEX protocol to version 2.0",
-                "creator_id": 123,
+                "token_mint": "4k3Dyjzvzp8eMZWUXbBCjEvwSkkk59S5iCNLY3QrkX6R",
             }
         }
 
@@ -25,15 +29,22 @@ class ProposalCreate(BaseModel):
 class ProposalResponse(BaseModel):
     """Proposal Response Model"""
 
-    id: int = Field(..., description="The unique ID of the governance proposal")
+    id: str = Field(..., description="The unique ID of the governance proposal")
     title: str
     description: Optional[str]
-    creator_id: int
+    creator_id: str
     created_at: datetime = Field(
         default_factory=datetime.now,
         description="Timestamp when the proposal was created",
     )
-    status: str = Field(..., description="Current status of the proposal")
+    status: str = Field(
+        ...,
+        description="Pending (token-weighted, awaiting its balance snapshot), Voting or closed",
+    )
+    token_mint: Optional[str] = None
+    snapshot_slot: Optional[int] = Field(
+        None, description="Slot holder balances were captured at, once snapshotted"
+    )
 
     class Config:
         """Config"""
@@ -41,10 +52,10 @@ class ProposalResponse(BaseModel):
         orm_mode = True
         schema_extra = {
             "example": {
-                "id": 1,
+                "id": "9jQmT2kq0bYx",
                 "title": "Upgrade DEX Protocol",
                 "description": "A proposal to upgrade the underlying DEX protocol to version 2.0",
-                "creator_id": 123,
+                "creator_id": "123",
                 "created_at": datetime.now(),
                 "status": "Voting",
             }
@@ -52,10 +63,8 @@ class ProposalResponse(BaseModel):
 
 
 class VoteCreate(BaseModel):
-    """Create Vote Model"""
+    """Create Vote Model; the voter is the authenticated caller"""
 
-    proposal_id: int = Field(..., description="The ID of the proposal being voted on")
-    voter_id: int = Field(..., description="The ID of the user casting the vote")
     vote: str = Field(
         ..., description="The user's vote ('For', 'Against', or 'Abstain')"
     )
@@ -63,22 +72,22 @@ class VoteCreate(BaseModel):
     @validator("vote")
     def validate_vote(cls, v):
         """Validate vote"""
-        if v not in ("For", "Against", "Abstain"):
+        if v not in VOTE_CHOICES:
             raise ValueError('Vote must be "For", "Against", or "Abstain"')
         return v
 
     class Config:
         """Config"""
 
-        schema_extra = {"example": {"proposal_id": 1, "voter_id": 456, "vote": "For"}}
+        schema_extra = {"example": {"vote": "For"}}
 
 
 class VoteResponse(BaseModel):
     """Vote Response"""
 
-    id: int = Field(..., description="The unique ID of the vote")
-    proposal_id: int
-    voter_id: int
+    id: str = Field(..., description="The unique ID of the vote")
+    proposal_id: str
+    voter_id: str
     vote: str
     voted_at: datetime = Field(
         default_factory=datetime.now, description="Timestamp when the vote was cast"
@@ -90,10 +99,48 @@ class VoteResponse(BaseModel):
         orm_mode = True
         schema_extra = {
             "example": {
-                "id": 1,
-                "proposal_id": 1,
-                "voter_id": 456,
+                "id": "456",
+                "proposal_id": "9jQmT2kq0bYx",
+                "voter_id": "456",
                 "vote": "For",
                 "voted_at": datetime.now(),
             }
         }
+
+
+class TallyResponse(BaseModel):
+    """Tally Response"""
+
+    proposal_id: str
+    counts: Dict[str, int] = Field(..., description="Votes per choice")
+    total: int
+
+    class Config:
+        """Config"""
+
+        schema_extra = {
+            "example": {
+                "proposal_id": "9jQmT2kq0bYx",
+                "counts": {"For": 120, "Against": 45, "Abstain": 7},
+                "total": 172,
+            }
+        }
+
+
+class SnapshotResponse(BaseModel):
+    """Balance Snapshot Response"""
+
+    proposal_id: str
+    slot: int = Field(..., description="Slot the balances were read at")
+    holders: int = Field(..., description="Voters with a linked wallet holding the token")
+    total_weight: int = Field(..., description="Sum of raw token balances in the snapshot")
+
+
+class WeightedTallyResponse(BaseModel):
+    """Token-weighted Tally Response"""
+
+    proposal_id: str
+    slot: int
+    weights: Dict[str, int] = Field(..., description="Raw token balance voting for each choice")
+    total: int
+    snapshot_weight: int = Field(..., description="Total balance eligible to vote")
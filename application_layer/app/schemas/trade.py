@@ -1,5 +1,6 @@
 from datetime import datetime
-from typing import Optional
+from enum import Enum
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -40,10 +41,14 @@ class TradeUpdate(BaseModel):
 
 # Schema for responding with trade data
 class TradeResponse(BaseModel):
+    id: Optional[str] = None
     robot_id: str
     software_id: str
     user_id: str
     price: float
+    quantity: Optional[float] = None
+    buyer_id: Optional[str] = None
+    seller_id: Optional[str] = None
     trade_date: Optional[datetime] = Field(
         default_factory=datetime.now, description="The date and time of the trade"
     )
@@ -63,3 +68,114 @@ class TradeResponse(BaseModel):
                 "status": "Completed",
             }
         }
+
+
+class OrderSide(str, Enum):
+    """Order Side"""
+
+    buy = "buy"
+    sell = "sell"
+
+
+class AssetType(str, Enum):
+    """Tradable Asset Type"""
+
+    robot = "robot"
+    software = "software"
+
+
+# Schema for a page of trade history
+class TradePage(BaseModel):
+    items: List[TradeResponse]
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as `cursor` to fetch the next page; null on the last page"
+    )
+
+
+# Schema for a user's denormalised trade summary
+class TradeSummary(BaseModel):
+    user_id: str
+    trade_count: int = 0
+    volume: float = 0.0
+    notional: float = 0.0
+    status_counts: Dict[str, int] = {}
+    recent: List[TradeResponse] = []
+
+
+# Schema for placing an order on an asset's order book
+class OrderCreate(BaseModel):
+    asset_id: str = Field(..., description="The robot_id or software_id being traded")
+    asset_type: AssetType = Field(..., description="Whether the asset is a robot or software")
+    user_id: str = Field(..., description="The ID of the user placing the order")
+    side: OrderSide
+    price: Optional[float] = Field(
+        None, gt=0, description="Limit price in CONSTRUCT tokens; omit for a market order"
+    )
+    quantity: float = Field(..., gt=0, description="Units to buy or sell")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "asset_id": "12987",
+                "asset_type": "robot",
+                "user_id": "100154678",
+                "side": "buy",
+                "price": 150.00,
+                "quantity": 2,
+            }
+        }
+
+
+# A single match between a resting order and an incoming order
+class Fill(BaseModel):
+    maker_order_id: str
+    taker_order_id: str
+    buyer_id: str
+    seller_id: str
+    price: float
+    quantity: float
+
+
+# Schema for responding to an order placement
+class OrderResponse(BaseModel):
+    order_id: str
+    asset_id: str
+    side: OrderSide
+    price: Optional[float]
+    quantity: float
+    remaining: float
+    status: str = Field(..., description="Open, PartiallyFilled, Filled or Cancelled")
+    fills: List[Fill] = []
+
+
+class BookLevel(BaseModel):
+    price: float
+    quantity: float
+    orders: int
+
+
+# Schema for an order book depth snapshot
+class BookSnapshot(BaseModel):
+    asset_id: str
+    bids: List[BookLevel]
+    asks: List[BookLevel]
+
+
+# Rolling-window statistics for one asset
+class AssetStats(BaseModel):
+    asset_id: str
+    volume: float
+    notional: float = Field(..., description="Sum of price x quantity in CONSTRUCT tokens")
+    trade_count: int
+    vwap: Optional[float] = Field(None, description="Volume-weighted average price")
+    score: Optional[int] = Field(None, description="Estimated trade count used for trending")
+
+
+# Schema for marketplace statistics over the rolling window
+class TradeStats(BaseModel):
+    window_minutes: int
+    volume: float
+    notional: float
+    trade_count: int
+    vwap: Optional[float]
+    trending: List[AssetStats]
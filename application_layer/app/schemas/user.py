@@ -2,6 +2,9 @@ from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 
+# Base58 Solana address
+WALLET_ADDRESS_PATTERN = r"^[1-9A-HJ-NP-Za-km-z]{32,44}$"
+
 
 # Schema to represent user creation requests
 class UserCreate(BaseModel):
@@ -18,10 +21,14 @@ class UserCreate(BaseModel):
 class UserResponse(BaseModel):
     """User Response Model"""
 
-    id: int = Field(..., example=1)
+    id: str = Field(..., example="8bKq3xWlZ2")
     username: str
     email: str
     full_name: Optional[str]
+    wallet_address: Optional[str] = Field(
+        None, description="Solana wallet whose token accounts back the user's governance votes"
+    )
+    wallet_verified: bool = Field(False, description="Whether the wallet signed an ownership proof")
     is_active: bool = Field(True)
     created_at: datetime = Field(default_factory=datetime.now)
 
@@ -31,6 +38,21 @@ class UserResponse(BaseModel):
         orm_mode = True  
 
 
+# Schema for another user's profile: the fields anyone signed in may see
+class UserPublic(BaseModel):
+    """Public User Model"""
+
+    id: str = Field(..., example="8bKq3xWlZ2")
+    username: str
+    is_active: bool = Field(True)
+    created_at: datetime = Field(default_factory=datetime.now)
+
+    class Config:
+        """Config"""
+
+        orm_mode = True
+
+
 # Schema for user update requests (all fields optional for partial updates)
 class UserUpdate(BaseModel):
     """Update User Model"""
@@ -38,7 +60,8 @@ class UserUpdate(BaseModel):
     email: Optional[str] = Field(None, example="newemail@example.com")
     full_name: Optional[str] = Field(None, example="New Name")
     # Not including a password field here for simplicity; password updates would
-    # typically be handled by a separate endpoint.
+    # typically be handled by a separate endpoint. Wallets are linked through
+    # PUT /users/me/wallet, which requires proof of ownership.
 
     class Config:
         """Config"""
@@ -46,9 +69,37 @@ class UserUpdate(BaseModel):
         orm_mode = True  
 
 
+# Message a wallet signs to prove it belongs to the user linking it
+class WalletChallenge(BaseModel):
+    """Wallet Challenge Model"""
+
+    wallet_address: str
+    issued_at: datetime
+    message: str = Field(..., description="Sign exactly this text with the wallet")
+
+
+# Signed proof submitted to link a wallet
+class WalletProof(BaseModel):
+    """Wallet Proof Model"""
+
+    wallet_address: str = Field(
+        ..., regex=WALLET_ADDRESS_PATTERN, example="7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU"
+    )
+    issued_at: datetime = Field(..., description="issued_at from the challenge")
+    signature: str = Field(..., description="Base58 ed25519 signature of the challenge message")
+
+
 # Schema for user authentication - used for login operations.
 class UserLogin(BaseModel):
     """User Login Model"""
 
     username: str = Field(..., example="roboticist123")
     password: str = Field(..., min_length=8, example="securepassword123")
+
+
+# Schema for the access token returned after a successful login.
+class Token(BaseModel):
+    """Access Token Model"""
+
+    access_token: str
+    token_type: str = "bearer"
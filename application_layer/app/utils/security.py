@@ -1,10 +1,17 @@
 # core/utils/security.py
 
-# from passlib.context import CryptContext
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from jose import jwt
 from typing import Optional
 
+import bcrypt
+from jose import jwk, jwt
+
 from core.config.settings import settings
 
 # To get a string like this run:
@@ -13,29 +20,177 @@ SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
-# pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt only uses the first 72 bytes of a password. Older bcrypt releases
+# truncated silently and bcrypt 5 raises instead, so truncate explicitly to
+# keep hashing working and existing hashes verifiable.
+BCRYPT_MAX_BYTES = 72
+
+
+def _password_bytes(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
 
+def _hash_rounds(hashed_password: str) -> int:
+    # Hashes look like $2b$12$<salt and digest>
+    return int(hashed_password.split("$")[2])
+
+
+# These are CPU-bound (~100ms each); async code should go through
+# core.services.password_service rather than calling them on the event loop.
 def verify_password(plain_password, hashed_password):
-    return 
-# pwd_context.verify(plain_password, hashed_password)
+    try:
+        return bcrypt.checkpw(_password_bytes(plain_password), hashed_password.encode())
+    except ValueError:
+        return False  # Not a bcrypt hash
 
 def get_password_hash(password):
-    return 
-# pwd_context.hash(password)
+    salt = bcrypt.gensalt(rounds=settings.PASSWORD_BCRYPT_ROUNDS)
+    return bcrypt.hashpw(_password_bytes(password), salt).decode()
+
+def verify_and_update_password(plain_password, hashed_password):
+    """Return (valid, new_hash); new_hash is set when the hash has fewer rounds than configured."""
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if _hash_rounds(hashed_password) < settings.PASSWORD_BCRYPT_ROUNDS:
+        return True, get_password_hash(plain_password)
+    return True, None
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+class KeySet:
+    """
+    Signing keys indexed by key ID, parsed once up front.
+
+    Keys come from a JWK Set (`JWT_JWKS`) or, without one, from `SECRET_KEY`
+    as a single HS256 key. `rotate` swaps in a new set in one assignment, so
+    verifications in flight keep using the set they started with. Each key
+    has a fingerprint of its material, so caches can tell a kid that was
+    reused for a new key from the key they saw.
+
+    Raises ValueError when there is no usable key: neither a JWKS nor a
+    SECRET_KEY, or a symmetric key that is empty. Anyone could forge tokens
+    signed with an empty key.
+    """
+
+    def __init__(self, jwks: Optional[dict] = None, signing_kid: str = "default"):
+        self.signing_kid = signing_kid
+        self.rotate(jwks)
+
+    def rotate(self, jwks: Optional[dict] = None, signing_kid: Optional[str] = None):
+        """Replace the key set, e.g. after fetching a new JWKS document."""
+        if jwks is None:
+            if not SECRET_KEY:
+                raise ValueError("Set JWT_JWKS or a non-empty SECRET_KEY to sign access tokens")
+            jwks = {"keys": [{"kty": "oct", "kid": signing_kid or self.signing_kid, "alg": ALGORITHM,
+                              "k": _b64url(SECRET_KEY.encode())}]}
+        keys, fingerprints = {}, {}
+        for key_data in jwks["keys"]:
+            kid = key_data.get("kid", "default")
+            if key_data.get("kty") == "oct" and not key_data.get("k"):
+                raise ValueError(f"Symmetric JWT key {kid} is empty")
+            algorithm = key_data.get("alg", ALGORITHM)
+            keys[kid] = (jwk.construct(key_data, algorithm), algorithm)
+            fingerprints[kid] = hashlib.sha256(
+                json.dumps(key_data, sort_keys=True).encode()
+            ).digest()
+        if not keys:
+            raise ValueError("The JWT key set has no keys")
+        # One assignment, so readers never see keys and fingerprints disagree
+        self._state = (keys, fingerprints)
+        if signing_kid:
+            self.signing_kid = signing_kid
+
+    @property
+    def keys(self):
+        return self._state[0]
+
+    def get(self, kid: Optional[str]):
+        """Return the (key, algorithm) pair for `kid`, or None if unknown."""
+        return self.keys.get(kid or self.signing_kid)
+
+    def lookup(self, kid: Optional[str]):
+        """Return (key, algorithm, fingerprint) for `kid`, or None if unknown."""
+        keys, fingerprints = self._state
+        kid = kid or self.signing_kid
+        key = keys.get(kid)
+        return None if key is None else (*key, fingerprints[kid])
+
+    def fingerprint(self, kid: str) -> Optional[bytes]:
+        return self._state[1].get(kid)
+
+
+class TokenVerifier:
+    """
+    Verifies JWTs, remembering recent successes.
+
+    Verified claims are cached in a bounded LRU keyed by the SHA-256 digest
+    of the token, so a client reusing its token skips the signature check.
+    Entries are dropped once the token's `exp` passes, or when the key that
+    signed it is rotated out or replaced under the same kid.
+    """
+
+    def __init__(self, keys: KeySet, max_size: int):
+        self.keys = keys
+        self.max_size = max_size
+        self._cache = OrderedDict()  # digest -> (claims, exp, kid, key fingerprint)
+        self._lock = threading.Lock()
+
+    def verify(self, token: str) -> Optional[dict]:
+        """Return the token's claims, or None if it is invalid or expired."""
+        digest = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is not None:
+                claims, exp, kid, fingerprint = entry
+                if exp > now and self.keys.fingerprint(kid) == fingerprint:
+                    self._cache.move_to_end(digest)
+                    return dict(claims)
+                del self._cache[digest]
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid") or self.keys.signing_kid
+            key = self.keys.lookup(kid)
+            if key is None:
+                return None
+            claims = jwt.decode(token, key[0], algorithms=[key[1]])
+        except jwt.JWTError:
+            return None
+        exp = claims.get("exp")
+        if exp is None:
+            # Tokens without an expiry are not accepted
+            return None
+
+        with self._lock:
+            self._cache[digest] = (claims, exp, kid, key[2])
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return dict(claims)
+
+
+key_set = KeySet(
+    json.loads(settings.JWT_JWKS) if settings.JWT_JWKS else None,
+    signing_kid=settings.JWT_SIGNING_KID,
+)
+token_verifier = TokenVerifier(key_set, settings.JWT_CACHE_SIZE)
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
+        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    key, algorithm = key_set.get(key_set.signing_kid)
+    encoded_jwt = jwt.encode(
+        to_encode, key, algorithm=algorithm, headers={"kid": key_set.signing_kid}
+    )
     return encoded_jwt
 
 def decode_access_token(token: str):
-    try:
-        decoded_token = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return decoded_token if decoded_token["exp"] >= datetime.timestamp(datetime.utcnow()) else None
-    except jwt.JWTError:
-        return None
\ No newline at end of file
+    # Signature and exp are checked by the verifier; repeat tokens hit its cache
+    return token_verifier.verify(token)
@@ -0,0 +1,61 @@
+# utils/wallet.py
+
+"""
+Solana wallet ownership proofs
+
+A user links a wallet by signing, with the wallet's key, a message naming
+their user ID, the wallet and when it was issued (`signMessage` in a browser
+wallet). Because the message names the user, a signature can only ever link
+the wallet to that user, so no challenge state is kept on the server.
+"""
+from datetime import datetime, timedelta, timezone
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+# Signed messages are accepted for this long after they were issued
+PROOF_MAX_AGE = timedelta(minutes=10)
+
+
+def b58decode(value: str) -> bytes:
+    """Decode a base58 string (Bitcoin alphabet, as used by Solana)."""
+    number = 0
+    for char in value:
+        index = B58_ALPHABET.find(char)
+        if index < 0:
+            raise ValueError(f"Invalid base58 character {char!r}")
+        number = number * 58 + index
+    leading_zeros = len(value) - len(value.lstrip("1"))
+    return b"\0" * leading_zeros + number.to_bytes((number.bit_length() + 7) // 8, "big")
+
+
+def ownership_message(user_id: str, wallet_address: str, issued_at: datetime) -> str:
+    """The exact text the wallet must sign."""
+    return (
+        "The Construct: link this wallet to my account\n"
+        f"User: {user_id}\n"
+        f"Wallet: {wallet_address}\n"
+        f"Issued: {issued_at.isoformat()}"
+    )
+
+
+def verify_ownership(user_id: str, wallet_address: str, issued_at: datetime, signature: str) -> bool:
+    """Whether `signature` (base58) is the wallet's signature of a recent ownership message."""
+    if issued_at.tzinfo is None:
+        issued_at = issued_at.replace(tzinfo=timezone.utc)
+    now = datetime.now(timezone.utc)
+    # A minute of slack for clients whose clocks run ahead
+    if not now - PROOF_MAX_AGE <= issued_at <= now + timedelta(minutes=1):
+        return False
+    try:
+        public_key = b58decode(wallet_address)
+        if len(public_key) != 32:
+            return False
+        Ed25519PublicKey.from_public_bytes(public_key).verify(
+            b58decode(signature),
+            ownership_message(user_id, wallet_address, issued_at).encode("utf-8"),
+        )
+    except (ValueError, InvalidSignature):
+        return False
+    return True
@@ -0,0 +1,74 @@
+"""
+Order book matching benchmark
+
+Submits a stream of random limit and market orders from many users to one
+book and reports orders/sec and per-order match latency, then cancels the
+resting orders in random order to time cancellation on deep levels. Fills
+are not persisted, so this measures the matching engine alone. Run from the
+application_layer directory, e.g.:
+
+    SECRET_KEY=x python benchmarks/order_book.py --orders 200000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from core.services.order_book import MatchingEngine  # noqa: E402
+from schemas.trade import OrderCreate  # noqa: E402
+
+
+def random_orders(count: int, users: int, levels: int, market_share: float):
+    rng = random.Random(42)
+    for _ in range(count):
+        market = rng.random() < market_share
+        yield OrderCreate(
+            asset_id="bench",
+            asset_type="robot",
+            user_id=f"user-{rng.randrange(users)}",
+            side=rng.choice(("buy", "sell")),
+            price=None if market else 100 + rng.randrange(-levels, levels) * 0.5,
+            quantity=rng.randint(1, 10),
+        )
+
+
+def main(args):
+    engine = MatchingEngine()
+    orders = list(random_orders(args.orders, args.users, args.levels, args.market_share))
+
+    latencies = []
+    resting = []
+    fills = 0
+    start = time.perf_counter()
+    for order in orders:
+        order_start = time.perf_counter()
+        result = engine.submit(order)
+        latencies.append(time.perf_counter() - order_start)
+        fills += len(result.fills)
+        if result.status in ("Open", "PartiallyFilled") and result.price is not None:
+            resting.append(result.order_id)
+    elapsed = time.perf_counter() - start
+
+    random.Random(7).shuffle(resting)
+    cancel_start = time.perf_counter()
+    cancelled = sum(engine.cancel(order_id) is not None for order_id in resting)
+    cancel_us = (time.perf_counter() - cancel_start) / max(len(resting), 1) * 1e6
+
+    latencies.sort()
+    print(f"orders:  {len(orders)} in {elapsed:.2f}s ({len(orders) / elapsed:,.0f}/s), {fills} fills")
+    print(f"latency: p50 {statistics.median(latencies) * 1e6:.1f}us, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e6:.1f}us, max {latencies[-1] * 1e6:.1f}us")
+    print(f"cancel:  {cancelled} resting orders at {cancel_us:.1f}us each")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--levels", type=int, default=50, help="Price levels either side of 100")
+    parser.add_argument("--market-share", type=float, default=0.1, help="Fraction of market orders")
+    main(parser.parse_args())
@@ -0,0 +1,99 @@
+"""
+Registration and login load test
+
+Registers `--users` accounts, then logs them all in at once while a probe
+keeps requesting the root page. Password hashing runs in a process pool, so
+the probe's latency should stay flat during the burst; logins beyond
+PASSWORD_HASH_MAX_PENDING come back as 503s and are retried. Run against a
+server using a test ENVIR:
+
+    pip install "httpx[http2]"
+    python load_tests/auth_login.py --url http://localhost:8080 --users 500
+
+Raise RATE_LIMIT_IP_RATE / RATE_LIMIT_IP_BURST on the server first, or
+requests will mostly be retried after 429s.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def post(client, url, body, latencies, counters, max_retries=50):
+    for _ in range(max_retries):
+        start = time.perf_counter()
+        response = await client.post(url, json=body)
+        if response.status_code in (429, 503):
+            counters[response.status_code] += 1
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+            continue
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        return response.json()
+    raise RuntimeError(f"{url} kept being rejected")
+
+
+async def probe(client, done: asyncio.Event, latencies):
+    """Request a cheap page in a loop to measure event loop responsiveness."""
+    while not done.is_set():
+        start = time.perf_counter()
+        (await client.get("/")).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+
+
+def report(name, latencies, elapsed=None):
+    latencies.sort()
+    rate = f" in {elapsed:.1f}s ({len(latencies) / elapsed:.0f}/s)" if elapsed else ""
+    print(f"{name}: {len(latencies)}{rate}, p50 {statistics.median(latencies) * 1000:.0f}ms, "
+          f"p99 {latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000:.0f}ms")
+
+
+async def main(args):
+    run = uuid.uuid4().hex[:8]
+    users = [
+        {"username": f"load-{run}-{n}", "email": f"load-{run}-{n}@example.com", "password": f"pw-{run}-{n}"}
+        for n in range(args.users)
+    ]
+    limits = httpx.Limits(max_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=120) as client:
+        counters = {429: 0, 503: 0}
+
+        latencies = []
+        start = time.perf_counter()
+        await asyncio.gather(*(post(client, "/users/", user, latencies, counters) for user in users))
+        report("register", latencies, time.perf_counter() - start)
+
+        done = asyncio.Event()
+        probe_latencies = []
+        probing = asyncio.ensure_future(probe(client, done, probe_latencies))
+        latencies = []
+        start = time.perf_counter()
+        tokens = await asyncio.gather(*(
+            post(client, "/users/login", {"username": user["username"], "password": user["password"]},
+                 latencies, counters)
+            for user in users
+        ))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probing
+        report("login", latencies, elapsed)
+        report("probe during logins", probe_latencies)
+        print(f"Retried after 429: {counters[429]}, after 503: {counters[503]}")
+
+        token = tokens[0]["access_token"]
+        me = await client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+        me.raise_for_status()
+        if me.json()["username"] != users[0]["username"]:
+            raise SystemExit("/users/me returned the wrong user")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--connections", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
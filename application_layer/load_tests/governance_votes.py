@@ -0,0 +1,105 @@
+"""
+Governance voting load test
+
+Registers `--voters` users and logs them in (setup, not timed), creates a
+proposal, has every voter vote on it at once with their own token, then
+checks the sharded tally matches the votes sent. A fraction of voters vote
+twice to exercise idempotency. Run against a server using a test ENVIR:
+
+    pip install "httpx[http2]"
+    python load_tests/governance_votes.py --url http://localhost:8080 --voters 10000
+
+Raise RATE_LIMIT_IP_RATE / RATE_LIMIT_IP_BURST on the server first, or
+requests will mostly be retried after 429s. Setup hashes a password per
+voter twice, so for large runs also lower PASSWORD_BCRYPT_ROUNDS and raise
+ACCESS_TOKEN_EXPIRE_MINUTES so early tokens outlive the setup.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+import httpx
+
+CHOICES = ("For", "Against", "Abstain")
+
+
+async def post(client, url, body, latencies=None, headers=None, max_retries=50):
+    for _ in range(max_retries):
+        start = time.perf_counter()
+        response = await client.post(url, json=body, headers=headers)
+        if response.status_code in (429, 503):
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+            continue
+        response.raise_for_status()
+        if latencies is not None:
+            latencies.append(time.perf_counter() - start)
+        return response.json()
+    raise RuntimeError(f"{url} kept being rejected")
+
+
+async def sign_up(client, username: str) -> str:
+    """Register a voter and return their access token."""
+    password = f"pw-{username}"
+    await post(client, "/users/", {"username": username, "email": f"{username}@example.com", "password": password})
+    login = await post(client, "/users/login", {"username": username, "password": password})
+    return login["access_token"]
+
+
+async def cast_vote(client, url, token, choice, latencies):
+    await post(client, url, {"vote": choice}, latencies, headers={"Authorization": f"Bearer {token}"})
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        run = uuid.uuid4().hex[:8]
+        creator = await sign_up(client, f"creator-{run}")
+        proposal = await post(
+            client,
+            "/governance/proposals",
+            {"title": "Load test", "description": "Concurrent voting"},
+            headers={"Authorization": f"Bearer {creator}"},
+        )
+        proposal_id = proposal["id"]
+        votes_url = f"/governance/proposals/{proposal_id}/votes"
+
+        tokens = await asyncio.gather(*(sign_up(client, f"voter-{run}-{n}") for n in range(args.voters)))
+        votes = {token: random.choice(CHOICES) for token in tokens}
+        repeats = random.sample(list(votes), int(args.voters * args.repeat_fraction))
+        latencies = []
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(cast_vote(client, votes_url, token, choice, latencies) for token, choice in votes.items()),
+            *(cast_vote(client, votes_url, token, votes[token], latencies) for token in repeats),
+        )
+        elapsed = time.perf_counter() - start
+
+        response = await client.get(f"/governance/proposals/{proposal_id}/tally")
+        response.raise_for_status()
+        tally = response.json()
+
+    expected = {choice: 0 for choice in CHOICES}
+    for choice in votes.values():
+        expected[choice] += 1
+
+    latencies.sort()
+    print(f"Proposal {proposal_id}: {len(latencies)} votes in {elapsed:.1f}s "
+          f"({len(latencies) / elapsed:.0f} votes/s)")
+    print(f"Latency p50 {statistics.median(latencies) * 1000:.0f}ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.0f}ms")
+    print(f"Tally {tally['counts']}, expected {expected}")
+    if tally["counts"] != expected or tally["total"] != args.voters:
+        raise SystemExit("Tally does not match the votes cast")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--voters", type=int, default=10000)
+    parser.add_argument("--connections", type=int, default=500)
+    parser.add_argument("--repeat-fraction", type=float, default=0.1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,55 @@
+"""
+Trade participants backfill
+
+Adds the `participants` field to trade documents written before it existed,
+so `GET /trades/?user_id=` finds a user's whole history. Documents that
+already have the right value are left alone, so the script can be re-run
+safely. Run from the application_layer directory, e.g.:
+
+    ENVIR=production SECRET_KEY=x python scripts/backfill_trade_participants.py --dry-run
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from google.cloud import firestore  # noqa: E402
+
+from core.config.settings import settings  # noqa: E402
+from core.services.trade_summary import participants  # noqa: E402
+
+
+def main(args):
+    db = firestore.Client()
+    collection = db.collection(f"{settings.ENVIR}_trades")
+    scanned = updated = 0
+    last = None
+    while True:
+        query = collection.order_by("__name__").limit(args.page_size)
+        if last is not None:
+            query = query.start_after(last)
+        docs = list(query.stream())
+        if not docs:
+            break
+        batch = db.batch()
+        changed = 0
+        for doc in docs:
+            trade = doc.to_dict()
+            users = participants(trade)
+            if trade.get("participants") != users:
+                batch.update(doc.reference, {"participants": users})
+                changed += 1
+        if changed and not args.dry_run:
+            batch.commit()
+        scanned += len(docs)
+        updated += changed
+        last = docs[-1]
+        print(f"{scanned} trades scanned, {updated} {'to update' if args.dry_run else 'updated'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--page-size", type=int, default=400, help="Documents per read and write batch (max 500)")
+    parser.add_argument("--dry-run", action="store_true", help="Count the documents to update without writing")
+    main(parser.parse_args())
@@ -9,6 +9,8 @@ from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.cors import CORSMiddleware
 
+from construct_shared.rate_limit import RateLimit, RateLimitMiddleware, create_backend
+
 from firestore_db import write_data_to_firestore, write_wallet_address_to_firestore
 from schema import DataModel, EventModel
 
@@ -18,7 +20,22 @@ app = FastAPI()
 baseUrl = os.getenv("_BASEURL")
 defaultUrl = os.getenv("_DEFAULT_URL")
 
-# Enable CORS for all origins (testing)
+# Token buckets per IP to protect the Firestore write quota
+app.add_middleware(
+    RateLimitMiddleware,
+    limits=[
+        RateLimit(
+            "ip",
+            float(os.getenv("RATE_LIMIT_IP_RATE", "10")),
+            int(os.getenv("RATE_LIMIT_IP_BURST", "20")),
+        ),
+    ],
+    backend=create_backend(os.getenv("REDIS_URL")),
+    trust_forwarded=os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true",
+)
+
+# Enable CORS for all origins (testing). Added after the rate limiter so it
+# wraps it and 429s carry CORS headers too.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -26,6 +43,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
 templates = Jinja2Templates(directory="app/templates")
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
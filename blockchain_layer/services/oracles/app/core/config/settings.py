@@ -0,0 +1,67 @@
+# core/config/settings.py
+
+from pydantic import BaseSettings, validator
+
+
+# Application settings, overridable through environment variables
+class Settings(BaseSettings):
+    """Settings"""
+
+    PROJECT_NAME: str = "The Construct Oracles"
+    PROJECT_VERSION: str = "1.0.0"
+
+    # Pairs served, as BASE/QUOTE. Pairs no source quotes directly are
+    # derived through USD, e.g. CONSTRUCT/SOL = CONSTRUCT/USD / SOL/USD.
+    ORACLE_PAIRS: list = ["SOL/USD", "INJ/USD", "CONSTRUCT/USD", "CONSTRUCT/SOL", "CONSTRUCT/INJ"]
+
+    # Sources to poll, as a JSON list. Each has a `type` (coingecko, binance,
+    # coinbase, stub), a `name`, a poll `interval` in seconds and the
+    # `symbols` it uses for each pair it quotes. See core/services/sources.py.
+    # The service refuses to start without sources. Simulated `stub` sources
+    # are only accepted with ORACLE_USE_STUBS=true, which also supplies a
+    # default set of them when ORACLE_SOURCES is empty.
+    ORACLE_SOURCES: list = []
+    ORACLE_USE_STUBS: bool = False
+    ORACLE_HTTP_TIMEOUT: float = 5
+
+    # Quotes older than ORACLE_MAX_QUOTE_AGE seconds are left out of the
+    # aggregate. A pair with fewer than ORACLE_MIN_SOURCES fresh quotes keeps
+    # its last price, which is served until it is ORACLE_MAX_PRICE_AGE old.
+    # At least 3 are required so one bad source can be outvoted.
+    ORACLE_MAX_QUOTE_AGE: float = 30
+    ORACLE_MAX_PRICE_AGE: float = 60
+    ORACLE_MIN_SOURCES: int = 3
+
+    # Quotes further than ORACLE_OUTLIER_MADS median absolute deviations (or
+    # ORACLE_OUTLIER_MIN_PCT percent, whichever is wider) from the median
+    # are rejected before taking the median again
+    ORACLE_OUTLIER_MADS: float = 5
+    ORACLE_OUTLIER_MIN_PCT: float = 1
+
+    # Price history per pair: the latest ORACLE_HISTORY_RING_SIZE ticks and
+    # ORACLE_BAR_RING_SIZE 1-minute bars are kept in memory, and written to
+    # segment files in ORACLE_HISTORY_DIR every *_SEGMENT_SIZE rows
+    ORACLE_HISTORY_DIR: str = "price_history"
+    ORACLE_HISTORY_RING_SIZE: int = 262144
+    ORACLE_HISTORY_SEGMENT_SIZE: int = 65536
+    ORACLE_BAR_RING_SIZE: int = 65536
+    ORACLE_BAR_SEGMENT_SIZE: int = 10080
+    ORACLE_HISTORY_MAX_POINTS: int = 10000
+
+    # Stub sources wander around their configured prices
+    ORACLE_STUB_VOLATILITY: float = 0.002
+    ORACLE_STUB_FAILURE_RATE: float = 0.02
+
+    @validator("ORACLE_MIN_SOURCES")
+    def enough_sources(cls, value):
+        if value < 3:
+            raise ValueError("ORACLE_MIN_SOURCES must be at least 3 to reject a bad source")
+        return value
+
+    class Config:
+        """Config"""
+
+        case_sensitive = True
+
+
+settings = Settings()
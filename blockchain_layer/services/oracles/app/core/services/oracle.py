@@ -0,0 +1,177 @@
+# core/services/oracle.py
+
+"""
+Price oracle
+
+Each source is polled on its own schedule by a background task, and every
+successful poll re-aggregates the pairs it quotes: the latest fresh quote
+from each source is taken, outliers far from the median are rejected, and
+the median of the rest is published. Pairs no source quotes directly are
+derived through USD. Requests only read the published values from memory.
+"""
+import asyncio
+import random
+import statistics
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from core.services.sources import PriceSource
+
+# Failing sources back off up to this many times their interval
+MAX_BACKOFF = 32
+
+
+def normalize_pair(pair: str) -> str:
+    """SOL-USD, sol_usd and SOL/USD all name the pair SOL/USD."""
+    return pair.upper().replace("-", "/").replace("_", "/")
+
+
+def aggregate(quotes: List[float], outlier_mads: float, min_pct: float) -> Tuple[float, int]:
+    """Median after rejecting outliers; returns (price, number rejected)."""
+    median = statistics.median(quotes)
+    if len(quotes) < 3:
+        return median, 0
+    mad = statistics.median(abs(quote - median) for quote in quotes)
+    # 1.4826 scales the MAD to a standard deviation for normal data; the
+    # percentage floor stops agreeing sources from rejecting tiny differences
+    limit = max(outlier_mads * 1.4826 * mad, median * min_pct / 100)
+    kept = [quote for quote in quotes if abs(quote - median) <= limit]
+    return statistics.median(kept), len(quotes) - len(kept)
+
+
+class PriceOracle:
+    def __init__(self, sources: List[PriceSource], settings):
+        self.sources = sources
+        self.pairs = [normalize_pair(pair) for pair in settings.ORACLE_PAIRS]
+        self.timeout = settings.ORACLE_HTTP_TIMEOUT
+        self.max_quote_age = settings.ORACLE_MAX_QUOTE_AGE
+        self.max_price_age = settings.ORACLE_MAX_PRICE_AGE
+        self.min_sources = settings.ORACLE_MIN_SOURCES
+        self.outlier_mads = settings.ORACLE_OUTLIER_MADS
+        self.outlier_min_pct = settings.ORACLE_OUTLIER_MIN_PCT
+
+        quoted = {normalize_pair(pair) for source in sources for pair in source.pairs}
+        self.derived = [pair for pair in self.pairs if pair not in quoted]
+        self._check_coverage(sources)
+        # pair -> source name -> (price, received at)
+        self.quotes: Dict[str, Dict[str, Tuple[float, float]]] = {pair: {} for pair in quoted}
+        # pair -> published price; replaced, never mutated, so readers see whole values
+        self.prices: Dict[str, dict] = {}
+        self.source_stats = {
+            source.name: {"polls": 0, "errors": 0, "consecutive_errors": 0, "last_success": None, "last_error": None}
+            for source in sources
+        }
+        self.listeners = []  # Called with each published price
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _check_coverage(self, sources: List[PriceSource]):
+        """Refuse pairs that could never be published: too few sources quote them."""
+        counts = {}
+        for source in sources:
+            for pair in {normalize_pair(pair) for pair in source.pairs}:
+                counts[pair] = counts.get(pair, 0) + 1
+        needed = set(self.pairs) - set(self.derived)
+        for pair in self.derived:
+            base, quote = pair.split("/")
+            needed |= {f"{base}/USD", f"{quote}/USD"}
+        short = sorted(pair for pair in needed if counts.get(pair, 0) < self.min_sources)
+        if short:
+            raise ValueError(
+                f"Fewer than ORACLE_MIN_SOURCES={self.min_sources} sources quote {', '.join(short)}"
+            )
+
+    def start(self):
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        self._tasks = [
+            asyncio.create_task(self._poll(source), name=f"oracle-{source.name}") for source in self.sources
+        ]
+
+    async def _poll(self, source: PriceSource):
+        stats = self.source_stats[source.name]
+        # Spread the first polls so sources with equal intervals do not align
+        await asyncio.sleep(random.uniform(0, source.interval))
+        while True:
+            stats["polls"] += 1
+            try:
+                prices = await asyncio.wait_for(source.fetch(self._client), self.timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                stats["errors"] += 1
+                stats["consecutive_errors"] += 1
+                stats["last_error"] = f"{type(exc).__name__}: {exc}"
+                print(f"Error polling {source.name}: {stats['last_error']}")
+            else:
+                stats["consecutive_errors"] = 0
+                now = stats["last_success"] = time.time()
+                for pair, price in prices.items():
+                    pair = normalize_pair(pair)
+                    if price > 0:
+                        self.quotes[pair][source.name] = (price, now)
+                        self._aggregate(pair, now)
+                self._derive(now)
+            backoff = min(2 ** stats["consecutive_errors"], MAX_BACKOFF)
+            await asyncio.sleep(source.interval * backoff * random.uniform(0.9, 1.1))
+
+    def _publish(self, pair: str, price: float, now: float, **details):
+        value = {"pair": pair, "price": price, "updated_at": now, **details}
+        self.prices[pair] = value
+        for listener in self.listeners:
+            listener(value)
+
+    def _aggregate(self, pair: str, now: float):
+        fresh = {
+            name: price for name, (price, received) in self.quotes[pair].items()
+            if now - received <= self.max_quote_age
+        }
+        if len(fresh) < self.min_sources:
+            return  # Keep the last price until it is too old to serve
+        price, rejected = aggregate(list(fresh.values()), self.outlier_mads, self.outlier_min_pct)
+        self._publish(pair, price, now, sources=sorted(fresh), rejected=rejected, derived=False)
+
+    def _derive(self, now: float):
+        for pair in self.derived:
+            base, quote = pair.split("/")
+            base_usd = self.prices.get(f"{base}/USD")
+            quote_usd = self.prices.get(f"{quote}/USD")
+            if base_usd is None or quote_usd is None:
+                continue
+            updated = min(base_usd["updated_at"], quote_usd["updated_at"])
+            previous = self.prices.get(pair)
+            if previous is not None and previous["updated_at"] >= updated:
+                continue
+            self._publish(
+                pair, base_usd["price"] / quote_usd["price"], updated,
+                sources=sorted(set(base_usd["sources"]) | set(quote_usd["sources"])),
+                rejected=0, derived=True,
+            )
+
+    def get(self, pair: str) -> Tuple[Optional[dict], float]:
+        """The published price for `pair` and its age in seconds."""
+        value = self.prices.get(normalize_pair(pair))
+        if value is None:
+            return None, float("inf")
+        return value, time.time() - value["updated_at"]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "sources": self.source_stats,
+            "pairs": {
+                pair: {
+                    "age": round(now - self.prices[pair]["updated_at"], 3) if pair in self.prices else None,
+                    "quotes": len(self.quotes.get(pair, {})),
+                }
+                for pair in self.pairs
+            },
+        }
@@ -0,0 +1,303 @@
+# core/services/price_history.py
+
+"""
+Price history
+
+Every published price is appended to a columnar time series per pair. Recent
+rows live in a fixed-size NumPy ring buffer; every `segment_size` rows are
+also written out as a .npy segment file, which is memory-mapped when queried,
+so history is bounded by disk rather than memory and survives restarts.
+
+Alongside the raw ticks each pair keeps 1-minute OHLC bars, built as ticks
+arrive. 1m bars are served as stored; 1h and 1d bars are reduced from them
+with NumPy, so chart queries never touch raw ticks. TWAPs weight each tick
+by how long it was the current price.
+"""
+import math
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+TICK_COLUMNS = ("ts", "price")
+BAR_COLUMNS = ("ts", "open", "high", "low", "close", "ticks")
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+
+class ColumnarSeries:
+    """Append-only float64 columns ordered by a `ts` column."""
+
+    def __init__(self, directory: str, columns: Tuple[str, ...], capacity: int, segment_size: int):
+        self.directory = directory
+        self.dtype = np.dtype([(column, "<f8") for column in columns])
+        self.capacity = capacity
+        self.segment_size = min(segment_size, capacity)
+        self._ring = np.zeros(capacity, dtype=self.dtype)
+        self._count = 0  # Rows appended since startup
+        self._flushed = 0  # Of those, rows written to segments
+        self._mapped: Dict[str, np.ndarray] = {}
+
+        os.makedirs(directory, exist_ok=True)
+        # (first ts, last ts, path), oldest first
+        self.segments: List[Tuple[float, float, str]] = []
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".npy"):
+                first, last = name[:-4].split("-")
+                self.segments.append((int(first) / 1e6, int(last) / 1e6, os.path.join(directory, name)))
+        self.last_ts = self.segments[-1][1] if self.segments else -math.inf
+
+    def append(self, row: tuple):
+        if row[0] <= self.last_ts:
+            return  # Keep ts strictly increasing
+        self._ring[self._count % self.capacity] = row
+        self._count += 1
+        self.last_ts = row[0]
+        if self._count - self._flushed >= self.segment_size:
+            self.flush()
+
+    def upsert(self, row: tuple):
+        """Append `row`, or replace the last row if it has the same ts."""
+        if row[0] != self.last_ts:
+            self.append(row)
+            return
+        if self._count:
+            self._ring[(self._count - 1) % self.capacity] = row
+            if self._count > self._flushed:
+                return
+        # The last row is already in the newest segment; rewrite it there
+        path = self.segments[-1][2]
+        rows = np.load(path)
+        if rows[-1].tolist() == tuple(row):
+            return
+        rows[-1] = row
+        self._write_segment(path, rows)
+        self._mapped.pop(path, None)
+
+    def _ring_parts(self) -> List[np.ndarray]:
+        """The rows held in the ring, oldest first, as at most two views."""
+        if self._count <= self.capacity:
+            return [self._ring[:self._count]]
+        split = self._count % self.capacity
+        return [self._ring[split:], self._ring[:split]]
+
+    def _unflushed(self) -> np.ndarray:
+        pending = self._count - self._flushed
+        start = self._flushed % self.capacity
+        if start + pending <= self.capacity:
+            return self._ring[start:start + pending].copy()
+        return np.concatenate([self._ring[start:], self._ring[:start + pending - self.capacity]])
+
+    def flush(self):
+        """Write rows not yet in a segment to a new segment file."""
+        if self._count == self._flushed:
+            return
+        rows = self._unflushed()
+        first, last = rows["ts"][0], rows["ts"][-1]
+        path = os.path.join(self.directory, f"{round(first * 1e6):020d}-{round(last * 1e6):020d}.npy")
+        self._write_segment(path, rows)
+        self.segments.append((first, last, path))
+        self._flushed = self._count
+
+    @staticmethod
+    def _write_segment(path: str, rows: np.ndarray):
+        with open(path + ".tmp", "wb") as file:
+            np.save(file, rows)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _segment(self, path: str) -> np.ndarray:
+        rows = self._mapped.get(path)
+        if rows is None:
+            rows = self._mapped[path] = np.load(path, mmap_mode="r")
+        return rows
+
+    def _ring_oldest(self) -> float:
+        parts = [part for part in self._ring_parts() if len(part)]
+        return parts[0]["ts"][0] if parts else math.inf
+
+    def _slices(self, start: float, end: float) -> List[np.ndarray]:
+        """Views of the rows with start <= ts <= end, oldest first; nothing is copied."""
+        ring_oldest = self._ring_oldest()
+        chunks = []
+        # Segments only for what the ring no longer (or not yet) holds
+        upper = min(end, np.nextafter(ring_oldest, -math.inf))
+        for first, last, path in self.segments:
+            if last < start or first > upper:
+                continue
+            rows = self._segment(path)
+            ts = rows["ts"]
+            chunks.append(rows[np.searchsorted(ts, start, "left"):np.searchsorted(ts, upper, "right")])
+        for part in self._ring_parts():
+            ts = part["ts"]
+            chunks.append(part[np.searchsorted(ts, start, "left"):np.searchsorted(ts, end, "right")])
+        return [chunk for chunk in chunks if len(chunk)]
+
+    def count(self, start: float, end: float) -> int:
+        """How many rows `read(start, end)` would return, found by binary search alone."""
+        return sum(len(chunk) for chunk in self._slices(start, end))
+
+    def read(self, start: float, end: float) -> np.ndarray:
+        """Rows with start <= ts <= end, oldest first."""
+        chunks = self._slices(start, end)
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=self.dtype)
+
+    def last_before(self, ts: float) -> Optional[np.void]:
+        """The latest row with a ts before `ts`."""
+        for part in reversed(self._ring_parts()):
+            i = np.searchsorted(part["ts"], ts, "left")
+            if i:
+                return part[i - 1]
+        for first, _, path in reversed(self.segments):
+            if first < ts:
+                rows = self._segment(path)
+                return rows[np.searchsorted(rows["ts"], ts, "left") - 1]
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "in_memory": min(self._count, self.capacity),
+            "unflushed": self._count - self._flushed,
+            "segments": len(self.segments),
+        }
+
+
+class PairHistory:
+    """Ticks and 1-minute bars for one pair"""
+
+    def __init__(self, directory: str, settings):
+        self.ticks = ColumnarSeries(
+            os.path.join(directory, "ticks"), TICK_COLUMNS,
+            settings.ORACLE_HISTORY_RING_SIZE, settings.ORACLE_HISTORY_SEGMENT_SIZE,
+        )
+        self.bars = ColumnarSeries(
+            os.path.join(directory, "bars_1m"), BAR_COLUMNS,
+            settings.ORACLE_BAR_RING_SIZE, settings.ORACLE_BAR_SEGMENT_SIZE,
+        )
+        # The minute still being built. After a restart it resumes from the
+        # last stored bar, so ticks later in the same minute merge into it
+        last = self.bars.last_before(math.inf)
+        self.bar: Optional[list] = list(last.tolist()) if last is not None else None
+
+    def append(self, ts: float, price: float):
+        if ts <= self.ticks.last_ts:
+            return
+        self.ticks.append((ts, price))
+        minute = ts - ts % 60
+        if self.bar is not None and self.bar[0] == minute:
+            bar = self.bar
+            bar[2] = max(bar[2], price)
+            bar[3] = min(bar[3], price)
+            bar[4] = price
+            bar[5] += 1
+            return
+        if self.bar is not None:
+            self.bars.upsert(tuple(self.bar))
+        self.bar = [minute, price, price, price, price, 1]
+
+    def _bar_in(self, start: float, end: float) -> bool:
+        return self.bar is not None and start - start % 60 <= self.bar[0] <= end
+
+    def _stored_end(self, end: float) -> float:
+        # A bar resumed after a restart is also stored; serve the live copy
+        if self.bar is not None:
+            end = min(end, np.nextafter(self.bar[0], -math.inf))
+        return end
+
+    def minute_bars(self, start: float, end: float) -> np.ndarray:
+        bars = self.bars.read(start - start % 60, self._stored_end(end))
+        if self._bar_in(start, end):
+            bars = np.concatenate([bars, np.array([tuple(self.bar)], dtype=self.bars.dtype)])
+        return bars
+
+    def minute_bar_count(self, start: float, end: float) -> int:
+        return self.bars.count(start - start % 60, self._stored_end(end)) + self._bar_in(start, end)
+
+    def flush(self):
+        if self.bar is not None:
+            self.bars.upsert(tuple(self.bar))
+            self.bar = None
+        self.ticks.flush()
+        self.bars.flush()
+
+
+def downsample(bars: np.ndarray, resolution: int) -> np.ndarray:
+    """Reduce 1-minute bars (sorted by ts) into bars of `resolution` seconds."""
+    if resolution == 60 or not len(bars):
+        return bars
+    buckets = bars["ts"] - bars["ts"] % resolution
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(bars)] - 1
+    out = np.empty(len(starts), dtype=bars.dtype)
+    out["ts"] = buckets[starts]
+    out["open"] = bars["open"][starts]
+    out["high"] = np.maximum.reduceat(bars["high"], starts)
+    out["low"] = np.minimum.reduceat(bars["low"], starts)
+    out["close"] = bars["close"][ends]
+    out["ticks"] = np.add.reduceat(bars["ticks"], starts)
+    return out
+
+
+class PriceHistory:
+    def __init__(self, settings):
+        self.directory = settings.ORACLE_HISTORY_DIR
+        self.settings = settings
+        self.pairs: Dict[str, PairHistory] = {}
+
+    def _pair(self, pair: str) -> PairHistory:
+        history = self.pairs.get(pair)
+        if history is None:
+            history = self.pairs[pair] = PairHistory(
+                os.path.join(self.directory, pair.replace("/", "-")), self.settings
+            )
+        return history
+
+    def record(self, value: dict):
+        """Oracle listener: append a published price."""
+        self._pair(value["pair"]).append(value["updated_at"], value["price"])
+
+    def ticks(self, pair: str, start: float, end: float) -> np.ndarray:
+        return self._pair(pair).ticks.read(start, end)
+
+    def tick_count(self, pair: str, start: float, end: float) -> int:
+        return self._pair(pair).ticks.count(start, end)
+
+    def minute_bar_count(self, pair: str, start: float, end: float) -> int:
+        return self._pair(pair).minute_bar_count(start, end)
+
+    def ohlc(self, pair: str, resolution: str, start: float, end: float) -> np.ndarray:
+        seconds = RESOLUTIONS[resolution]
+        start -= start % seconds
+        return downsample(self._pair(pair).minute_bars(start, end), seconds)
+
+    def twap(self, pair: str, start: float, end: float) -> Optional[dict]:
+        """Time-weighted average price over [start, end]; None without data."""
+        history = self._pair(pair)
+        end = min(end, time.time())
+        ticks = history.ticks.read(start, end)
+        previous = history.ticks.last_before(start)
+        times, prices = ticks["ts"], ticks["price"]
+        if previous is not None:
+            # The price at `start` is the last one published before it
+            times = np.r_[start, times]
+            prices = np.r_[previous["price"], prices]
+        if not len(times) or end <= times[0]:
+            return None
+        durations = np.diff(np.r_[times, end])
+        return {
+            "twap": float(np.dot(prices, durations) / durations.sum()),
+            "start": float(times[0]),
+            "end": end,
+            "ticks": len(ticks),
+        }
+
+    def flush(self):
+        for history in self.pairs.values():
+            history.flush()
+
+    def stats(self) -> dict:
+        return {
+            pair: {"ticks": history.ticks.stats(), "bars_1m": history.bars.stats()}
+            for pair, history in self.pairs.items()
+        }
@@ -0,0 +1,142 @@
+# core/services/sources.py
+
+"""
+Price sources
+
+A source fetches its current price for every pair it quotes in one call
+where the upstream API allows it. `symbols` maps our pair names to the
+source's own identifiers, e.g. {"SOL/USD": "solana"} for CoinGecko.
+"""
+import json
+import random
+from typing import Dict, List
+
+import httpx
+
+
+# Used when ORACLE_USE_STUBS is set and ORACLE_SOURCES is empty
+STUB_SOURCES = [
+    {"type": "stub", "name": "stub-a", "interval": 1,
+     "symbols": {"SOL/USD": 150.0, "INJ/USD": 25.0, "CONSTRUCT/USD": 0.5}},
+    {"type": "stub", "name": "stub-b", "interval": 1,
+     "symbols": {"SOL/USD": 150.0, "INJ/USD": 25.0, "CONSTRUCT/USD": 0.5}},
+    {"type": "stub", "name": "stub-c", "interval": 2,
+     "symbols": {"SOL/USD": 150.0, "INJ/USD": 25.0, "CONSTRUCT/USD": 0.5}},
+]
+
+
+class SourceError(Exception):
+    """A source could not be polled"""
+
+
+class PriceSource:
+    """Base class for price sources"""
+
+    def __init__(self, name: str, symbols: Dict[str, object], interval: float):
+        self.name = name
+        self.symbols = symbols
+        self.interval = interval
+
+    @property
+    def pairs(self):
+        return list(self.symbols)
+
+    async def fetch(self, client: httpx.AsyncClient) -> Dict[str, float]:
+        """Return {pair: price} for the pairs this source quotes."""
+        raise NotImplementedError
+
+
+class StubSource(PriceSource):
+    """
+    Simulated feed for local runs and tests. Each price starts at the value
+    given in `symbols` and takes a random walk step of `volatility` per
+    poll; a poll fails with probability `failure_rate`.
+    """
+
+    def __init__(self, name, symbols, interval, volatility: float, failure_rate: float):
+        super().__init__(name, symbols, interval)
+        self.volatility = volatility
+        self.failure_rate = failure_rate
+        self.prices = {pair: float(price) for pair, price in symbols.items()}
+
+    async def fetch(self, client):
+        if random.random() < self.failure_rate:
+            raise SourceError("Simulated outage")
+        for pair, price in self.prices.items():
+            self.prices[pair] = price * (1 + random.gauss(0, self.volatility))
+        return dict(self.prices)
+
+
+class CoinGeckoSource(PriceSource):
+    """CoinGecko simple price API; symbols are coin IDs, quotes in the pair's quote currency."""
+
+    url = "https://api.coingecko.com/api/v3/simple/price"
+
+    async def fetch(self, client):
+        currencies = {pair.split("/")[1].lower() for pair in self.symbols}
+        response = await client.get(
+            self.url,
+            params={"ids": ",".join(set(self.symbols.values())), "vs_currencies": ",".join(currencies)},
+        )
+        response.raise_for_status()
+        data = response.json()
+        return {
+            pair: float(data[coin][pair.split("/")[1].lower()])
+            for pair, coin in self.symbols.items()
+            if pair.split("/")[1].lower() in data.get(coin, {})
+        }
+
+
+class BinanceSource(PriceSource):
+    """Binance ticker prices; symbols are market names such as SOLUSDT."""
+
+    url = "https://api.binance.com/api/v3/ticker/price"
+
+    async def fetch(self, client):
+        markets = list(self.symbols.values())
+        response = await client.get(self.url, params={"symbols": json.dumps(markets, separators=(",", ":"))})
+        response.raise_for_status()
+        prices = {ticker["symbol"]: float(ticker["price"]) for ticker in response.json()}
+        return {pair: prices[market] for pair, market in self.symbols.items() if market in prices}
+
+
+class CoinbaseSource(PriceSource):
+    """Coinbase spot prices, one call per pair; symbols are products such as SOL-USD."""
+
+    url = "https://api.coinbase.com/v2/prices/{}/spot"
+
+    async def fetch(self, client):
+        prices = {}
+        for pair, product in self.symbols.items():
+            response = await client.get(self.url.format(product))
+            response.raise_for_status()
+            prices[pair] = float(response.json()["data"]["amount"])
+        return prices
+
+
+def create_source(config: dict, settings) -> PriceSource:
+    source_type = config["type"]
+    name = config.get("name", source_type)
+    interval = float(config.get("interval", 10))
+    symbols = config["symbols"]
+    if source_type == "stub":
+        return StubSource(name, symbols, interval, settings.ORACLE_STUB_VOLATILITY, settings.ORACLE_STUB_FAILURE_RATE)
+    if source_type == "coingecko":
+        return CoinGeckoSource(name, symbols, interval)
+    if source_type == "binance":
+        return BinanceSource(name, symbols, interval)
+    if source_type == "coinbase":
+        return CoinbaseSource(name, symbols, interval)
+    raise ValueError(f"Unknown price source type {source_type}")
+
+
+def configured_sources(settings) -> List[PriceSource]:
+    """The sources named in ORACLE_SOURCES; stubs only when ORACLE_USE_STUBS is set."""
+    configs = settings.ORACLE_SOURCES
+    if not configs and settings.ORACLE_USE_STUBS:
+        configs = STUB_SOURCES
+    if not configs:
+        raise ValueError("Set ORACLE_SOURCES, or ORACLE_USE_STUBS=true to run on simulated prices")
+    if not settings.ORACLE_USE_STUBS and any(config["type"] == "stub" for config in configs):
+        raise ValueError("Stub sources in ORACLE_SOURCES need ORACLE_USE_STUBS=true")
+    return [create_source(config, settings) for config in configs]
@@ -0,0 +1,35 @@
+import os
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from core.config.settings import settings
+from routers import oracle
+
+# Initializes FastAPI app instance
+app = FastAPI(title=settings.PROJECT_NAME, version=settings.PROJECT_VERSION)
+
+# Set up CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.include_router(oracle.router, prefix="/oracle", tags=["oracle"])
+
+
+@app.get("/")
+async def read_root():
+    return {"message": "Welcome to The Construct Oracles API"}
+
+
+if __name__ == "__main__":
+    # Get the server port from the environment variable
+    server_port = os.environ.get("PORT", "8080")
+
+    # Run the FastAPI application
+    uvicorn.run(app, host="0.0.0.0", port=int(server_port))
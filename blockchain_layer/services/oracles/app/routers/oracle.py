@@ -0,0 +1,119 @@
+import time
+
+from fastapi import APIRouter, HTTPException, Query
+
+from core.config.settings import settings
+from core.services.oracle import PriceOracle, normalize_pair
+from core.services.price_history import RESOLUTIONS, PriceHistory
+from core.services.sources import configured_sources
+from schemas.schema import OHLCSeries, PriceResponse, TickSeries, TWAPResponse
+
+router = APIRouter()
+oracle = PriceOracle(configured_sources(settings), settings)
+history = PriceHistory(settings)
+oracle.listeners.append(history.record)
+
+
+@router.on_event("startup")
+async def start_oracle():
+    oracle.start()
+
+
+@router.on_event("shutdown")
+async def stop_oracle():
+    await oracle.stop()
+    history.flush()
+
+
+def _known_pair(pair: str) -> str:
+    pair = normalize_pair(pair)
+    if pair not in oracle.pairs:
+        raise HTTPException(status_code=404, detail=f"Unknown pair {pair}")
+    return pair
+
+
+def _time_range(start: float | None, end: float | None, default_span: float) -> tuple:
+    end = time.time() if end is None else end
+    start = end - default_span if start is None else start
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return start, end
+
+
+# Latest aggregated price, served from memory. Use SOL-USD or SOL_USD in the path.
+@router.get("/price/{pair}", response_model=PriceResponse)
+async def get_price(pair: str):
+    value, age = oracle.get(pair)
+    if value is None:
+        raise HTTPException(status_code=404, detail=f"No price for {pair}")
+    if age > oracle.max_price_age:
+        raise HTTPException(status_code=503, detail=f"Price for {value['pair']} is {age:.0f}s old")
+    return {**value, "age": age}
+
+
+@router.get("/prices", response_model=list[PriceResponse])
+async def get_prices():
+    prices = []
+    for pair in oracle.pairs:
+        value, age = oracle.get(pair)
+        if value is not None and age <= oracle.max_price_age:
+            prices.append({**value, "age": age})
+    return prices
+
+
+# Raw published prices between start and end (epoch seconds; default the last hour)
+@router.get("/history/{pair}", response_model=TickSeries)
+async def get_history(pair: str, start: float | None = None, end: float | None = None):
+    pair = _known_pair(pair)
+    start, end = _time_range(start, end, 3600)
+    # Counted before reading, so an oversized range is never copied
+    count = history.tick_count(pair, start, end)
+    if count > settings.ORACLE_HISTORY_MAX_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{count} points in range; narrow it or use /oracle/ohlc",
+        )
+    ticks = history.ticks(pair, start, end)
+    return {"pair": pair, "ts": ticks["ts"].tolist(), "price": ticks["price"].tolist()}
+
+
+# OHLC bars at 1m, 1h or 1d (default: the last 100 bars)
+@router.get("/ohlc/{pair}", response_model=OHLCSeries)
+async def get_ohlc(
+    pair: str,
+    resolution: str = Query("1h", regex="^(1m|1h|1d)$"),
+    start: float | None = None,
+    end: float | None = None,
+):
+    pair = _known_pair(pair)
+    start, end = _time_range(start, end, 100 * RESOLUTIONS[resolution])
+    # 1m bars are served as stored, so they can be counted before reading
+    count = history.minute_bar_count(pair, start, end) if resolution == "1m" else 0
+    if count > settings.ORACLE_HISTORY_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"{count} bars in range; narrow it or use a coarser resolution")
+    bars = history.ohlc(pair, resolution, start, end)
+    if len(bars) > settings.ORACLE_HISTORY_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"{len(bars)} bars in range; narrow it or use a coarser resolution")
+    return {
+        "pair": pair,
+        "resolution": resolution,
+        **{column: bars[column].tolist() for column in ("ts", "open", "high", "low", "close")},
+        "ticks": bars["ticks"].astype(int).tolist(),
+    }
+
+
+# Time-weighted average price over the last `window` seconds, or between start and end
+@router.get("/twap/{pair}", response_model=TWAPResponse)
+async def get_twap(pair: str, window: float = 3600, start: float | None = None, end: float | None = None):
+    pair = _known_pair(pair)
+    start, end = _time_range(start, end, window)
+    twap = history.twap(pair, start, end)
+    if twap is None:
+        raise HTTPException(status_code=404, detail=f"No prices for {pair} in range")
+    return {"pair": pair, **twap}
+
+
+# Poll counters per source and price age per pair
+@router.get("/stats")
+async def get_stats():
+    return {**oracle.stats(), "history": history.stats()}
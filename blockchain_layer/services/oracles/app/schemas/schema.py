@@ -0,0 +1,36 @@
+from pydantic import BaseModel, Field
+
+
+class PriceResponse(BaseModel):
+    pair: str
+    price: float
+    updated_at: float = Field(..., description="Epoch seconds the price was last aggregated")
+    age: float = Field(..., description="Seconds since updated_at")
+    sources: list[str]
+    rejected: int = Field(..., description="Quotes left out as outliers")
+    derived: bool = Field(..., description="Computed from both assets' USD prices")
+
+
+class TickSeries(BaseModel):
+    pair: str
+    ts: list[float]
+    price: list[float]
+
+
+class OHLCSeries(BaseModel):
+    pair: str
+    resolution: str
+    ts: list[float] = Field(..., description="Bar start, epoch seconds")
+    open: list[float]
+    high: list[float]
+    low: list[float]
+    close: list[float]
+    ticks: list[int] = Field(..., description="Prices aggregated into each bar")
+
+
+class TWAPResponse(BaseModel):
+    pair: str
+    twap: float
+    start: float = Field(..., description="Start of the priced interval, epoch seconds")
+    end: float
+    ticks: int
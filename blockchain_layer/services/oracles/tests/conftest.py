@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# The service runs from app/; tests use the local stub sources only
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+os.environ.setdefault("ORACLE_USE_STUBS", "true")
+os.environ.setdefault("ORACLE_STUB_FAILURE_RATE", "0")
+os.environ.setdefault("ORACLE_HISTORY_DIR", tempfile.mkdtemp(prefix="oracle-history-"))
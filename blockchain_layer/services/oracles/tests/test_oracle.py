@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+from pydantic import ValidationError
+
+from core.config.settings import Settings
+from core.services.oracle import PriceOracle, aggregate
+from core.services.sources import STUB_SOURCES, StubSource, configured_sources
+
+PAIRS = ["SOL/USD", "INJ/USD", "CONSTRUCT/USD", "CONSTRUCT/SOL"]
+PRICES = {"SOL/USD": 150.0, "INJ/USD": 25.0, "CONSTRUCT/USD": 0.5}
+
+
+def stub_settings(**overrides) -> Settings:
+    return Settings(**{"ORACLE_PAIRS": PAIRS, "ORACLE_STUB_VOLATILITY": 0, **overrides})
+
+
+def stub(name: str, **prices) -> StubSource:
+    return StubSource(name, {**PRICES, **prices}, 0.02, volatility=0, failure_rate=0)
+
+
+def run_until_published(oracle: PriceOracle, ready=None, timeout: float = 5) -> dict:
+    """Poll the sources until every pair has a price (or `ready` holds), then stop the oracle."""
+    ready = ready or (lambda prices: all(pair in prices for pair in oracle.pairs))
+
+    async def run():
+        oracle.start()
+        try:
+            deadline = time.monotonic() + timeout
+            while not ready(oracle.prices):
+                assert time.monotonic() < deadline, f"No price within {timeout}s: {oracle.stats()}"
+                await asyncio.sleep(0.01)
+        finally:
+            await oracle.stop()
+        return dict(oracle.prices)
+
+    return asyncio.run(run())
+
+
+def test_no_sources_refuses_to_start():
+    with pytest.raises(ValueError, match="ORACLE_SOURCES"):
+        configured_sources(stub_settings(ORACLE_SOURCES=[], ORACLE_USE_STUBS=False))
+
+
+def test_stubs_need_opt_in():
+    with pytest.raises(ValueError, match="ORACLE_USE_STUBS"):
+        configured_sources(stub_settings(ORACLE_SOURCES=STUB_SOURCES, ORACLE_USE_STUBS=False))
+    sources = configured_sources(stub_settings(ORACLE_SOURCES=[], ORACLE_USE_STUBS=True))
+    assert [source.name for source in sources] == [config["name"] for config in STUB_SOURCES]
+
+
+def test_min_sources_at_least_three():
+    assert Settings().ORACLE_MIN_SOURCES >= 3
+    with pytest.raises(ValidationError):
+        stub_settings(ORACLE_MIN_SOURCES=2)
+
+
+def test_too_few_sources_for_a_pair_refuses_to_start():
+    sources = [stub("a"), stub("b"), StubSource("c", {"SOL/USD": 150.0}, 1, 0, 0)]
+    with pytest.raises(ValueError, match="CONSTRUCT/USD, INJ/USD"):
+        PriceOracle(sources, stub_settings())
+
+
+def test_aggregate_rejects_outlier():
+    price, rejected = aggregate([100.0, 100.5, 99.5, 1000.0], outlier_mads=5, min_pct=1)
+    assert rejected == 1
+    assert price == 100.0
+
+
+def test_default_stubs_publish_every_pair():
+    settings = stub_settings(ORACLE_SOURCES=[], ORACLE_USE_STUBS=True)
+    oracle = PriceOracle(configured_sources(settings), settings)
+    prices = run_until_published(oracle)
+    for pair, price in PRICES.items():
+        assert prices[pair]["price"] == pytest.approx(price)
+        assert len(prices[pair]["sources"]) >= 3
+    assert prices["CONSTRUCT/SOL"]["derived"]
+    assert prices["CONSTRUCT/SOL"]["price"] == pytest.approx(0.5 / 150)
+
+
+def test_bad_stub_is_outvoted():
+    sources = [stub("a"), stub("b"), stub("c"), stub("bad", **{"SOL/USD": 1500.0})]
+    oracle = PriceOracle(sources, stub_settings())
+    prices = run_until_published(oracle, lambda prices: len(prices.get("SOL/USD", {}).get("sources", ())) == 4)
+    assert prices["SOL/USD"]["price"] == pytest.approx(150.0)
+    assert prices["SOL/USD"]["rejected"] == 1
+
+
+def test_price_endpoint_serves_stub_prices():
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 10
+        while (response := client.get("/oracle/price/SOL-USD")).status_code == 404:
+            assert time.monotonic() < deadline, "SOL/USD was never published"
+            time.sleep(0.1)
+        assert response.status_code == 200
+        assert response.json()["pair"] == "SOL/USD"
+        assert client.get("/oracle/price/DOGE-USD").status_code == 404
@@ -40,6 +40,15 @@ class Settings(BaseSettings):
     ALLOWED_HOSTS: list = []
     # os.environ.get("ALLOWED_HOSTS").split(",") |
 
+    # Rate limiting (requests per second and burst size). Every call here
+    # spends Solana RPC quota, so limits are tighter than the application layer.
+    REDIS_URL: str | None = None
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # Only behind the API gateway
+    RATE_LIMIT_IP_RATE: float = 5
+    RATE_LIMIT_IP_BURST: int = 10
+    RATE_LIMIT_SEND_RATE: float = 1
+    RATE_LIMIT_SEND_BURST: int = 3
+
     ENVIR = "test"  # options: test, stage, production. Changes firestore database
 
     class Config:
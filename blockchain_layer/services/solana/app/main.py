@@ -6,6 +6,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from construct_shared.rate_limit import RateLimit, RateLimitMiddleware, create_backend
+from core.config.settings import settings
 from routers import methods
 
 # Initializes FastAPI app instance
@@ -15,7 +17,24 @@ app = FastAPI(title="Solana", version="1.0.0")
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
 
-# Set up CORS middleware
+# Token buckets per IP, plus a tighter one for submitting transactions
+app.add_middleware(
+    RateLimitMiddleware,
+    limits=[
+        RateLimit("ip", settings.RATE_LIMIT_IP_RATE, settings.RATE_LIMIT_IP_BURST),
+        RateLimit(
+            "route",
+            settings.RATE_LIMIT_SEND_RATE,
+            settings.RATE_LIMIT_SEND_BURST,
+            path_prefix="/methods/send_transaction",
+        ),
+    ],
+    backend=create_backend(settings.REDIS_URL),
+    trust_forwarded=settings.RATE_LIMIT_TRUST_FORWARDED,
+)
+
+# Set up CORS middleware. Added after the rate limiter so it wraps it and
+# 429s carry CORS headers too.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
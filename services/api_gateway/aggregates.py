@@ -0,0 +1,98 @@
+import asyncio
+import re
+from urllib.parse import quote
+
+import httpx
+from fastapi import Request
+from starlette.responses import JSONResponse
+
+# Request headers passed on to every branch of an aggregate
+FORWARDED_HEADERS = ("authorization", "accept-language")
+
+
+class AggregateRoute:
+    """
+    A gateway endpoint composed from several upstream calls.
+
+    All branches are requested concurrently, so the response takes as long as
+    the slowest branch rather than the sum of them. Each branch has its own
+    timeout. A failed or timed-out optional branch is reported under `errors`
+    and the rest of the response is still returned. A failed required branch
+    turns the whole response into a 502.
+
+    `query` declares the query parameters the branches use. Each maps to a
+    regular expression the value must match; a missing or invalid parameter
+    is rejected with 422 before any upstream is called.
+    """
+
+    def __init__(self, path: str, branches: list, query: dict = None):
+        self.path = path
+        self.branches = branches
+        self.query = {name: re.compile(pattern) for name, pattern in (query or {}).items()}
+
+    async def _fetch(self, routes, branch: dict, params: dict, headers: dict):
+        try:
+            path = branch["path"].format_map(params)
+        except KeyError as exc:
+            raise ValueError(f"Missing parameter {exc}") from exc
+        upstream = routes.get(branch["route"])
+        timeout = branch.get("timeout", upstream.timeout)
+        return await asyncio.wait_for(
+            upstream.fetch_json(path, headers=headers, timeout=timeout), timeout
+        )
+
+    async def handle(self, request: Request):
+        invalid = [
+            name for name, pattern in self.query.items()
+            if not pattern.fullmatch(request.query_params.get(name, ""))
+        ]
+        if invalid:
+            return JSONResponse(
+                {"detail": f"Missing or invalid query parameters: {', '.join(invalid)}"},
+                status_code=422,
+            )
+
+        routes = request.app.state.routes
+        # Quoted so a parameter cannot change which upstream path is called
+        params = {
+            name: quote(str(value), safe="")
+            for name, value in {**request.query_params, **request.path_params}.items()
+        }
+        headers = {
+            name: request.headers[name]
+            for name in FORWARDED_HEADERS
+            if name in request.headers
+        }
+
+        results = await asyncio.gather(
+            *(self._fetch(routes, branch, params, headers) for branch in self.branches),
+            return_exceptions=True,
+        )
+
+        data, errors = {}, {}
+        for branch, result in zip(self.branches, results):
+            if isinstance(result, asyncio.TimeoutError):
+                errors[branch["name"]] = "Timed out"
+            elif isinstance(result, httpx.HTTPStatusError):
+                errors[branch["name"]] = f"Upstream returned {result.response.status_code}"
+            elif isinstance(result, Exception):
+                errors[branch["name"]] = str(result) or type(result).__name__
+            else:
+                data[branch["name"]] = result
+
+        required_failed = [
+            branch["name"]
+            for branch in self.branches
+            if branch.get("required") and branch["name"] in errors
+        ]
+        return JSONResponse(
+            {"data": data, "errors": errors, "partial": bool(errors)},
+            status_code=502 if required_failed else 200,
+        )
+
+
+def register_aggregates(app, aggregates: list):
+    """Add a GET endpoint for each configured aggregate route."""
+    for aggregate in aggregates:
+        route = AggregateRoute(aggregate["path"], aggregate["branches"], aggregate.get("query"))
+        app.add_api_route(route.path, route.handle, methods=["GET"], tags=["aggregates"])
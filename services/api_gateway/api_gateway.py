@@ -0,0 +1,90 @@
+"""
+API Gateway
+"""
+import os
+
+import uvicorn
+from fastapi import FastAPI, Request
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+
+from construct_shared.audit import AuditLog, install_audit
+from construct_shared.rate_limit import RateLimit, RateLimitMiddleware, create_backend
+
+from aggregates import register_aggregates
+from config import settings
+from proxy import RouteTable
+
+app = FastAPI(title="The Construct API Gateway", version="1.0.0")
+
+app.add_middleware(
+    RateLimitMiddleware,
+    limits=[
+        RateLimit("ip", *settings.rate_limit_ip),
+        RateLimit("api_key", *settings.rate_limit_api_key),
+    ],
+    backend=create_backend(settings.redis_url),
+    # Client IPs are read the same way the proxy forwards them
+    trust_forwarded=settings.trusted_proxies,
+    exempt_paths=("/health",),
+)
+
+# Audit trail of every write, including rate-limited ones. The gateway passes
+# access tokens through unverified, so no actor is recorded here; upstream
+# services that verify them record it. Configured by AUDIT_* variables.
+install_audit(
+    app,
+    AuditLog.from_env(service="api_gateway"),
+    exclude_prefixes=("/health", "/docs", "/openapi.json"),
+)
+
+# Added last so it wraps the rate limiter and audit trail, and 429s carry CORS headers too
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+@app.on_event("startup")
+async def startup():
+    """Open the pooled upstream connections."""
+    app.state.routes = RouteTable(settings.routes)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close the pooled upstream connections."""
+    await app.state.routes.close()
+
+
+@app.get("/health")
+async def health():
+    """Gateway liveness check."""
+    return {"status": "ok"}
+
+
+# Aggregate routes must be registered before the catch-all proxy route
+register_aggregates(app, settings.aggregates)
+
+
+@app.api_route(
+    "/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"]
+)
+async def proxy(request: Request, path: str):
+    """Route a request to the upstream service that owns its path prefix."""
+    upstream, upstream_path = app.state.routes.resolve(request.url.path)
+    if upstream is None:
+        return JSONResponse({"detail": "No route for path"}, status_code=404)
+    return await upstream.forward(request, upstream_path)
+
+
+# Execute the application when the script is run
+if __name__ == "__main__":
+    # Get the server port from the environment variable
+    server_port = os.environ.get("PORT", settings.server_port)
+
+    # Run the FastAPI application
+    uvicorn.run(app, host="0.0.0.0", port=int(server_port))
@@ -0,0 +1,112 @@
+"""
+Gateway proxy benchmark
+
+Starts a small upstream and the gateway in front of it on local ports, each
+in its own process, then sends the same requests straight to the upstream
+and through the gateway and reports throughput and latency for both, so the
+proxy's overhead is the difference. Rate limiting is raised out of the way
+for the run, e.g.:
+
+    python benchmark.py --requests 20000 --concurrency 100
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import time
+
+import httpx
+import uvicorn
+
+UPSTREAM_PORT = 18081
+GATEWAY_PORT = 18080
+
+
+async def upstream_app(scope, receive, send):
+    """Echo the path and a fixed 1 KiB body."""
+    if scope["type"] != "http":
+        return
+    body = json.dumps({"path": scope["path"], "data": "x" * 1024}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def serve_upstream():
+    uvicorn.run(upstream_app, port=UPSTREAM_PORT, log_level="warning", access_log=False)
+
+
+def serve_gateway():
+    from api_gateway import app  # Settings are read from the environment set in main
+
+    uvicorn.run(app, port=GATEWAY_PORT, log_level="warning", access_log=False)
+
+
+async def wait_until_up(url: str):
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not start")
+
+
+async def load(url: str, requests: int, concurrency: int):
+    latencies = []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        queue = iter(range(requests))
+
+        async def worker():
+            for n in queue:
+                start = time.perf_counter()
+                response = await client.get(f"/items/{n}")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return requests / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+async def main(args):
+    os.environ["GATEWAY_ROUTES"] = json.dumps(
+        [{"prefix": "/api", "upstream": f"http://127.0.0.1:{UPSTREAM_PORT}", "timeout": 10.0}]
+    )
+    os.environ.setdefault("RATE_LIMIT_IP_RATE", "1000000")
+    os.environ.setdefault("RATE_LIMIT_IP_BURST", "1000000")
+
+    context = multiprocessing.get_context("spawn")
+    servers = [context.Process(target=serve_upstream), context.Process(target=serve_gateway)]
+    for server in servers:
+        server.start()
+    try:
+        await wait_until_up(f"http://127.0.0.1:{UPSTREAM_PORT}")
+        await wait_until_up(f"http://127.0.0.1:{GATEWAY_PORT}/health")
+        for name, url in (
+            ("direct", f"http://127.0.0.1:{UPSTREAM_PORT}"),
+            ("gateway", f"http://127.0.0.1:{GATEWAY_PORT}/api"),
+        ):
+            await load(url, min(args.requests, 1000), args.concurrency)  # Warm up pools
+            throughput, p50, p99 = await load(url, args.requests, args.concurrency)
+            print(f"{name:>8}: {throughput:7.0f} req/s, p50 {p50 * 1000:.1f}ms, p99 {p99 * 1000:.1f}ms")
+    finally:
+        for server in servers:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,89 @@
+import json
+import os
+
+
+class Settings:
+    """
+    Settings for the API gateway.
+    """
+    server_port = os.getenv("PORT", "8080")
+
+    # Route table: requests whose path starts with `prefix` are proxied to
+    # `upstream`, with the prefix stripped. The longest matching prefix wins.
+    # Override the whole table with a JSON list in GATEWAY_ROUTES.
+    routes = json.loads(os.getenv("GATEWAY_ROUTES", "null")) or [
+        {
+            "prefix": "/api",
+            "upstream": os.getenv("APPLICATION_LAYER_URL", "http://localhost:8081"),
+            "timeout": 10.0,
+        },
+        {
+            "prefix": "/solana",
+            "upstream": os.getenv("SOLANA_SERVICE_URL", "http://localhost:8082"),
+            "timeout": 15.0,
+        },
+        {
+            "prefix": "/storage",
+            "upstream": os.getenv("DATA_STORAGE_URL", "http://localhost:8083"),
+            "timeout": 10.0,
+        },
+        {
+            "prefix": "/notifications",
+            "upstream": os.getenv("NOTIFICATIONS_URL", "http://localhost:8084"),
+            "timeout": 5.0,
+        },
+    ]
+
+    # Aggregate routes: one gateway request fans out to several upstream calls
+    # concurrently. Branch paths are formatted with the aggregate's path and
+    # query parameters; `route` names the prefix of the upstream to call.
+    # `query` lists required query parameters and the pattern each must match.
+    aggregates = [
+        {
+            "path": "/aggregate/robots/{robot_id}",
+            # Robot records do not store their owner, so the caller names the
+            # wallet; a base58 Solana address
+            "query": {"owner": r"[1-9A-HJ-NP-Za-km-z]{32,44}"},
+            "branches": [
+                {
+                    "name": "robot",
+                    "route": "/api",
+                    "path": "/robots/{robot_id}",
+                    "timeout": 3.0,
+                    "required": True,
+                },
+                {
+                    "name": "software",
+                    "route": "/api",
+                    "path": "/software/list",
+                    "timeout": 3.0,
+                },
+                {
+                    "name": "ownership",
+                    "route": "/solana",
+                    "path": "/methods/get_account_info/{owner}",
+                    "timeout": 5.0,
+                },
+            ],
+        },
+    ]
+
+    # Rate limiting (requests per second and burst size). Set REDIS_URL to share
+    # the buckets between gateway instances.
+    redis_url = os.getenv("REDIS_URL")
+    rate_limit_ip = (float(os.getenv("RATE_LIMIT_IP_RATE", "50")), int(os.getenv("RATE_LIMIT_IP_BURST", "100")))
+    rate_limit_api_key = (float(os.getenv("RATE_LIMIT_KEY_RATE", "100")), int(os.getenv("RATE_LIMIT_KEY_BURST", "200")))
+
+    # Proxies in front of the gateway (e.g. a load balancer) whose
+    # X-Forwarded-For entries are trusted. 0 when clients connect directly.
+    trusted_proxies = int(os.getenv("GATEWAY_TRUSTED_PROXIES", "0"))
+
+    # Upstream connection pools, one per route
+    http2 = os.getenv("UPSTREAM_HTTP2", "true").lower() == "true"
+    max_connections = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "200"))
+    max_keepalive_connections = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "50"))
+    keepalive_expiry = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+    connect_timeout = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "2"))
+
+
+settings = Settings()
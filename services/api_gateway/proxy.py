@@ -0,0 +1,150 @@
+import httpx
+from fastapi import Request
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse, StreamingResponse
+
+from config import settings
+
+# Connection-level headers that must not be forwarded by a proxy
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+    "host",
+}
+
+# Set by the gateway itself; client-supplied values are dropped
+FORWARDED_HEADERS = {"forwarded", "x-forwarded-for", "x-forwarded-proto", "x-real-ip"}
+
+
+def client_address(request: Request) -> str:
+    """The address of the client, skipping `settings.trusted_proxies` hops.
+
+    With no trusted proxies in front of the gateway the peer address is the
+    client and any X-Forwarded-For it sent is ignored. Behind N proxies the
+    client is the Nth address from the right of the chain the last proxy
+    reports, so entries a client prepends are never used.
+    """
+    chain = [request.client.host] if request.client else []
+    if settings.trusted_proxies:
+        forwarded = request.headers.getlist("x-forwarded-for")
+        chain = [ip.strip() for value in forwarded for ip in value.split(",") if ip.strip()] + chain
+        return chain[max(len(chain) - 1 - settings.trusted_proxies, 0)] if chain else "unknown"
+    return chain[0] if chain else "unknown"
+
+
+class Upstream:
+    """
+    A single backend service behind the gateway.
+
+    Each upstream owns a pooled `httpx.AsyncClient`, so connections are kept
+    alive across requests (HTTP/2 when the backend supports it, HTTP/1.1
+    keep-alive otherwise) and the per-route timeout applies to every hop.
+    """
+
+    def __init__(self, prefix: str, upstream: str, timeout: float):
+        self.prefix = prefix.rstrip("/")
+        self.upstream = upstream.rstrip("/")
+        self.timeout = timeout
+        self.client = httpx.AsyncClient(
+            base_url=self.upstream,
+            http2=settings.http2,
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(timeout, connect=settings.connect_timeout),
+        )
+
+    def matches(self, path: str) -> bool:
+        return path == self.prefix or path.startswith(self.prefix + "/")
+
+    async def forward(self, request: Request, path: str):
+        """Proxy `request` to this upstream without buffering either body."""
+        headers = [
+            (name, value)
+            for name, value in request.headers.items()
+            if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() not in FORWARDED_HEADERS
+        ]
+        # A single value, so upstreams trusting the gateway read the real client
+        headers.append(("x-forwarded-for", client_address(request)))
+        headers.append(("x-forwarded-proto", request.url.scheme))
+
+        has_body = "content-length" in request.headers or "transfer-encoding" in request.headers
+        upstream_request = self.client.build_request(
+            request.method,
+            path or "/",
+            params=request.query_params.multi_items(),
+            headers=headers,
+            content=request.stream() if has_body else None,
+        )
+        try:
+            upstream_response = await self.client.send(upstream_request, stream=True)
+        except httpx.TimeoutException:
+            return JSONResponse({"detail": "Upstream timed out"}, status_code=504)
+        except httpx.HTTPError as exc:
+            return JSONResponse({"detail": f"Upstream unavailable: {exc}"}, status_code=502)
+
+        response = StreamingResponse(
+            upstream_response.aiter_raw(),
+            status_code=upstream_response.status_code,
+            background=BackgroundTask(upstream_response.aclose),
+        )
+        # Raw pairs rather than a mapping, so repeated headers such as
+        # Set-Cookie are forwarded one by one instead of comma-joined
+        response.raw_headers = [
+            (name.lower(), value)
+            for name, value in upstream_response.headers.raw
+            if name.lower().decode("latin-1") not in HOP_BY_HOP_HEADERS
+        ]
+        return response
+
+    async def fetch_json(self, path: str, params=None, headers=None, timeout=None):
+        """Request `path` from this upstream and return the decoded JSON body."""
+        response = await self.client.get(
+            path,
+            params=params,
+            headers=headers,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class RouteTable:
+    """Longest-prefix route lookup over the configured upstreams."""
+
+    def __init__(self, routes: list):
+        self.upstreams = sorted(
+            (Upstream(**route) for route in routes),
+            key=lambda upstream: len(upstream.prefix),
+            reverse=True,
+        )
+
+    def get(self, prefix: str):
+        """Return the upstream configured for `prefix`."""
+        for upstream in self.upstreams:
+            if upstream.prefix == prefix.rstrip("/"):
+                return upstream
+        raise KeyError(f"No upstream configured for {prefix}")
+
+    def resolve(self, path: str):
+        """Return the matching upstream and the path to request from it."""
+        for upstream in self.upstreams:
+            if upstream.matches(path):
+                return upstream, path[len(upstream.prefix):]
+        return None, None
+
+    async def close(self):
+        for upstream in self.upstreams:
+            await upstream.close()
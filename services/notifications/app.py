@@ -1,55 +1,137 @@
 import os
+import time
 import uvicorn
+from datetime import datetime, timezone
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from starlette.responses import JSONResponse
+
+from construct_shared.service_auth import ServiceAuth
+from construct_shared.user_auth import Caller, UserAuth
+
+from config import settings
+from digest import DIGEST_WINDOWS, DigestAggregator
+from engine import NotificationEngine
+from models import (
+    DigestFrequency,
+    NotificationAccepted,
+    NotificationCreate,
+    NotificationEvent,
+    NotificationPreferences,
+    Priority,
+    PreferencesUpdate,
+)
+from preferences import PreferenceStore, quiet_until
 
 
 app = FastAPI()
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-templates = Jinja2Templates(directory="app/templates")
-
-# Retrieve list of all available services
-@app.get('/services')
-async def getServices():
-    try:
-        response = getServiceList()
-        return JSONResponse(response)
-    except Exception as e:
-        return JSONResponse({"error": str(e)})
-
-# Retrieve details on specific service
-@app.get('/services/{serviceId}')
-async def getService(serviceId: str):
-    try:
-        response = getServiceDetails(serviceId)
-        return JSONResponse(response)
-    except Exception as e:
-        return JSONResponse({"error": str(e)})
-
-# Update service details
-@app.put('/services/update/{serviceId}')
-async def updateService(serviceId: str):
-    try:
-        response = updateServiceDetails(serviceId)
-        return JSONResponse(response)
-    except Exception as e:
-        return JSONResponse({"error": str(e)})
-    
-# Create new service listing
-@app.put('/services/update/{serviceId}')
-async def createService(serviceId: str):
-    try:
-        response = createServiceListing(serviceId)
-        return JSONResponse(response)
-    except Exception as e:
-        return JSONResponse({"error": str(e)})
-
+templates = Jinja2Templates(directory="templates")
+
+engine = NotificationEngine(settings)
+preference_store = PreferenceStore(
+    settings.preferences_collection, settings.preferences_cache_ttl, settings.preferences_cache_size
+)
+digests = DigestAggregator(engine, settings.digest_max_events)
+
+# Notifications are sent by other services, never directly by users
+service_auth = ServiceAuth.from_env()
+# Preferences are managed by their user, or by other services
+user_auth = UserAuth.from_env(services=service_auth)
+
+
+@app.on_event("startup")
+async def start_engine():
+    engine.start()
+    digests.start()
+
+
+@app.on_event("shutdown")
+async def stop_engine():
+    # Open digests are flushed first, then queued notifications get up to
+    # SHUTDOWN_TIMEOUT to go out
+    await digests.stop()
+    await engine.stop()
+
+
+# Queue a notification for delivery
+@app.post('/notifications', response_model=NotificationAccepted, status_code=202)
+async def createNotification(notification: NotificationCreate, service: str = Depends(service_auth)):
+    job_id = engine.submit(notification.dict(), notification.priority)
+    if job_id is None:
+        raise HTTPException(
+            status_code=503,
+            detail=f"{notification.channel.value} queue is full",
+            headers={"Retry-After": "1"},
+        )
+    return NotificationAccepted(id=job_id, channel=notification.channel, priority=notification.priority)
+
+
+# Queue depth, throughput counters and latency per channel
+@app.get('/notifications/stats')
+async def getNotificationStats():
+    return {
+        **engine.stats(),
+        "digests": digests.stats(),
+        "preferences_cache": preference_store.stats(),
+    }
+
+
+@app.get('/preferences/{user_id}', response_model=NotificationPreferences)
+async def getPreferences(user_id: str, caller: Caller = Depends(user_auth)):
+    caller.require(user_id)
+    return await preference_store.get(user_id)
+
+
+@app.put('/preferences/{user_id}', response_model=NotificationPreferences)
+async def updatePreferences(user_id: str, update: PreferencesUpdate, caller: Caller = Depends(user_auth)):
+    caller.require(user_id)
+    preferences = NotificationPreferences(user_id=user_id, **update.dict())
+    await preference_store.put(preferences)
+    return preferences
+
+
+# Route an event by the user's preferences: critical events and users
+# without digests outside quiet hours are notified now, everything else
+# goes into the user's digest
+@app.post('/events', status_code=202)
+async def createEvent(event: NotificationEvent, service: str = Depends(service_auth)):
+    preferences = await preference_store.get(event.user_id)
+    if not preferences.channels:
+        return {"status": "skipped", "reason": "no channels enabled"}
+
+    now = datetime.now(timezone.utc)
+    quiet_end = quiet_until(preferences, now) if event.priority != Priority.critical else None
+    if event.priority == Priority.critical or (
+        preferences.digest_frequency == DigestFrequency.off and quiet_end is None
+    ):
+        jobs = {}
+        for channel, recipient in preferences.channels.items():
+            notification = {
+                "user_id": event.user_id,
+                "channel": channel.value,
+                "recipient": recipient,
+                "kind": event.kind,
+                "subject": event.title,
+                "body": event.body,
+                "data": event.data,
+            }
+            jobs[channel.value] = engine.submit(notification, event.priority)
+        if not any(jobs.values()):
+            raise HTTPException(status_code=503, detail="Notification queues are full", headers={"Retry-After": "1"})
+        return {"status": "sent", "jobs": jobs}
+
+    due = time.time()
+    if preferences.digest_frequency != DigestFrequency.off:
+        due += DIGEST_WINDOWS[preferences.digest_frequency.value]
+    if quiet_end is not None:
+        due = max(due, quiet_end.timestamp())
+    digests.add(event, preferences, due)
+    return {"status": "digested", "due": datetime.fromtimestamp(due, timezone.utc)}
 
 
 ###
@@ -0,0 +1,52 @@
+import json
+import os
+
+DEFAULT_CHANNELS = {
+    "email": {"provider": "stub", "batch_size": 100, "workers": 4, "max_queue": 50000, "linger": 0.05},
+    "sms": {"provider": "stub", "batch_size": 1, "workers": 16, "max_queue": 20000, "linger": 0},
+    "push": {"provider": "stub", "batch_size": 500, "workers": 2, "max_queue": 100000, "linger": 0.05},
+}
+
+
+def _channels() -> dict:
+    overrides = json.loads(os.getenv("NOTIFICATION_CHANNELS", "{}"))
+    return {
+        name: {**DEFAULT_CHANNELS.get(name, {}), **overrides.get(name, {})}
+        for name in {**DEFAULT_CHANNELS, **overrides}
+    }
+
+
+class Settings:
+    """
+    Settings for the notification service.
+    """
+    server_port = os.getenv("PORT", "8080")
+
+    # Delivery per channel. `batch_size` is capped by what the provider
+    # accepts in one call, `workers` bounds concurrent calls to the provider
+    # and `max_queue` bounds jobs waiting; beyond it submissions are rejected.
+    # `linger` is how long a worker waits to fill a batch once it has a job.
+    # Override individual channels with a JSON object in NOTIFICATION_CHANNELS.
+    channels = _channels()
+
+    # Failed deliveries are retried after a fully jittered exponential backoff
+    max_attempts = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+    retry_base_delay = float(os.getenv("NOTIFICATION_RETRY_BASE_DELAY", "1"))
+    retry_max_delay = float(os.getenv("NOTIFICATION_RETRY_MAX_DELAY", "60"))
+    shutdown_timeout = float(os.getenv("SHUTDOWN_TIMEOUT", "10"))
+
+    # Stub providers simulate a provider's round trip and error rate
+    stub_latency = float(os.getenv("STUB_PROVIDER_LATENCY", "0.05"))
+    stub_failure_rate = float(os.getenv("STUB_PROVIDER_FAILURE_RATE", "0.01"))
+
+    # User preferences live in Firestore behind a per-instance TTL cache
+    envir = os.getenv("ENVIR", "dev")
+    preferences_collection = f"{envir}_notification_preferences"
+    preferences_cache_ttl = float(os.getenv("PREFERENCES_CACHE_TTL", "300"))
+    preferences_cache_size = int(os.getenv("PREFERENCES_CACHE_SIZE", "100000"))
+
+    # Latest events listed in a digest; older ones are only counted
+    digest_max_events = int(os.getenv("DIGEST_MAX_EVENTS", "10"))
+
+
+settings = Settings()
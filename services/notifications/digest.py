@@ -0,0 +1,142 @@
+"""
+Per-user digests
+
+Events for users who want digests, or who are in quiet hours, are grouped
+per user instead of being sent one by one. The grouping is incremental: a
+user's open window keeps counts by event kind and the latest few events,
+and is flushed as a single notification per channel when it falls due. Due
+times sit in a min-heap, so the flusher sleeps until the next window ends.
+Memory is proportional to users with an open window, not to events.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from models import NotificationEvent, NotificationPreferences, Priority
+from preferences import quiet_until
+
+DIGEST_WINDOWS = {"hourly": 3600, "daily": 86400}
+
+
+class DigestWindow:
+    __slots__ = ("user_id", "due", "preferences", "counts", "events", "total", "priority")
+
+    def __init__(self, user_id: str, due: float, preferences: NotificationPreferences, max_events: int):
+        self.user_id = user_id
+        self.due = due
+        self.preferences = preferences
+        self.counts = Counter()
+        self.events = deque(maxlen=max_events)
+        self.total = 0
+        self.priority = Priority.low
+
+
+class DigestAggregator:
+    """Windowed group-by of events per user, flushed into the engine."""
+
+    def __init__(self, engine, max_events: int):
+        self.engine = engine
+        self.max_events = max_events
+        self._windows: Dict[str, DigestWindow] = {}
+        self._heap: List[Tuple[float, int, str]] = []  # (due, seq, user_id)
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.counters = dict.fromkeys(("events", "digests", "rejected"), 0)
+
+    def add(self, event: NotificationEvent, preferences: NotificationPreferences, due: float):
+        """Fold `event` into the user's window, opening one due at `due` if needed."""
+        window = self._windows.get(event.user_id)
+        if window is None:
+            window = self._windows[event.user_id] = DigestWindow(
+                event.user_id, due, preferences, self.max_events
+            )
+            self._schedule(window)
+        else:
+            window.preferences = preferences
+        window.counts[event.kind] += 1
+        window.events.append((event.kind, event.title))
+        window.total += 1
+        window.priority = min(window.priority, event.priority)
+        self.counters["events"] += 1
+
+    def _schedule(self, window: DigestWindow):
+        if not self._heap or window.due < self._heap[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self._heap, (window.due, next(self._sequence), window.user_id))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="digest-flusher")
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            due, _, user_id = self._heap[0]
+            delay = due - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            heapq.heappop(self._heap)
+            window = self._windows.get(user_id)
+            if window is None or window.due != due:
+                continue  # Superseded entry
+            quiet_end = quiet_until(window.preferences, datetime.now(timezone.utc))
+            if quiet_end is not None:
+                window.due = quiet_end.timestamp()
+                self._schedule(window)
+                continue
+            del self._windows[user_id]
+            self._flush(window)
+
+    def _flush(self, window: DigestWindow):
+        kinds = ", ".join(f"{count} {kind.replace('_', ' ')}" for kind, count in window.counts.most_common())
+        lines = [f"- {title}" for _, title in reversed(window.events)]
+        if window.total > len(window.events):
+            lines.append(f"...and {window.total - len(window.events)} more")
+        subject = window.events[-1][1] if window.total == 1 else f"{window.total} updates: {kinds}"
+        body = "\n".join(lines)
+
+        for channel, recipient in window.preferences.channels.items():
+            notification = {
+                "user_id": window.user_id,
+                "channel": channel.value,
+                "recipient": recipient,
+                "kind": "digest",
+                "subject": subject,
+                "body": body,
+                "data": {"counts": dict(window.counts)},
+            }
+            if self.engine.submit(notification, window.priority) is None:
+                self.counters["rejected"] += 1
+        self.counters["digests"] += 1
+
+    async def stop(self):
+        """Flush every open window so pending events are not lost on shutdown."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        for window in list(self._windows.values()):
+            self._flush(window)
+        self._windows.clear()
+        self._heap.clear()
+
+    def stats(self) -> dict:
+        return {
+            "open_windows": len(self._windows),
+            "scheduled": len(self._heap),
+            **self.counters,
+            "events_per_digest": round(self.counters["events"] / self.counters["digests"], 2)
+            if self.counters["digests"] else None,
+        }
@@ -0,0 +1,235 @@
+"""
+Notification dispatch engine
+
+Each channel (email, SMS, push) has its own priority queue and a fixed set
+of worker tasks. A worker takes the most urgent job, then fills a batch up
+to the channel's batch size, waiting at most `linger` seconds for more
+jobs, and hands the batch to the channel's provider in one call. The number
+of workers bounds concurrent provider calls per channel, and the queue size
+bounds memory: once a channel's queue is full new jobs are rejected.
+
+Failed notifications go back on the queue after an exponential backoff with
+full jitter, so retries from one provider outage do not arrive in waves.
+"""
+import asyncio
+import itertools
+import random
+import uuid
+from collections import deque
+from typing import Dict, List, Optional
+
+from providers import DeliveryError, Provider, create_provider
+
+# Latency samples kept per channel for percentiles
+LATENCY_SAMPLES = 10000
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(samples)
+    return {
+        name: round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+        for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+    }
+
+
+class Job:
+    __slots__ = ("id", "priority", "notification", "submitted_at", "enqueued_at", "attempt")
+
+    def __init__(self, priority: int, notification: dict, now: float):
+        self.id = uuid.uuid4().hex
+        self.priority = priority
+        self.notification = notification
+        self.submitted_at = now
+        self.enqueued_at = now
+        self.attempt = 1
+
+
+class ChannelDispatcher:
+    """Queue, workers and counters for one delivery channel."""
+
+    def __init__(
+        self,
+        channel: str,
+        provider: Provider,
+        batch_size: int,
+        workers: int,
+        max_queue: int,
+        linger: float,
+        max_attempts: int,
+        retry_base_delay: float,
+        retry_max_delay: float,
+    ):
+        self.channel = channel
+        self.provider = provider
+        self.batch_size = max(1, min(batch_size, provider.max_batch_size))
+        self.workers = workers
+        self.linger = linger
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=max_queue)
+        self._sequence = itertools.count()  # FIFO within a priority
+        self._tasks: List[asyncio.Task] = []
+        self._retries = set()
+
+        self.counters = dict.fromkeys(
+            ("submitted", "rejected", "delivered", "failed", "retried", "batches"), 0
+        )
+        self.in_flight = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # submit -> delivered
+        self.queue_waits = deque(maxlen=LATENCY_SAMPLES)  # enqueue -> sent to provider
+
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"{self.channel}-worker-{n}")
+            for n in range(self.workers)
+        ]
+
+    def submit(self, job: Job) -> bool:
+        try:
+            self.queue.put_nowait((job.priority, next(self._sequence), job))
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            return False
+        self.counters["submitted"] += 1
+        return True
+
+    async def _next_batch(self) -> List[Job]:
+        loop = asyncio.get_running_loop()
+        batch = [(await self.queue.get())[2]]
+        deadline = loop.time() + self.linger
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait()[2])
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append((await asyncio.wait_for(self.queue.get(), remaining))[2])
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            self.in_flight += len(batch)
+            try:
+                await self._deliver(batch, loop.time())
+            except Exception as exc:
+                # Keep the worker alive; the batch is counted as failed
+                print(f"Error delivering {self.channel} batch: {exc}")
+                self.counters["failed"] += len(batch)
+            finally:
+                self.in_flight -= len(batch)
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _deliver(self, batch: List[Job], started: float):
+        for job in batch:
+            self.queue_waits.append(started - job.enqueued_at)
+        self.counters["batches"] += 1
+        try:
+            results = await self.provider.send_batch([job.notification for job in batch])
+        except Exception as exc:
+            print(f"Error sending {self.channel} batch: {exc}")
+            results = [DeliveryError(str(exc))] * len(batch)
+
+        finished = asyncio.get_running_loop().time()
+        for job, error in zip(batch, results):
+            if error is None:
+                self.counters["delivered"] += 1
+                self.latencies.append(finished - job.submitted_at)
+            elif error.permanent or job.attempt >= self.max_attempts:
+                self.counters["failed"] += 1
+                print(f"Giving up on {self.channel} notification {job.id}: {error}")
+            else:
+                self._schedule_retry(job)
+
+    def _schedule_retry(self, job: Job):
+        ceiling = min(self.retry_max_delay, self.retry_base_delay * 2 ** (job.attempt - 1))
+        job.attempt += 1
+        self.counters["retried"] += 1
+        task = asyncio.create_task(self._retry_after(job, random.uniform(0, ceiling)))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _retry_after(self, job: Job, delay: float):
+        await asyncio.sleep(delay)
+        job.enqueued_at = asyncio.get_running_loop().time()
+        # Waits for room rather than dropping a job that was already accepted
+        await self.queue.put((job.priority, next(self._sequence), job))
+
+    async def stop(self, timeout: float):
+        """Deliver what is queued within `timeout`, then stop the workers."""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"{self.queue.qsize()} {self.channel} notifications undelivered at shutdown")
+        for task in [*self._tasks, *self._retries]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        await self.provider.close()
+
+    def stats(self) -> dict:
+        batches = self.counters["batches"]
+        return {
+            "provider": self.provider.name,
+            "batch_size": self.batch_size,
+            "workers": self.workers,
+            "queued": self.queue.qsize(),
+            "in_flight": self.in_flight,
+            "retry_pending": len(self._retries),
+            **self.counters,
+            "average_batch": round(
+                (self.counters["delivered"] + self.counters["failed"] + self.counters["retried"]) / batches, 2
+            ) if batches else None,
+            "latency_ms": _percentiles(self.latencies),
+            "queue_wait_ms": _percentiles(self.queue_waits),
+        }
+
+
+class NotificationEngine:
+    """Routes notifications to their channel's dispatcher."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.dispatchers: Dict[str, ChannelDispatcher] = {}
+
+    def start(self):
+        """Create the channel queues and workers; call from the running event loop."""
+        for channel, config in self.settings.channels.items():
+            dispatcher = ChannelDispatcher(
+                channel,
+                create_provider(channel, config, self.settings),
+                batch_size=config["batch_size"],
+                workers=config["workers"],
+                max_queue=config["max_queue"],
+                linger=config["linger"],
+                max_attempts=self.settings.max_attempts,
+                retry_base_delay=self.settings.retry_base_delay,
+                retry_max_delay=self.settings.retry_max_delay,
+            )
+            dispatcher.start()
+            self.dispatchers[channel] = dispatcher
+
+    def submit(self, notification: dict, priority: int) -> Optional[str]:
+        """Queue a notification; returns its job ID, or None if the queue is full."""
+        dispatcher = self.dispatchers[notification["channel"]]
+        job = Job(priority, notification, asyncio.get_running_loop().time())
+        return job.id if dispatcher.submit(job) else None
+
+    async def stop(self):
+        await asyncio.gather(
+            *(dispatcher.stop(self.settings.shutdown_timeout) for dispatcher in self.dispatchers.values())
+        )
+
+    def stats(self) -> dict:
+        return {channel: dispatcher.stats() for channel, dispatcher in self.dispatchers.items()}
@@ -1,5 +1,8 @@
-from pydantic import BaseModel
+from datetime import time
+from enum import Enum, IntEnum
+from pydantic import BaseModel, Field, validator
 from typing import Dict, List
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 class ServiceDetails(BaseModel):
     serviceId: str
@@ -10,3 +13,109 @@ class ServiceDetails(BaseModel):
     price: Dict | None = None
     providerId: str | None = None
     reviewsId: str | None = None
+
+
+class Channel(str, Enum):
+    email = "email"
+    sms = "sms"
+    push = "push"
+
+
+class Priority(IntEnum):
+    """Lower values are delivered first"""
+    critical = 0
+    high = 1
+    normal = 2
+    low = 3
+
+
+class NotificationCreate(BaseModel):
+    user_id: str
+    channel: Channel
+    recipient: str = Field(..., description="Email address, phone number or device token")
+    kind: str = Field(..., description="e.g. order_update, subscription_renewal, promotion")
+    subject: str | None = None
+    body: str
+    priority: Priority = Priority.normal
+    data: Dict | None = None
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "user_id": "100154678",
+                "channel": "email",
+                "recipient": "user@example.com",
+                "kind": "order_update",
+                "subject": "Your order has shipped",
+                "body": "Order 12987 is on its way.",
+                "priority": 1,
+            }
+        }
+
+
+class NotificationAccepted(BaseModel):
+    id: str
+    channel: Channel
+    priority: Priority
+
+
+class DigestFrequency(str, Enum):
+    off = "off"
+    hourly = "hourly"
+    daily = "daily"
+
+
+class QuietHours(BaseModel):
+    start: time = Field(..., description="Local time quiet hours begin, e.g. 22:00")
+    end: time = Field(..., description="Local time quiet hours end, e.g. 07:00")
+    timezone: str = "UTC"
+
+    @validator("timezone")
+    def validate_timezone(cls, v):
+        try:
+            ZoneInfo(v)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone {v}")
+        return v
+
+
+class PreferencesUpdate(BaseModel):
+    channels: Dict[Channel, str] = Field(
+        {}, description="Enabled channels and the recipient for each"
+    )
+    digest_frequency: DigestFrequency = DigestFrequency.off
+    quiet_hours: QuietHours | None = None
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "channels": {"email": "user@example.com", "push": "device-token"},
+                "digest_frequency": "hourly",
+                "quiet_hours": {"start": "22:00", "end": "07:00", "timezone": "Europe/London"},
+            }
+        }
+
+
+class NotificationPreferences(PreferencesUpdate):
+    user_id: str
+
+
+class NotificationEvent(BaseModel):
+    """Something that happened to a user, e.g. an order update"""
+    user_id: str
+    kind: str = Field(..., description="e.g. order_update, subscription_renewal, promotion")
+    title: str
+    body: str
+    priority: Priority = Priority.normal
+    data: Dict | None = None
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "user_id": "100154678",
+                "kind": "order_update",
+                "title": "Order filled",
+                "body": "Your buy order for robot 12987 was filled at 150 CONSTRUCT.",
+                "priority": 2,
+            }
+        }
@@ -0,0 +1,104 @@
+"""
+User notification preferences
+
+Preferences are stored in Firestore, one document per user, and read
+through an in-process LRU cache with a TTL, so the event path rarely waits
+on Firestore. Writes go to Firestore first and then replace the cached
+copy on this instance; other instances pick the change up within the TTL.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from google.cloud import firestore
+
+from models import NotificationPreferences
+
+
+def quiet_until(preferences: NotificationPreferences, now: datetime) -> Optional[datetime]:
+    """If `now` (UTC) is inside the user's quiet hours, return when they end."""
+    quiet = preferences.quiet_hours
+    if quiet is None or quiet.start == quiet.end:
+        return None
+    local = now.astimezone(ZoneInfo(quiet.timezone))
+    current = local.time()
+    if quiet.start < quiet.end:
+        inside = quiet.start <= current < quiet.end
+    else:  # Spans midnight, e.g. 22:00-07:00
+        inside = current >= quiet.start or current < quiet.end
+    if not inside:
+        return None
+    end = local.replace(hour=quiet.end.hour, minute=quiet.end.minute, second=0, microsecond=0)
+    if end <= local:
+        end += timedelta(days=1)
+    return end.astimezone(timezone.utc)
+
+
+class PreferenceStore:
+    """Firestore-backed preferences with a bounded TTL cache in front."""
+
+    def __init__(self, collection: str, ttl: float, max_size: int):
+        self.collection = collection
+        self.ttl = ttl
+        self.max_size = max_size
+        self._db = None
+        self._cache = OrderedDict()  # user_id -> (preferences, expires_at)
+        self._loading = {}  # user_id -> Future, so concurrent misses share one read
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = firestore.AsyncClient()
+        return self._db
+
+    def _remember(self, user_id: str, preferences: NotificationPreferences):
+        self._cache[user_id] = (preferences, time.monotonic() + self.ttl)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def get(self, user_id: str) -> NotificationPreferences:
+        entry = self._cache.get(user_id)
+        if entry is not None and entry[1] > time.monotonic():
+            self._cache.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+
+        pending = self._loading.get(user_id)
+        if pending is not None:
+            return await pending
+        future = asyncio.get_running_loop().create_future()
+        self._loading[user_id] = future
+        try:
+            doc = await self.db.collection(self.collection).document(user_id).get()
+            preferences = (
+                NotificationPreferences(**doc.to_dict())
+                if doc.exists
+                else NotificationPreferences(user_id=user_id)
+            )
+            self._remember(user_id, preferences)
+            future.set_result(preferences)
+            return preferences
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # Retrieved here in case nobody else was waiting
+            raise
+        finally:
+            del self._loading[user_id]
+
+    async def put(self, preferences: NotificationPreferences):
+        # Through JSON so quiet hours are stored as "HH:MM" strings
+        await self.db.collection(self.collection).document(preferences.user_id).set(
+            json.loads(preferences.json())
+        )
+        self._remember(preferences.user_id, preferences)
+
+    def stats(self) -> dict:
+        return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,97 @@
+"""
+Delivery providers
+
+A provider sends a batch of notifications in one call and reports success
+per notification. `max_batch_size` is the most the provider accepts per
+call; a channel's configured batch size is capped to it.
+"""
+import asyncio
+import random
+from abc import ABC, abstractmethod
+from typing import List
+
+
+class DeliveryError(Exception):
+    """A notification failed to deliver. Permanent errors are not retried."""
+
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class Provider(ABC):
+    """Base class for delivery providers"""
+
+    name = "provider"
+    max_batch_size = 1
+
+    @abstractmethod
+    async def send_batch(self, notifications: List[dict]) -> List[DeliveryError | None]:
+        """Deliver `notifications`; return None or a DeliveryError for each."""
+
+    async def close(self):
+        pass
+
+
+class StubProvider(Provider):
+    """
+    Simulates a remote provider for local runs and benchmarks.
+
+    Each call takes `latency` seconds plus a small per-item cost, and each
+    notification fails transiently with probability `failure_rate`.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float, failure_rate: float, per_item_latency: float = 0.0001):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.per_item_latency = per_item_latency
+        self.calls = 0
+        self.delivered = 0
+
+    async def send_batch(self, notifications: List[dict]) -> List[DeliveryError | None]:
+        self.calls += 1
+        await asyncio.sleep(self.latency + self.per_item_latency * len(notifications))
+        results = []
+        for _ in notifications:
+            if random.random() < self.failure_rate:
+                results.append(DeliveryError("Simulated provider error"))
+            else:
+                self.delivered += 1
+                results.append(None)
+        return results
+
+
+class StubEmailProvider(StubProvider):
+    # Bulk email APIs typically take up to 1000 personalised messages per call
+    name = "stub-email"
+    max_batch_size = 1000
+
+
+class StubSmsProvider(StubProvider):
+    # SMS APIs generally send one message per request
+    name = "stub-sms"
+    max_batch_size = 1
+
+
+class StubPushProvider(StubProvider):
+    # Push multicast calls take up to 500 device tokens
+    name = "stub-push"
+    max_batch_size = 500
+
+
+STUB_PROVIDERS = {
+    "email": StubEmailProvider,
+    "sms": StubSmsProvider,
+    "push": StubPushProvider,
+}
+
+
+def create_provider(channel: str, config: dict, settings) -> Provider:
+    """Build the provider configured for `channel`."""
+    if config.get("provider", "stub") == "stub":
+        return STUB_PROVIDERS.get(channel, StubProvider)(
+            settings.stub_latency, settings.stub_failure_rate
+        )
+    raise ValueError(f"Unknown provider {config['provider']!r} for channel {channel}")
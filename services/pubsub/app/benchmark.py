@@ -0,0 +1,68 @@
+"""
+Message codec benchmark
+
+Encodes and decodes synthetic transaction batches with the msgpack codec
+and with the legacy str() format, and reports payload sizes and messages
+per second for each. Run from this directory with the repository root on
+the path, e.g.:
+
+    PYTHONPATH=../../.. python benchmark.py --count 20000 --batch 50
+"""
+import argparse
+import random
+import time
+
+from codec.codec import ATTR_ENCODING, ENCODING_LEGACY, decode_message, encode_message
+
+
+def synthetic_batch(rng: random.Random, size: int) -> dict:
+    return {
+        "chain": "injective",
+        "block": rng.randrange(10 ** 8),
+        "transactions": [
+            {
+                "hash": "%064x" % rng.getrandbits(256),
+                "sender": "inj1%038x" % rng.getrandbits(152),
+                "amount": round(rng.uniform(0, 10 ** 6), 6),
+                "fee": rng.randrange(10 ** 6),
+                "memo": rng.choice(["", "order fill", "robot rental", "subscription"]),
+            }
+            for _ in range(size)
+        ],
+    }
+
+
+def legacy_encode(data):
+    return str(data).encode("utf-8"), {ATTR_ENCODING: ENCODING_LEGACY}
+
+
+def run(name, encode, payloads):
+    started = time.perf_counter()
+    encoded = [encode(payload) for payload in payloads]
+    encode_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for data, attributes in encoded:
+        decode_message(data, attributes)
+    decode_seconds = time.perf_counter() - started
+
+    total = sum(len(data) for data, _ in encoded)
+    print(
+        f"{name:>8}: {total / len(encoded):9.0f} bytes/msg, "
+        f"encode {len(encoded) / encode_seconds:9.0f} msg/s, "
+        f"decode {len(encoded) / decode_seconds:9.0f} msg/s"
+    )
+
+
+def main(args):
+    rng = random.Random(42)
+    payloads = [synthetic_batch(rng, args.batch) for _ in range(args.count)]
+    run("legacy", legacy_encode, payloads)
+    run("codec", encode_message, payloads)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=10000, help="Messages to encode and decode")
+    parser.add_argument("--batch", type=int, default=20, help="Transactions per message")
+    main(parser.parse_args())
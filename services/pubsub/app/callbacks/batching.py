@@ -0,0 +1,195 @@
+# Micro-batching framework for subscription callbacks
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from services.pubsub.config.config import settings
+from codec.codec import CodecError, decode_message
+from workers.cpu_pool import cpu_pool
+
+
+class SeenMessages:
+    """
+    Bounded set of recently processed message IDs.
+
+    Pub/Sub delivers at least once, so a message that was processed and acked
+    can still arrive again. The oldest IDs are evicted once `max_size` is
+    reached, which keeps memory flat while covering the usual redelivery window.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, message_id) -> bool:
+        with self._lock:
+            return message_id in self._ids
+
+    def add(self, message_id):
+        with self._lock:
+            self._ids[message_id] = None
+            self._ids.move_to_end(message_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+
+class BatchingCallback:
+    """
+    Subscription callback that groups messages into micro-batches.
+
+    Messages are buffered until either `max_messages` are pending or the
+    oldest one has waited `max_latency` seconds. The batch is decoded on the
+    CPU pool, and the message IDs and payloads are handed to `handler` in a
+    single call, which must return one boolean per payload. Successful items
+    are acked. Failed items go to `retry_policy` when one is set, otherwise
+    they are nacked so Pub/Sub redelivers them.
+
+    Redelivered messages whose ID was already processed are acked without
+    reaching the handler. Duplicates of a message that is still pending are
+    settled together with the original.
+    """
+
+    def __init__(
+        self, name: str, handler, max_messages=None, max_latency=None, retry_policy=None
+    ):
+        self.name = name
+        self.handler = handler
+        self.retry_policy = retry_policy
+        self.max_messages = settings.batch_max_messages if max_messages is None else max_messages
+        self.max_latency = settings.batch_max_latency if max_latency is None else max_latency
+        self.seen = SeenMessages(settings.seen_set_size)
+
+        self._pending = OrderedDict()  # message_id -> [messages]
+        self._oldest = None
+        self._condition = threading.Condition()
+        # The executor and flusher thread start with the first message
+        self._executor = None
+        self._flusher = None
+        self._closed = False
+
+    def _start(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.batch_workers, thread_name_prefix=f"{self.name}-batch"
+        )
+        self._flusher = threading.Thread(
+            target=self._run, name=f"{self.name}-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def __call__(self, message):
+        message_id = message.message_id
+        if message_id in self.seen:
+            message.ack()
+            return
+
+        with self._condition:
+            if self._closed:
+                # Arrived after the drain; let Pub/Sub redeliver it
+                message.nack()
+                return
+            if self._flusher is None:
+                self._start()
+            if message_id in self._pending:
+                self._pending[message_id].append(message)
+                return
+            self._pending[message_id] = [message]
+            if self._oldest is None:
+                # Wake the flusher so it starts the latency timer for this batch
+                self._oldest = time.monotonic()
+                self._condition.notify()
+            elif len(self._pending) >= self.max_messages:
+                self._condition.notify()
+
+    def close(self, timeout=None):
+        """Flush buffered messages and wait until every batch is settled.
+
+        Call once the subscription has stopped delivering messages, before
+        the subscriber client is closed, so pending acks are not lost.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            flusher, executor = self._flusher, self._executor
+        if flusher is not None:
+            flusher.join(timeout)
+            executor.shutdown(wait=True)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._due():
+                    if self._closed and not self._pending:
+                        return
+                    timeout = None
+                    if self._oldest is not None:
+                        timeout = max(0.0, self._oldest + self.max_latency - time.monotonic())
+                    self._condition.wait(timeout)
+                batch = self._pending
+                self._pending = OrderedDict()
+                self._oldest = None
+            self._executor.submit(self._process, batch)
+
+    def _due(self) -> bool:
+        if not self._pending:
+            return False
+        if self._closed:
+            return True
+        if len(self._pending) >= self.max_messages:
+            return True
+        return time.monotonic() - self._oldest >= self.max_latency
+
+    def _process(self, batch: OrderedDict):
+        message_ids = list(batch)
+        messages = [batch[message_id][0] for message_id in message_ids]
+        decoded = cpu_pool.map(
+            decode_message,
+            [message.data for message in messages],
+            [dict(message.attributes) for message in messages],
+        )
+
+        # message_id -> (error, permanent) for every item that did not succeed
+        failures = {}
+        for message_id, payload in zip(message_ids, decoded):
+            if isinstance(payload, Exception):
+                print(f"Error decoding {self.name} message {message_id}: {str(payload)}")
+                # Only a payload that cannot be decoded is a permanent failure;
+                # a crashed worker or pool error is retried like a handler error
+                failures[message_id] = (payload, isinstance(payload, CodecError))
+
+        valid = [index for index, message_id in enumerate(message_ids) if message_id not in failures]
+        if valid:
+            try:
+                handled = self.handler(
+                    [message_ids[index] for index in valid],
+                    [decoded[index] for index in valid],
+                )
+                if len(handled) != len(valid):
+                    raise ValueError(
+                        f"Handler returned {len(handled)} results for {len(valid)} messages"
+                    )
+                error = "Handler reported failure"
+            except Exception as e:
+                print(f"Error processing {self.name} batch of {len(valid)}: {str(e)}")
+                handled = [False] * len(valid)
+                error = e
+            for index, ok in zip(valid, handled):
+                if not ok:
+                    failures[message_ids[index]] = (error, False)
+
+        for message_id in message_ids:
+            for message in batch[message_id]:
+                if message_id not in failures:
+                    message.ack()
+                    if self.retry_policy:
+                        self.retry_policy.succeeded(message)
+                elif self.retry_policy:
+                    self.retry_policy.failed(message, *failures[message_id])
+                else:
+                    message.nack()
+            if message_id not in failures:
+                self.seen.add(message_id)
+
+        succeeded = len(message_ids) - len(failures)
+        print(f"Processed {self.name} batch: {succeeded}/{len(message_ids)} succeeded.")
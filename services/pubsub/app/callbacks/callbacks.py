@@ -1,17 +1,48 @@
 
 # Callbacks for subscriptions
-import requests
+from google.cloud import firestore
 
+from services.pubsub.config.config import settings
+from callbacks.batching import BatchingCallback
+from retries.retry_policy import RetryPolicy
 
-def callback_inj(message):
+_db = None
+
+
+def get_db():
+    """Firestore client, created on first use rather than at import time."""
+    global _db
+    if _db is None:
+        _db = firestore.Client()
+    return _db
+
+
+def process_transactions(message_ids, transactions):
     """
-    Callback for transaction messages
+    Writes a batch of transactions to Firestore in a single commit.
+
+    Documents are keyed by message ID, so a redelivered message overwrites
+    its earlier write instead of creating a duplicate.
     """
-    try:
-        # Process transaction messages
-        transaction_data = message.data.decode("utf-8")
-        process_transaction(transaction_data)
-        message.ack()
-        print(f"Processed Injective transaction data.")
-    except Exception as e:
-        print(f"Error processing Injective transaction data: {str(e)}")
\ No newline at end of file
+    results = [isinstance(transaction, dict) for transaction in transactions]
+    db = get_db()
+    batch = db.batch()
+    collection_ref = db.collection(f"{settings.envir}_transactions")
+    for message_id, transaction, valid in zip(message_ids, transactions, results):
+        if valid:
+            batch.set(
+                collection_ref.document(message_id),
+                {**transaction, "timestamp": firestore.SERVER_TIMESTAMP},
+            )
+    if any(results):
+        # The commit is atomic; if it fails every item in the batch is retried
+        batch.commit()
+    return results
+
+
+# Callback for Injective transaction messages
+callback_inj = BatchingCallback(
+    "injective",
+    process_transactions,
+    retry_policy=RetryPolicy(source_topic=settings.topics["injective-sub"]),
+)
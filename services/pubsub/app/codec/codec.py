@@ -0,0 +1,99 @@
+# Message codec shared by the publisher and the subscription callbacks
+import ast
+import json
+
+import msgpack
+
+try:
+    import zstandard
+except ImportError:  # zstd framing is optional; large batches are sent uncompressed
+    zstandard = None
+
+from services.pubsub.config.config import settings
+
+SCHEMA_VERSION = "1"
+
+# Pub/Sub attribute names carried alongside every message
+ATTR_SCHEMA_VERSION = "schema_version"
+ATTR_ENCODING = "encoding"
+
+ENCODING_MSGPACK = "msgpack"
+ENCODING_MSGPACK_ZSTD = "msgpack+zstd"
+ENCODING_LEGACY = "repr"
+
+_compressor = zstandard.ZstdCompressor(level=settings.zstd_level) if zstandard else None
+_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+
+class CodecError(Exception):
+    """Raised when a message cannot be decoded."""
+
+
+def encode_message(data) -> tuple[bytes, dict]:
+    """Encodes a payload for publishing.
+
+    Args:
+        data: Any msgpack-serialisable payload (dicts, lists, str, numbers).
+
+    Returns:
+        tuple: The message bytes and the Pub/Sub attributes describing them.
+    """
+    payload = msgpack.packb(data, use_bin_type=True, default=str)
+    encoding = ENCODING_MSGPACK
+    if _compressor is not None and len(payload) >= settings.zstd_threshold_bytes:
+        payload = _compressor.compress(payload)
+        encoding = ENCODING_MSGPACK_ZSTD
+
+    attributes = {ATTR_SCHEMA_VERSION: SCHEMA_VERSION, ATTR_ENCODING: encoding}
+    return payload, attributes
+
+
+def decode_message(data: bytes, attributes=None):
+    """Decodes message bytes produced by `encode_message`.
+
+    Args:
+        data: The raw message bytes.
+        attributes: The Pub/Sub message attributes.
+
+    Returns:
+        The decoded payload.
+    """
+    attributes = attributes or {}
+    encoding = attributes.get(ATTR_ENCODING, ENCODING_LEGACY)
+    version = attributes.get(ATTR_SCHEMA_VERSION, SCHEMA_VERSION)
+    if version != SCHEMA_VERSION:
+        raise CodecError(f"Unsupported schema version: {version}")
+
+    try:
+        if encoding == ENCODING_MSGPACK_ZSTD:
+            if _decompressor is None:
+                raise CodecError("zstandard is required to decode this message")
+            data = _decompressor.decompress(data)
+            encoding = ENCODING_MSGPACK
+        if encoding == ENCODING_MSGPACK:
+            return msgpack.unpackb(data, raw=False)
+        if encoding == ENCODING_LEGACY:
+            return _decode_legacy(data.decode("utf-8"))
+    except CodecError:
+        raise
+    except Exception as exc:
+        raise CodecError(f"Could not decode {encoding} message: {exc}") from exc
+
+    raise CodecError(f"Unsupported encoding: {encoding}")
+
+
+def _decode_legacy(text: str):
+    """Decodes a message published before the codec existed.
+
+    Those were JSON or the str() of a Python payload, so a dict published
+    then still decodes to a dict while old messages drain during a rollout.
+    Text that is neither is returned as is.
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return text
@@ -1,18 +1,23 @@
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 import uvicorn
 import os
 import asyncio
+import multiprocessing
 import requests
 from pydantic import BaseModel
 from typing import List
 from starlette.middleware.cors import CORSMiddleware
 
 from concurrent.futures import ThreadPoolExecutor
+from construct_shared.service_auth import ServiceAuth
 from publisher.publisher import send_message_to_pubsub
 
-from subscriptions.subscription_handler import process_pubsub_messages
+from services.pubsub.config.config import settings
+from subscriptions.subscription_handler import process_pubsub_messages, run_subscriber
+from metrics.metrics import registry
+from retries.retry_policy import replay_dead_letters
 
 app = FastAPI()
 
@@ -26,6 +31,9 @@ app.add_middleware(
 
 templates = Jinja2Templates(directory="app/templates")
 
+# Operational endpoints are for other services and operators only
+service_auth = ServiceAuth.from_env()
+
 
 class TransactionRequestData(BaseModel):
     transactions: List[TransactionRequest]
@@ -39,6 +47,21 @@ async def submit_transactions(request: TransactionRequestData):
 
     return {"message": "Transactions queued for processing"}
 
+@app.get("/metrics")
+async def subscription_metrics():
+    """Report throughput, ack latency and backlog for each subscription.
+
+    Only covers a subscriber running in this process (SUBSCRIBER_PROCESSES=0).
+    """
+    return {"subscriptions": [metrics.snapshot() for metrics in registry.values()]}
+
+@app.post("/dead-letters/replay", dependencies=[Depends(service_auth)])
+async def replay_dead_lettered_messages(max_messages: int = 1000):
+    """Republish dead-lettered messages to the topics they came from."""
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(None, replay_dead_letters, max_messages)
+    return {"message": "Dead-lettered messages replayed", **result}
+
 @app.get('/', response_class=HTMLResponse)
 async def hello(request: Request):
     """Return a friendly HTTP greeting."""
@@ -55,11 +78,36 @@ def start_fastapi_server():
     # Run the FastAPI application
     uvicorn.run(app, host="0.0.0.0", port=int(server_port))
 
-if __name__ == "__main__":
-    # Create a ThreadPoolExecutor to run the FastAPI server and Pub/Sub message processing concurrently
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        # Start the FastAPI server in one thread
-        executor.submit(start_fastapi_server)
+# Start dedicated subscriber processes so message handling never competes with
+# the web server for the GIL
+def start_subscriber_processes(count: int):
+    context = multiprocessing.get_context("spawn")
+    # Not daemonic: subscribers may start their own CPU pool workers
+    processes = [
+        context.Process(target=run_subscriber, name=f"subscriber-{index}")
+        for index in range(count)
+    ]
+    for process in processes:
+        process.start()
+    return processes
 
-        # Start Pub/Sub message processing in another thread
-        asyncio.run(process_pubsub_messages())
+if __name__ == "__main__":
+    if settings.subscriber_processes > 0:
+        subscribers = start_subscriber_processes(settings.subscriber_processes)
+        try:
+            # The web server keeps the main process to itself
+            start_fastapi_server()
+        finally:
+            # SIGTERM lets each subscriber drain its in-flight messages
+            for process in subscribers:
+                process.terminate()
+            for process in subscribers:
+                process.join(timeout=settings.shutdown_timeout)
+    else:
+        # Create a ThreadPoolExecutor to run the FastAPI server and Pub/Sub message processing concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            # Start the FastAPI server in one thread
+            executor.submit(start_fastapi_server)
+
+            # Start Pub/Sub message processing in another thread
+            asyncio.run(process_pubsub_messages())
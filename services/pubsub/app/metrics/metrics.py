@@ -0,0 +1,99 @@
+# Per-subscription consumer metrics
+import threading
+import time
+from collections import deque
+
+RATE_WINDOW_SECONDS = 60
+
+
+class SubscriptionMetrics:
+    """
+    Thread-safe counters for a single subscription.
+
+    Callbacks run on the subscription's executor threads, so every update
+    takes the lock. Rates are computed over a sliding window of one-second
+    buckets so the snapshot reflects current throughput, not the lifetime
+    average.
+    """
+
+    def __init__(self, subscription: str):
+        self.subscription = subscription
+        self._lock = threading.Lock()
+        self.received = 0
+        self.acked = 0
+        self.nacked = 0
+        self.ack_latency_total = 0.0
+        self.ack_latency_max = 0.0
+        self._buckets = deque(maxlen=RATE_WINDOW_SECONDS)  # [second, count]
+
+    def record_received(self):
+        now = int(time.monotonic())
+        with self._lock:
+            self.received += 1
+            if self._buckets and self._buckets[-1][0] == now:
+                self._buckets[-1][1] += 1
+            else:
+                self._buckets.append([now, 1])
+
+    def record_ack(self, latency: float):
+        with self._lock:
+            self.acked += 1
+            self.ack_latency_total += latency
+            self.ack_latency_max = max(self.ack_latency_max, latency)
+
+    def record_nack(self):
+        with self._lock:
+            self.nacked += 1
+
+    def snapshot(self) -> dict:
+        """Return a JSON-serialisable view of the counters."""
+        now = int(time.monotonic())
+        with self._lock:
+            window = [count for second, count in self._buckets if now - second < RATE_WINDOW_SECONDS]
+            settled = self.acked + self.nacked
+            return {
+                "subscription": self.subscription,
+                "received": self.received,
+                "acked": self.acked,
+                "nacked": self.nacked,
+                # Messages leased by this consumer that are not yet settled
+                "backlog": self.received - settled,
+                "messages_per_sec": sum(window) / RATE_WINDOW_SECONDS,
+                "ack_latency_avg_ms": (
+                    self.ack_latency_total / self.acked * 1000 if self.acked else 0.0
+                ),
+                "ack_latency_max_ms": self.ack_latency_max * 1000,
+            }
+
+
+class TrackedMessage:
+    """
+    Wraps a Pub/Sub message so ack/nack calls are recorded in the metrics.
+    """
+
+    def __init__(self, message, metrics: SubscriptionMetrics):
+        self._message = message
+        self._metrics = metrics
+        self._received_at = time.monotonic()
+
+    def __getattr__(self, name):
+        return getattr(self._message, name)
+
+    def ack(self):
+        self._message.ack()
+        self._metrics.record_ack(time.monotonic() - self._received_at)
+
+    def nack(self):
+        self._message.nack()
+        self._metrics.record_nack()
+
+
+# Registry read by the HTTP side (GET /metrics)
+registry = {}
+
+
+def get_metrics(subscription: str) -> SubscriptionMetrics:
+    """Return the metrics object for a subscription, creating it if needed."""
+    if subscription not in registry:
+        registry[subscription] = SubscriptionMetrics(subscription)
+    return registry[subscription]
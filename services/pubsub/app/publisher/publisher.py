@@ -1,6 +1,7 @@
 import os
 from google.cloud import pubsub_v1
 from services.pubsub.config.config import settings
+from codec.codec import encode_message
 
 # Create Pub/Sub clients
 publisher_client = pubsub_v1.PublisherClient()
@@ -9,7 +10,13 @@ def send_message_to_pubsub(data, topic):
     """Publishes multiple messages to a Pub/Sub topic."""
     project_id = settings.project_id
     topic_name = f"projects/{project_id}/topics/{topic}"
-    data_bytes = str(data).encode("utf-8")  # Convert data to bytes
-    
-    future = publisher_client.publish(topic_name, data_bytes)
-    print(f"Published message to Pub/Sub: {future.result()}")
\ No newline at end of file
+    data_bytes, attributes = encode_message(data)  # Versioned msgpack payload
+
+    future = publisher_client.publish(topic_name, data_bytes, **attributes)
+    print(f"Published message to Pub/Sub: {future.result()}")
+
+
+def publish_raw(data_bytes, topic, attributes):
+    """Publishes already encoded bytes, returning the publish future."""
+    topic_name = f"projects/{settings.project_id}/topics/{topic}"
+    return publisher_client.publish(topic_name, data_bytes, **attributes)
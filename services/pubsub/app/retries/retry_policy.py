@@ -0,0 +1,191 @@
+# Retry scheduling and dead-lettering for failed messages
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from google.cloud import pubsub_v1
+from services.pubsub.config.config import settings
+from publisher.publisher import publish_raw
+
+# Attributes added to messages moved to the dead-letter topic
+ATTR_SOURCE_TOPIC = "dlq_source_topic"
+ATTR_ATTEMPTS = "dlq_attempts"
+ATTR_ERROR = "dlq_error"
+
+REPLAY_PULL_SIZE = 100
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter for the given (1-based) attempt."""
+    delay = min(settings.retry_base_delay * 2 ** (attempt - 1), settings.retry_max_delay)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class AttemptTracker:
+    """
+    Bounded per-message attempt counter.
+
+    Used when the subscription has no dead-letter policy, in which case Pub/Sub
+    does not populate `delivery_attempt` on received messages.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._attempts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def increment(self, message_id) -> int:
+        with self._lock:
+            attempts = self._attempts.pop(message_id, 0) + 1
+            self._attempts[message_id] = attempts
+            while len(self._attempts) > self.max_size:
+                self._attempts.popitem(last=False)
+            return attempts
+
+    def clear(self, message_id):
+        with self._lock:
+            self._attempts.pop(message_id, None)
+
+
+class RetryScheduler:
+    """
+    Holds failed messages and nacks each one when its backoff expires.
+
+    Nacking straight away makes Pub/Sub redeliver immediately, so a message
+    that keeps failing would loop hot. Held messages keep their lease and
+    count against flow control, which also stops a burst of failures from
+    pulling in more work than the consumer can retry.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="retry-scheduler", daemon=True)
+        self._thread.start()
+
+    def schedule(self, message, delay: float):
+        with self._condition:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), message))
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condition.wait(timeout)
+                _, _, message = heapq.heappop(self._heap)
+            message.nack()
+
+
+retry_scheduler = RetryScheduler()
+
+
+class RetryPolicy:
+    """
+    Decides what happens to a message whose processing failed.
+
+    Messages below `max_delivery_attempts` are redelivered after an
+    exponential backoff. Messages that reach the limit, or fail permanently
+    (e.g. cannot be decoded), are published to the dead-letter topic with
+    their original bytes and attributes and then acked.
+    """
+
+    def __init__(self, source_topic: str):
+        self.source_topic = source_topic
+        self.attempts = AttemptTracker(settings.seen_set_size)
+
+    def succeeded(self, message):
+        self.attempts.clear(message.message_id)
+
+    def failed(self, message, error, permanent: bool = False):
+        # delivery_attempt is only set when the subscription has a dead-letter policy
+        attempt = message.delivery_attempt or self.attempts.increment(message.message_id)
+        if permanent or attempt >= settings.max_delivery_attempts:
+            self.dead_letter(message, error, attempt)
+        else:
+            retry_scheduler.schedule(message, backoff_delay(attempt))
+
+    def dead_letter(self, message, error, attempt: int):
+        attributes = dict(message.attributes)
+        attributes.update(
+            {
+                ATTR_SOURCE_TOPIC: self.source_topic,
+                ATTR_ATTEMPTS: str(attempt),
+                ATTR_ERROR: str(error)[:1024],
+            }
+        )
+        try:
+            publish_raw(message.data, settings.dead_letter_topic, attributes).result()
+        except Exception as e:
+            # Keep the message on the subscription rather than lose it
+            print(f"Error dead-lettering message {message.message_id}: {str(e)}")
+            retry_scheduler.schedule(message, settings.retry_max_delay)
+            return
+        self.attempts.clear(message.message_id)
+        message.ack()
+        print(f"Dead-lettered message {message.message_id} after {attempt} attempts: {error}")
+
+
+def replay_dead_letters(max_messages: int) -> dict:
+    """Republishes dead-lettered messages to their source topics in bulk.
+
+    Messages are pulled from the dead-letter subscription in chunks, published
+    back with the dead-letter attributes stripped, and acked only once their
+    republish has succeeded.
+
+    Returns:
+        dict: Counts of replayed and failed messages.
+    """
+    subscriber_client = pubsub_v1.SubscriberClient()
+    subscription_path = subscriber_client.subscription_path(
+        settings.project_id, settings.dead_letter_subscription
+    )
+    replayed, failed = 0, 0
+    try:
+        while replayed + failed < max_messages:
+            response = subscriber_client.pull(
+                request={
+                    "subscription": subscription_path,
+                    "max_messages": min(REPLAY_PULL_SIZE, max_messages - replayed - failed),
+                },
+                timeout=30,
+            )
+            if not response.received_messages:
+                break
+
+            futures = []
+            for received in response.received_messages:
+                attributes = dict(received.message.attributes)
+                topic = attributes.pop(ATTR_SOURCE_TOPIC, None)
+                attributes.pop(ATTR_ATTEMPTS, None)
+                attributes.pop(ATTR_ERROR, None)
+                future = publish_raw(received.message.data, topic, attributes) if topic else None
+                futures.append((received.ack_id, future))
+
+            ack_ids = []
+            for ack_id, future in futures:
+                try:
+                    if future is None:
+                        raise ValueError("Missing source topic")
+                    future.result()
+                    ack_ids.append(ack_id)
+                except Exception as e:
+                    print(f"Error replaying dead-lettered message: {str(e)}")
+                    failed += 1
+            if ack_ids:
+                subscriber_client.acknowledge(
+                    request={"subscription": subscription_path, "ack_ids": ack_ids}
+                )
+                replayed += len(ack_ids)
+            if failed and not ack_ids:
+                # Nothing in this chunk could be republished; stop instead of spinning
+                break
+    finally:
+        subscriber_client.close()
+
+    return {"replayed": replayed, "failed": failed}
@@ -1,34 +1,148 @@
-import os
+import asyncio
+import logging
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
 from google.cloud import pubsub_v1
+from google.cloud.pubsub_v1.subscriber.scheduler import ThreadScheduler
 from services.pubsub.config.config import settings
-from callbacks.callbacks import callback_cloud, callback_xmark, callback_inj
+from callbacks.callbacks import callback_inj
+from metrics.metrics import TrackedMessage, get_metrics
+from workers.cpu_pool import cpu_pool
+
+# Maps each subscription name to the callback that handles its messages
+SUBSCRIPTION_CALLBACKS = {
+    "injective-sub": callback_inj,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _subscription_option(subscription: str, name: str):
+    """Return a per-subscription setting, falling back to the global default."""
+    overrides = settings.subscription_overrides.get(subscription, {})
+    return overrides.get(name, getattr(settings, name))
+
+
+def _instrumented(callback, metrics):
+    """Wrap a callback so every message is counted and its ack latency measured."""
 
+    def wrapper(message):
+        metrics.record_received()
+        callback(TrackedMessage(message, metrics))
+
+    return wrapper
+
+
+def open_subscription(subscriber_client, subscription: str):
+    """Start a streaming pull with its own flow control and callback pool.
+
+    Returns:
+        tuple: The streaming pull future and the executor backing its callbacks.
+    """
+    callback = SUBSCRIPTION_CALLBACKS.get(subscription)
+    if callback is None:
+        raise ValueError(f"No callback registered for subscription {subscription}")
+
+    subscription_path = subscriber_client.subscription_path(
+        settings.project_id, subscription
+    )
+    flow_control = pubsub_v1.types.FlowControl(
+        max_messages=_subscription_option(subscription, "max_outstanding_messages"),
+        max_bytes=_subscription_option(subscription, "max_outstanding_bytes"),
+    )
+    executor = ThreadPoolExecutor(
+        max_workers=_subscription_option(subscription, "callback_workers"),
+        thread_name_prefix=f"{subscription}-callback",
+    )
+    streaming_pull_future = subscriber_client.subscribe(
+        subscription_path,
+        callback=_instrumented(callback, get_metrics(subscription)),
+        flow_control=flow_control,
+        scheduler=ThreadScheduler(executor),
+        # Let in-flight callbacks finish before cancel() returns
+        await_callbacks_on_shutdown=True,
+    )
+    print(f"Listening for messages on {subscription_path}")
+    return streaming_pull_future, executor
 
 
 async def process_pubsub_messages():
 
-    """Processes Pub/Sub messages from multiple subscriptions.
+    """Processes Pub/Sub messages from all configured subscriptions concurrently.
 
-    Args:
-        subscriptions (list): A list of Pub/Sub subscription names.
+    Every subscription in `settings.subscriptions` is opened up front, each with
+    its own flow control limits and callback executor. The coroutine then waits
+    until a stream fails or the process is asked to stop, and drains all
+    subscriptions before returning.
     """
 
     subscriber_client = pubsub_v1.SubscriberClient()
-    project_id = settings.project_id
-    subscriptions = settings.subscriptions
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
 
-    # Subscribe to the Pub/Sub subscriptions and start listening
-    for subscription in subscriptions:
-        subscription_path = subscriber_client.subscription_path(
-            f"{project_id}", subscription
-        )
-        if subscription == "injective-sub":
-            streaming_pull_future = subscriber_client.subscribe(
-                subscription_path, callback=callback_inj
-            )
-        # Keep the function running to continue processing messages
+    for sig in (signal.SIGINT, signal.SIGTERM):
         try:
-            # Process messages concurrently using an asyncio event loop
-            await streaming_pull_future.result()
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Signal handlers can only be installed from the main thread
+            pass
+
+    streams = {}
+    for subscription in settings.subscriptions:
+        try:
+            streams[subscription] = open_subscription(subscriber_client, subscription)
         except Exception as e:
-            print(f"Exception while processing subscription {subscription}: {str(e)}")
\ No newline at end of file
+            print(f"Exception while opening subscription {subscription}: {str(e)}")
+
+    # StreamingPullFuture.result() blocks, so each one is awaited on a worker thread
+    watchers = [
+        loop.run_in_executor(None, future.result) for future, _ in streams.values()
+    ]
+    stopper = asyncio.ensure_future(stop.wait())
+    try:
+        if watchers:
+            await asyncio.wait(watchers + [stopper], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        await drain_subscriptions(streams)
+        stopper.cancel()
+        subscriber_client.close()
+
+    for subscription, (future, _) in streams.items():
+        if future.done() and not future.cancelled() and future.exception():
+            print(f"Exception while processing subscription {subscription}: {future.exception()}")
+
+
+async def drain_subscriptions(streams: dict):
+    """Stop pulling new messages and wait for in-flight callbacks to settle.
+
+    Batching callbacks are closed once their streams have stopped, which
+    flushes buffered messages so their acks are sent before the subscriber
+    client closes.
+    """
+    loop = asyncio.get_running_loop()
+
+    def drain(subscription, future, executor):
+        future.cancel()
+        try:
+            future.result(timeout=settings.shutdown_timeout)
+        except Exception:
+            pass
+        executor.shutdown(wait=True)
+        callback = SUBSCRIPTION_CALLBACKS[subscription]
+        if hasattr(callback, "close"):
+            callback.close(timeout=settings.shutdown_timeout)
+        logger.info("Drained subscription %s", subscription)
+
+    await asyncio.gather(
+        *(
+            loop.run_in_executor(None, drain, subscription, future, executor)
+            for subscription, (future, executor) in streams.items()
+        )
+    )
+    await loop.run_in_executor(None, cpu_pool.shutdown)
+
+
+def run_subscriber():
+    """Entry point for a dedicated subscriber process."""
+    asyncio.run(process_pubsub_messages())
@@ -0,0 +1,96 @@
+# Process pool for CPU-heavy work done by subscription callbacks
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from services.pubsub.config.config import settings
+
+
+class CpuPool:
+    """
+    Runs CPU-bound functions in worker processes, outside the GIL.
+
+    At most `max_pending` tasks may be queued or running at once. Callers
+    beyond that block in `map`, which holds the callback thread and in turn
+    the subscription's flow control, so a slow pool slows ingestion instead
+    of growing an unbounded queue. With `workers` set to 0 the functions
+    simply run inline. A pool broken by a crashed worker is replaced on the
+    next call.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def map(self, fn, *iterables):
+        """Apply `fn` across the iterables and return the results in order.
+
+        Exceptions raised by `fn` are returned in place of the result so one
+        bad item does not fail the others. Items lost to a broken pool come
+        back as `BrokenProcessPool`, and the pool is rebuilt.
+        """
+        args = list(zip(*iterables))
+        if not self.workers:
+            return [_call(fn, item) for item in args]
+
+        executor = self._get_executor()
+        futures = []
+        for item in args:
+            self._slots.acquire()
+            try:
+                future = executor.submit(fn, *item)
+            except BrokenProcessPool as exc:
+                self._slots.release()
+                self._discard(executor)
+                futures.append(exc)
+                continue
+            except Exception:
+                self._slots.release()
+                raise
+            future.add_done_callback(lambda _: self._slots.release())
+            futures.append(future)
+
+        results = []
+        for future in futures:
+            if isinstance(future, Exception):
+                results.append(future)
+                continue
+            try:
+                results.append(future.result())
+            except BrokenProcessPool as exc:
+                self._discard(executor)
+                results.append(exc)
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    def _discard(self, executor):
+        """Drop a broken executor so the next call starts a fresh one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+def _call(fn, args):
+    try:
+        return fn(*args)
+    except Exception as exc:
+        return exc
+
+
+cpu_pool = CpuPool(settings.cpu_workers, settings.max_pending_cpu_tasks)
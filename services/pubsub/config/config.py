@@ -9,5 +9,42 @@ class Settings:
     server_port = os.getenv("PORT", "8080")
     subscriptions = ["injective-sub"]  # Placeholders for actual subscription info
 
+    # Consumer flow control defaults, overridable per subscription below
+    max_outstanding_messages = int(os.getenv("MAX_OUTSTANDING_MESSAGES", "1000"))
+    max_outstanding_bytes = int(os.getenv("MAX_OUTSTANDING_BYTES", str(100 * 1024 * 1024)))
+    callback_workers = int(os.getenv("CALLBACK_WORKERS", "10"))
+    shutdown_timeout = float(os.getenv("SHUTDOWN_TIMEOUT", "30"))
+    subscription_overrides = {
+        # "injective-sub": {"max_outstanding_messages": 500, "callback_workers": 4},
+    }
+
+    envir = os.getenv("ENVIR", "test")  # options: test, stage, production. Changes firestore database
+
+    # Callback micro-batching. Firestore batches are capped at 500 writes.
+    batch_max_messages = int(os.getenv("BATCH_MAX_MESSAGES", "100"))
+    batch_max_latency = float(os.getenv("BATCH_MAX_LATENCY", "0.5"))
+    batch_workers = int(os.getenv("BATCH_WORKERS", "2"))
+    seen_set_size = int(os.getenv("SEEN_SET_SIZE", "100000"))
+
+    # Retries: failed messages are redelivered after an exponential backoff and
+    # moved to the dead-letter topic once max_delivery_attempts is reached
+    topics = {"injective-sub": "injective"}  # Source topic of each subscription
+    max_delivery_attempts = int(os.getenv("MAX_DELIVERY_ATTEMPTS", "5"))
+    retry_base_delay = float(os.getenv("RETRY_BASE_DELAY", "2"))
+    retry_max_delay = float(os.getenv("RETRY_MAX_DELAY", "300"))
+    dead_letter_topic = os.getenv("DEAD_LETTER_TOPIC", "dead-letter")
+    dead_letter_subscription = os.getenv("DEAD_LETTER_SUBSCRIPTION", "dead-letter-sub")
+
+    # Worker model. With SUBSCRIBER_PROCESSES=0 the subscriber runs on a thread
+    # next to the web server; otherwise that many subscriber processes share
+    # the subscriptions. CPU_WORKERS>0 offloads decoding to a process pool.
+    subscriber_processes = int(os.getenv("SUBSCRIBER_PROCESSES", "0"))
+    cpu_workers = int(os.getenv("CPU_WORKERS", "0"))
+    max_pending_cpu_tasks = int(os.getenv("MAX_PENDING_CPU_TASKS", "256"))
+
+    # Message codec: payloads at or above this size are zstd framed
+    zstd_threshold_bytes = int(os.getenv("ZSTD_THRESHOLD_BYTES", "4096"))
+    zstd_level = int(os.getenv("ZSTD_LEVEL", "3"))
+
 
 settings = Settings()
@@ -0,0 +1,280 @@
+"""
+Streaming anomaly detection
+
+Consumes request logs and trade events one at a time and raises alerts as
+they happen. All state is per key (client IP, account, asset, trading pair)
+and lives in bounded LRU tables, so memory stays fixed however many keys the
+stream contains; the least recently seen keys are evicted first.
+
+Requests
+- burst: a client's request rate, as a fast EWMA, exceeds both `burst_ratio`
+  times its own slow EWMA and `burst_min_rate`.
+- credential_stuffing: one IP fails logins for many distinct accounts, or
+  one account fails logins from many distinct IPs. Distinct counts come from
+  HyperLogLog sketches over two tumbling windows (current and previous).
+
+Trades
+- price_outlier: price more than `zscore_threshold` standard deviations from
+  the asset's rolling VWAP (exponentially weighted by volume and time).
+- wash_trade: a self-trade, or the same two accounts trading the same asset
+  in opposite directions for a similar quantity within `wash_window` seconds.
+"""
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Callable, List, Optional
+
+HLL_PRECISION = 10  # 1024 one-byte registers, about 3% error
+_HLL_REGISTERS = 1 << HLL_PRECISION
+_HLL_ALPHA = 0.7213 / (1 + 1.079 / _HLL_REGISTERS)
+_MASK64 = (1 << 64) - 1
+
+
+class HyperLogLog:
+    """Distinct count estimate in 1 KiB"""
+
+    __slots__ = ("registers",)
+
+    def __init__(self):
+        self.registers = bytearray(_HLL_REGISTERS)
+
+    def add(self, value: str) -> bool:
+        """Add `value`; return True if the estimate may have changed."""
+        # str hashes are 64-bit SipHash; fine for counting within one process
+        h = hash(value) & _MASK64
+        index = h >> (64 - HLL_PRECISION)
+        rest = (h << HLL_PRECISION) & _MASK64
+        rank = 64 - HLL_PRECISION + 1 if rest == 0 else 65 - rest.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def count(self, other: Optional["HyperLogLog"] = None) -> int:
+        """Estimate of distinct values added, merged with `other` if given."""
+        registers = self.registers if other is None else bytes(map(max, self.registers, other.registers))
+        estimate = _HLL_ALPHA * _HLL_REGISTERS ** 2 / sum(2.0 ** -r for r in registers)
+        zeros = registers.count(0)
+        if estimate <= 2.5 * _HLL_REGISTERS and zeros:
+            estimate = _HLL_REGISTERS * math.log(_HLL_REGISTERS / zeros)
+        return round(estimate)
+
+
+class WindowedDistinct:
+    """Distinct values over the current and previous `window` seconds."""
+
+    __slots__ = ("window", "started", "current", "previous", "distinct", "last_alert")
+
+    def __init__(self, window: float, now: float):
+        self.window = window
+        self.started = now
+        self.current = HyperLogLog()
+        self.previous = None
+        self.distinct = 0
+        self.last_alert = 0.0
+
+    def add(self, value: str, now: float) -> int:
+        rotated = now - self.started >= self.window
+        if rotated:
+            self.previous = self.current if now - self.started < 2 * self.window else None
+            self.current = HyperLogLog()
+            self.started = now
+        # Estimating walks every register, so only redo it when one changed
+        if self.current.add(value) or rotated:
+            self.distinct = self.current.count(self.previous)
+        return self.distinct
+
+
+class BoundedTable(OrderedDict):
+    """Per-key state, evicting the least recently used key beyond `max_keys`."""
+
+    def __init__(self, max_keys: int, factory: Callable[[float], object]):
+        super().__init__()
+        self.max_keys = max_keys
+        self.factory = factory
+        self.evicted = 0
+
+    def get_state(self, key: str, now: float):
+        state = self.get(key)
+        if state is None:
+            state = self[key] = self.factory(now)
+            if len(self) > self.max_keys:
+                self.popitem(last=False)
+                self.evicted += 1
+        else:
+            self.move_to_end(key)
+        return state
+
+
+class RateState:
+    __slots__ = ("fast", "slow", "last", "count", "last_alert")
+
+    def __init__(self, now: float):
+        self.fast = self.slow = 0.0
+        self.last = now
+        self.count = 0
+        self.last_alert = 0.0
+
+
+class PriceState:
+    __slots__ = ("weighted_price", "weight", "variance", "count", "last")
+
+    def __init__(self, now: float):
+        self.weighted_price = self.weight = self.variance = 0.0
+        self.count = 0
+        self.last = now
+
+
+class AnomalyDetector:
+    def __init__(
+        self,
+        max_keys: int = 100000,
+        fast_window: float = 10.0,
+        slow_window: float = 600.0,
+        burst_ratio: float = 5.0,
+        burst_min_rate: float = 20.0,
+        stuffing_window: float = 300.0,
+        stuffing_threshold: int = 20,
+        vwap_window: float = 3600.0,
+        zscore_threshold: float = 5.0,
+        min_trades: int = 20,
+        wash_window: float = 600.0,
+        wash_quantity_tolerance: float = 0.05,
+        max_alerts: int = 10000,
+        alert_cooldown: float = 60.0,
+    ):
+        self.fast_window = fast_window
+        self.slow_window = slow_window
+        self.burst_ratio = burst_ratio
+        self.burst_min_rate = burst_min_rate
+        self.stuffing_threshold = stuffing_threshold
+        self.vwap_window = vwap_window
+        self.zscore_threshold = zscore_threshold
+        self.min_trades = min_trades
+        self.wash_window = wash_window
+        self.wash_quantity_tolerance = wash_quantity_tolerance
+        self.alert_cooldown = alert_cooldown
+
+        self.rates = BoundedTable(max_keys, RateState)
+        self.accounts_per_ip = BoundedTable(max_keys, lambda now: WindowedDistinct(stuffing_window, now))
+        self.ips_per_account = BoundedTable(max_keys, lambda now: WindowedDistinct(stuffing_window, now))
+        self.prices = BoundedTable(max_keys, PriceState)
+        # (asset, account, account) -> (buyer, quantity, time) of the pair's last trade
+        self.pairs = BoundedTable(max_keys, lambda now: None)
+
+        self.alerts = deque(maxlen=max_alerts)
+        self.alert_seq = 0
+        self.counters = dict.fromkeys(("requests", "trades", "alerts"), 0)
+
+    def _alert(self, kind: str, key: str, now: float, **details):
+        self.alert_seq += 1
+        self.alerts.append({"seq": self.alert_seq, "ts": now, "kind": kind, "key": key, **details})
+        self.counters["alerts"] += 1
+
+    def observe_request(
+        self,
+        ip: str,
+        path: str,
+        status: int,
+        account: Optional[str] = None,
+        now: Optional[float] = None,
+    ):
+        now = time.time() if now is None else now
+        self.counters["requests"] += 1
+
+        # Rates as EWMAs of events/second with time constants fast_window and slow_window
+        state = self.rates.get_state(ip, now)
+        elapsed = max(now - state.last, 0.0)
+        state.fast = state.fast * math.exp(-elapsed / self.fast_window) + 1 / self.fast_window
+        state.slow = state.slow * math.exp(-elapsed / self.slow_window) + 1 / self.slow_window
+        state.last = now
+        state.count += 1
+        if (
+            state.fast > self.burst_min_rate
+            and state.fast > self.burst_ratio * state.slow
+            and now - state.last_alert >= self.alert_cooldown
+        ):
+            state.last_alert = now
+            self._alert("burst", ip, now, rate=round(state.fast, 1), baseline=round(state.slow, 2))
+
+        if account is not None and status in (401, 403) and "login" in path:
+            accounts = self.accounts_per_ip.get_state(ip, now)
+            distinct = accounts.add(account, now)
+            if distinct >= self.stuffing_threshold and now - accounts.last_alert >= self.alert_cooldown:
+                accounts.last_alert = now
+                self._alert("credential_stuffing", ip, now, scope="ip", distinct_accounts=distinct)
+            ips = self.ips_per_account.get_state(account, now)
+            distinct = ips.add(ip, now)
+            if distinct >= self.stuffing_threshold and now - ips.last_alert >= self.alert_cooldown:
+                ips.last_alert = now
+                self._alert("credential_stuffing", account, now, scope="account", distinct_ips=distinct)
+
+    def observe_trade(
+        self,
+        asset_id: str,
+        price: float,
+        quantity: float,
+        buyer_id: Optional[str],
+        seller_id: Optional[str],
+        trade_id: Optional[str] = None,
+        now: Optional[float] = None,
+    ):
+        now = time.time() if now is None else now
+        self.counters["trades"] += 1
+
+        # Score against the VWAP before this trade moves it
+        state = self.prices.get_state(asset_id, now)
+        decay = math.exp(-max(now - state.last, 0.0) / self.vwap_window)
+        if state.count >= self.min_trades and state.variance > 0:
+            vwap = state.weighted_price / state.weight
+            zscore = (price - vwap) / math.sqrt(state.variance)
+            if abs(zscore) >= self.zscore_threshold:
+                self._alert("price_outlier", asset_id, now, trade_id=trade_id, price=price,
+                            vwap=round(vwap, 6), zscore=round(zscore, 2))
+        # Volume-weighted mean and variance, with older trades decayed away
+        previous_vwap = state.weighted_price / state.weight if state.weight else price
+        state.weighted_price = state.weighted_price * decay + price * quantity
+        state.weight = state.weight * decay + quantity
+        share = quantity / state.weight
+        state.variance = (1 - share) * (state.variance + share * (price - previous_vwap) ** 2)
+        state.count += 1
+        state.last = now
+
+        if buyer_id is None or seller_id is None:
+            return
+        if buyer_id == seller_id:
+            self._alert("wash_trade", asset_id, now, trade_id=trade_id, reason="self_trade", account=buyer_id)
+            return
+        first, second = sorted((buyer_id, seller_id))
+        pair = f"{asset_id}|{first}|{second}"
+        last = self.pairs.get_state(pair, now)
+        if (
+            last is not None
+            and last[0] != buyer_id
+            and now - last[2] <= self.wash_window
+            and abs(quantity - last[1]) <= self.wash_quantity_tolerance * max(quantity, last[1])
+        ):
+            self._alert("wash_trade", asset_id, now, trade_id=trade_id, reason="round_trip",
+                        accounts=[first, second], seconds=round(now - last[2], 1))
+        self.pairs[pair] = (buyer_id, quantity, now)
+
+    def recent_alerts(self, after_seq: int = 0, kind: Optional[str] = None, limit: int = 100) -> List[dict]:
+        alerts = [
+            alert for alert in self.alerts
+            if alert["seq"] > after_seq and (kind is None or alert["kind"] == kind)
+        ]
+        return alerts[:limit]
+
+    def stats(self) -> dict:
+        tables = {
+            "rates": self.rates,
+            "accounts_per_ip": self.accounts_per_ip,
+            "ips_per_account": self.ips_per_account,
+            "prices": self.prices,
+            "pairs": self.pairs,
+        }
+        return {
+            **self.counters,
+            "keys": {name: len(table) for name, table in tables.items()},
+            "evicted": {name: table.evicted for name, table in tables.items()},
+        }
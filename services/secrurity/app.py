@@ -1,17 +1,51 @@
 import os
 import uvicorn
-from fastapi import FastAPI, HTTPException, Request
+from typing import List
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.responses import JSONResponse
 
+from construct_shared.audit import AuditLog, FileSink, FirestoreSink, install_audit, verify_sink
+from construct_shared.service_auth import ServiceAuth
+
+from anomaly import AnomalyDetector
+from config import settings
+from models import AuditEventCreate, RequestLog, TradeEvent
+
 
 app = FastAPI()
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-templates = Jinja2Templates(directory="app/templates")
+templates = Jinja2Templates(directory="templates")
+
+if settings.audit_sink == "firestore":
+    audit_sink = FirestoreSink(settings.audit_collection, "secrurity")
+else:
+    audit_sink = FileSink(settings.audit_dir, settings.audit_max_file_bytes)
+audit_log = AuditLog(
+    audit_sink,
+    service="secrurity",
+    capacity=settings.audit_buffer_size,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval,
+)
+install_audit(app, audit_log)
+
+# Other services authenticate to report and read audit events and anomalies
+service_auth = ServiceAuth.from_env()
+
+detector = AnomalyDetector(
+    max_keys=settings.anomaly_max_keys,
+    burst_ratio=settings.burst_ratio,
+    burst_min_rate=settings.burst_min_rate,
+    stuffing_threshold=settings.stuffing_threshold,
+    zscore_threshold=settings.zscore_threshold,
+    wash_window=settings.wash_window,
+)
 
 # Retrieve list of all available services
 @app.get('/services')
@@ -49,6 +83,93 @@ async def createService(serviceId: str):
     except Exception as e:
         return JSONResponse({"error": str(e)})
 
+# Record audit events from services that do not run the middleware themselves;
+# the source is the authenticated service, not a field of the event
+@app.post('/audit/events', status_code=202)
+async def createAuditEvents(events: List[AuditEventCreate], service: str = Depends(service_auth)):
+    for event in events:
+        audit_log.record(
+            event.action,
+            actor=event.actor,
+            resource=event.resource,
+            outcome=event.outcome,
+            source=service,
+            data=event.details,
+        )
+    return {"accepted": len(events)}
+
+
+# Stored audit events after a sequence number, oldest first. With the
+# Firestore sink each instance has its own chain; `instance` picks one
+@app.get('/audit/events')
+async def getAuditEvents(
+    after_seq: int = 0,
+    limit: int = Query(100, le=1000),
+    instance: str | None = None,
+    service: str = Depends(service_auth),
+):
+    sink = audit_sink
+    if instance is not None and isinstance(audit_sink, FirestoreSink):
+        sink = audit_sink.for_instance(instance)
+    events = []
+    async for event in sink.read(after_seq):
+        events.append(event)
+        if len(events) == limit:
+            break
+    return events
+
+
+# Recompute the hash chain over every stored event, per instance's chain
+@app.get('/audit/verify')
+async def verifyAuditLog(service: str = Depends(service_auth)):
+    if not isinstance(audit_sink, FirestoreSink):
+        return await verify_sink(audit_sink)
+    chains = {
+        instance: await verify_sink(audit_sink.for_instance(instance))
+        for instance in await audit_sink.instances()
+    }
+    return {"ok": all(chain["ok"] for chain in chains.values()), "chains": chains}
+
+
+@app.get('/audit/stats')
+async def getAuditStats():
+    return audit_log.stats()
+
+
+# Feed request logs to the anomaly detector, oldest first
+@app.post('/anomaly/requests', status_code=202)
+async def ingestRequestLogs(logs: List[RequestLog], service: str = Depends(service_auth)):
+    before = detector.alert_seq
+    for log in logs:
+        detector.observe_request(log.ip, log.path, log.status, log.account, log.ts)
+    return {"accepted": len(logs), "alerts": detector.alert_seq - before}
+
+
+# Feed trade events to the anomaly detector, oldest first
+@app.post('/anomaly/trades', status_code=202)
+async def ingestTrades(trades: List[TradeEvent], service: str = Depends(service_auth)):
+    before = detector.alert_seq
+    for trade in trades:
+        detector.observe_trade(
+            trade.asset_id, trade.price, trade.quantity, trade.buyer_id, trade.seller_id, trade.trade_id, trade.ts
+        )
+    return {"accepted": len(trades), "alerts": detector.alert_seq - before}
+
+
+# Alerts after a sequence number: burst, credential_stuffing, price_outlier or wash_trade
+@app.get('/anomaly/alerts')
+async def getAlerts(
+    after_seq: int = 0,
+    kind: str | None = None,
+    limit: int = Query(100, le=1000),
+    service: str = Depends(service_auth),
+):
+    return detector.recent_alerts(after_seq, kind, limit)
+
+
+@app.get('/anomaly/stats')
+async def getAnomalyStats():
+    return detector.stats()
 
 
 ###
@@ -0,0 +1,85 @@
+"""
+Anomaly detector replay benchmark
+
+Generates a synthetic stream of request logs and trades over simulated
+time, with a request burst, a credential stuffing run and wash trades mixed
+into normal traffic, replays it through one detector on one core and
+reports events per second and the alerts raised, e.g.:
+
+    python benchmark.py --requests 2000000 --trades 500000
+"""
+import argparse
+import json
+import random
+import time
+from collections import Counter
+
+from anomaly import AnomalyDetector
+
+
+def synthetic_stream(requests: int, trades: int, seconds: float):
+    """Yield ("request" | "trade", now, fields) in time order."""
+    rng = random.Random(42)
+    ips = [f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}" for n in range(50000)]
+    users = [f"user-{n}" for n in range(20000)]
+    assets = [f"asset-{n}" for n in range(500)]
+    prices = {asset: rng.uniform(10, 1000) for asset in assets}
+    paths = ["/services", "/listings", "/trades", "/auth/login", "/robots"]
+
+    events = []
+    for _ in range(requests):
+        now = rng.uniform(0, seconds)
+        path = rng.choice(paths)
+        if path == "/auth/login":
+            # Users log in from their own address and mistype now and then
+            n = rng.randrange(len(users))
+            ip, account, status = ips[n * 7919 % len(ips)], users[n], 401 if rng.random() < 0.05 else 200
+        else:
+            ip, account, status = ips[min(int(rng.paretovariate(1.2)) - 1, len(ips) - 1) * 7919 % len(ips)], None, 200
+        events.append((now, "request", (ip, path, status, account)))
+    for _ in range(trades):
+        now = rng.uniform(0, seconds)
+        asset = rng.choice(assets)
+        price = prices[asset] * rng.lognormvariate(0, 0.01)
+        buyer, seller = rng.sample(users, 2)
+        events.append((now, "trade", (asset, price, rng.uniform(1, 10), buyer, seller)))
+
+    # Injected anomalies at known times
+    start = seconds / 3
+    events += [(start + n / 200, "request", ("203.0.113.7", "/listings", 200, None)) for n in range(3000)]
+    events += [(start + n / 10, "request", ("198.51.100.9", "/auth/login", 401, f"victim-{n}")) for n in range(500)]
+    events += [(start + n, "trade", ("asset-1", prices["asset-1"], 5.0, *(("wash-a", "wash-b") if n % 2 else ("wash-b", "wash-a"))))
+               for n in range(20)]
+    events += [(start + 1, "trade", ("asset-2", prices["asset-2"] * 3, 1.0, "user-1", "user-2"))]
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def main(args):
+    events = synthetic_stream(args.requests, args.trades, args.seconds)
+    detector = AnomalyDetector(max_keys=args.max_keys)
+
+    started = time.perf_counter()
+    observe_request, observe_trade = detector.observe_request, detector.observe_trade
+    for now, kind, fields in events:
+        if kind == "request":
+            observe_request(*fields, now=now)
+        else:
+            observe_trade(*fields, now=now)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(events)} events in {elapsed:.2f}s ({len(events) / elapsed:.0f} events/s on one core)")
+    print("alerts:", dict(Counter(alert["kind"] for alert in detector.alerts)))
+    for kind in ("burst", "credential_stuffing", "price_outlier", "wash_trade"):
+        first = next((alert for alert in detector.alerts if alert["kind"] == kind), None)
+        print(f"first {kind}: {json.dumps(first, default=str)}")
+    print(json.dumps(detector.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000000)
+    parser.add_argument("--trades", type=int, default=200000)
+    parser.add_argument("--seconds", type=float, default=3600, help="Simulated time the stream spans")
+    parser.add_argument("--max-keys", type=int, default=100000)
+    main(parser.parse_args())
@@ -0,0 +1,34 @@
+import os
+
+
+class Settings:
+    """
+    Settings for the security and compliance service.
+    """
+    server_port = os.getenv("PORT", "8080")
+    envir = os.getenv("ENVIR", "dev")
+
+    # Audit events are appended to local files ("file") or to Firestore
+    # ("firestore"), in `{ENVIR}_audit_events`
+    audit_sink = os.getenv("AUDIT_SINK", "file")
+    audit_dir = os.getenv("AUDIT_DIR", "audit_log")
+    audit_max_file_bytes = int(os.getenv("AUDIT_MAX_FILE_BYTES", str(64 * 2 ** 20)))
+    audit_collection = f"{envir}_audit_events"
+
+    # Events wait in a ring buffer of `audit_buffer_size` and are written
+    # `audit_batch_size` at a time, at least every `audit_flush_interval` seconds
+    audit_buffer_size = int(os.getenv("AUDIT_BUFFER_SIZE", "65536"))
+    audit_batch_size = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+    audit_flush_interval = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.2"))
+
+    # Anomaly detection keeps state for at most `anomaly_max_keys` keys per
+    # table (IPs, accounts, assets, trading pairs), evicting the least recent
+    anomaly_max_keys = int(os.getenv("ANOMALY_MAX_KEYS", "100000"))
+    burst_ratio = float(os.getenv("ANOMALY_BURST_RATIO", "5"))
+    burst_min_rate = float(os.getenv("ANOMALY_BURST_MIN_RATE", "20"))
+    stuffing_threshold = int(os.getenv("ANOMALY_STUFFING_THRESHOLD", "20"))
+    zscore_threshold = float(os.getenv("ANOMALY_ZSCORE_THRESHOLD", "5"))
+    wash_window = float(os.getenv("ANOMALY_WASH_WINDOW", "600"))
+
+
+settings = Settings()
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Dict, List
 
 class ServiceDetails(BaseModel):
@@ -10,3 +10,39 @@ class ServiceDetails(BaseModel):
     price: Dict | None = None
     providerId: str | None = None
     reviewsId: str | None = None
+
+
+class AuditEventCreate(BaseModel):
+    action: str = Field(..., description="e.g. auth.login, listing.update, trade.create, admin.role_change")
+    actor: str | None = None
+    resource: str | None = None
+    outcome: str = "success"
+    details: Dict | None = None
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "action": "auth.login",
+                "actor": "100154678",
+                "outcome": "failure",
+                "details": {"reason": "bad password"},
+            }
+        }
+
+
+class RequestLog(BaseModel):
+    ip: str
+    path: str
+    status: int
+    account: str | None = Field(None, description="Account the request acted for, e.g. the login name")
+    ts: float | None = Field(None, description="Epoch seconds; defaults to when it is received")
+
+
+class TradeEvent(BaseModel):
+    trade_id: str | None = None
+    asset_id: str
+    price: float = Field(..., gt=0)
+    quantity: float = Field(1, gt=0)
+    buyer_id: str | None = None
+    seller_id: str | None = None
+    ts: float | None = Field(None, description="Epoch seconds; defaults to when it is received")
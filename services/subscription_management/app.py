@@ -1,17 +1,50 @@
 import os
 import uvicorn
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.responses import JSONResponse
 
+from construct_shared.service_auth import ServiceAuth
+from construct_shared.user_auth import Caller, UserAuth
+
+from config import settings
+from entitlements import EntitlementIndex
+from models import EntitlementBatch, EntitlementResult, Subscription, SubscriptionCreate
+from payments import create_backend
+from scheduler import RenewalScheduler
+from store import SubscriptionStore, due_at
+
 
 app = FastAPI()
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-templates = Jinja2Templates(directory="app/templates")
+templates = Jinja2Templates(directory="templates")
+
+store = SubscriptionStore(settings.subscriptions_collection)
+entitlements = EntitlementIndex(store, settings.entitlement_poll_interval)
+scheduler = RenewalScheduler(
+    store, create_backend(settings), settings, on_renewed=entitlements.grant, on_lapsed=entitlements.revoke
+)
+
+# Customers manage their own subscriptions; other services may act for them
+user_auth = UserAuth.from_env(services=ServiceAuth.from_env())
+
+
+@app.on_event("startup")
+async def start_scheduler():
+    await entitlements.load()
+    entitlements.start()
+    await scheduler.load()
+    scheduler.start()
+
+
+@app.on_event("shutdown")
+async def stop_scheduler():
+    await scheduler.stop()
+    await entitlements.stop()
 
 # Retrieve list of all available services
 @app.get('/services')
@@ -50,6 +83,68 @@ async def createService(serviceId: str):
         return JSONResponse({"error": str(e)})
 
 
+# Start a recurring subscription; the first charge is due at start_at and
+# the robot is entitled once it succeeds
+@app.post('/subscriptions', response_model=Subscription, status_code=201)
+async def createSubscription(subscription: SubscriptionCreate, caller: Caller = Depends(user_auth)):
+    caller.require(subscription.customer_id)
+    created = await store.create(subscription)
+    scheduler.schedule(created.id, due_at(created.dict()))
+    return created
+
+
+@app.get('/subscriptions/{subscriptionId}', response_model=Subscription)
+async def getSubscription(subscriptionId: str, caller: Caller = Depends(user_auth)):
+    subscription = await store.get(subscriptionId)
+    if subscription is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    caller.require(subscription.customer_id)
+    return subscription
+
+
+# Cancel a subscription; no further renewals are charged
+@app.delete('/subscriptions/{subscriptionId}', response_model=Subscription)
+async def cancelSubscription(subscriptionId: str, caller: Caller = Depends(user_auth)):
+    subscription = await store.get(subscriptionId)
+    if subscription is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    caller.require(subscription.customer_id)
+    subscription = await store.cancel(subscriptionId)
+    if subscription is None:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    scheduler.unschedule(subscriptionId)
+    entitlements.revoke(subscriptionId)
+    return subscription
+
+
+# Is the robot entitled to the software right now? Answered from memory
+@app.get('/entitlements/check', response_model=EntitlementResult)
+async def checkEntitlement(robot_id: str, software_id: str):
+    return EntitlementResult(
+        robot_id=robot_id, software_id=software_id, entitled=entitlements.check(robot_id, software_id)
+    )
+
+
+# Up to 1000 checks in one call; results are in request order
+@app.post('/entitlements/check', response_model=list[EntitlementResult])
+async def checkEntitlements(batch: EntitlementBatch):
+    results = entitlements.check_many([(check.robot_id, check.software_id) for check in batch.checks])
+    return [
+        EntitlementResult(robot_id=check.robot_id, software_id=check.software_id, entitled=entitled)
+        for check, entitled in zip(batch.checks, results)
+    ]
+
+
+@app.get('/entitlements/stats')
+async def getEntitlementStats():
+    return entitlements.stats()
+
+
+# Schedule size, renewal lag and renewal counters
+@app.get('/scheduler/stats')
+async def getSchedulerStats():
+    return scheduler.stats()
+
 
 ###
 ###
@@ -0,0 +1,95 @@
+"""
+Renewal scheduler benchmark
+
+Loads a schedule of subscriptions held in memory instead of Firestore, makes
+`--due` of them due now and runs renewals against the stub payment backend,
+reporting load time, schedule memory and renewal throughput, e.g.:
+
+    RENEWAL_CONCURRENCY=500 python benchmark.py --count 2000000 --due 50000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+
+from config import settings
+from payments import create_backend
+from scheduler import RenewalScheduler
+from store import CHANGE_OVERLAP, due_at
+
+
+class MemoryStore:
+    """The parts of SubscriptionStore the scheduler uses, backed by a dict."""
+
+    def __init__(self, subscriptions: dict):
+        self.subscriptions = subscriptions
+        self.log = []  # (updated_at, id) of each write, oldest first
+
+    async def schedule(self):
+        for n, (subscription_id, subscription) in enumerate(self.subscriptions.items()):
+            yield subscription_id, due_at(subscription)
+            if n % 10000 == 0:
+                await asyncio.sleep(0)
+
+    async def get_many(self, subscription_ids):
+        await asyncio.sleep(0.02)  # Roughly one Firestore round trip
+        return {id: self.subscriptions[id] for id in subscription_ids if id in self.subscriptions}
+
+    async def changes(self, since):
+        await asyncio.sleep(0.02)
+        for updated_at, subscription_id in self.log[bisect_left(self.log, (since - CHANGE_OVERLAP,)):]:
+            yield subscription_id, self.subscriptions[subscription_id]
+
+    async def apply(self, updates):
+        await asyncio.sleep(0.02)
+        now = datetime.now(timezone.utc)
+        for subscription_id, fields in updates.items():
+            self.subscriptions[subscription_id].update(fields, updated_at=now)
+            self.log.append((now, subscription_id))
+
+
+def make_subscriptions(count: int, due: int) -> dict:
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    subscriptions = {}
+    for n in range(count):
+        next_due = now - timedelta(seconds=n) if n < due else now + timedelta(seconds=random.randrange(1, 30 * 86400))
+        subscriptions[f"sub-{n}"] = {
+            "customer_id": f"user-{n}", "price": 49.99, "currency": "USD", "period": "monthly",
+            "status": "active", "billing_day": next_due.day, "next_due": next_due, "failures": 0,
+        }
+    return subscriptions
+
+
+async def main(args):
+    store = MemoryStore(make_subscriptions(args.count, args.due))
+    scheduler = RenewalScheduler(store, create_backend(settings), settings)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    await scheduler.load()
+    loaded = time.perf_counter() - started
+    schedule_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    scheduler.start()
+    while scheduler.counters["renewed"] + scheduler.counters["declined"] + scheduler.counters["errors"] < args.due:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    await scheduler.stop()
+
+    print(f"{args.count} subscriptions loaded in {loaded:.2f}s, "
+          f"schedule uses {schedule_bytes / 2 ** 20:.0f} MiB")
+    print(f"{args.due} due renewals in {elapsed:.2f}s ({args.due / elapsed:.0f}/s)")
+    print(json.dumps(scheduler.stats(), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--due", type=int, default=20000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,40 @@
+import os
+
+
+class Settings:
+    """
+    Settings for the subscription management service.
+    """
+    server_port = os.getenv("PORT", "8080")
+    envir = os.getenv("ENVIR", "dev")
+    subscriptions_collection = f"{envir}_subscriptions"
+
+    # Due renewals are taken from the schedule `renewal_batch_size` at a
+    # time and charged with at most `renewal_concurrency` payment calls in
+    # flight. Results are written back in one Firestore batch per renewal batch.
+    renewal_batch_size = int(os.getenv("RENEWAL_BATCH_SIZE", "400"))
+    renewal_concurrency = int(os.getenv("RENEWAL_CONCURRENCY", "50"))
+
+    # The schedule is loaded from Firestore on startup, then follows
+    # subscriptions written elsewhere by querying for changes every
+    # `schedule_poll_interval` seconds
+    schedule_poll_interval = float(os.getenv("SCHEDULE_POLL_INTERVAL", "10"))
+
+    # Failed charges are retried after `retry_delay` seconds, doubling each
+    # time; after `max_failures` the subscription is marked past due and
+    # leaves the schedule
+    max_failures = int(os.getenv("RENEWAL_MAX_FAILURES", "4"))
+    retry_delay = int(os.getenv("RENEWAL_RETRY_DELAY", "3600"))
+
+    # Entitlement checks are answered from memory; the index follows changes
+    # made on this instance directly and queries Firestore for changes made
+    # elsewhere this often
+    entitlement_poll_interval = float(os.getenv("ENTITLEMENT_POLL_INTERVAL", "5"))
+
+    # Payment backend: "stub" simulates a payment provider's latency and declines
+    payment_backend = os.getenv("PAYMENT_BACKEND", "stub")
+    stub_latency = float(os.getenv("STUB_PAYMENT_LATENCY", "0.05"))
+    stub_decline_rate = float(os.getenv("STUB_PAYMENT_DECLINE_RATE", "0.02"))
+
+
+settings = Settings()
@@ -0,0 +1,119 @@
+"""
+Entitlement index benchmark
+
+Builds the index from subscriptions held in memory instead of Firestore and
+reports load time, index size, single and batched check latency, and the
+cost of applying a round of changes by polling against a full reload, e.g.:
+
+    python entitlement_benchmark.py --subscriptions 2000000 --robots 500000 --software 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+from entitlements import EntitlementIndex
+from store import CHANGE_OVERLAP
+
+
+class MemoryStore:
+    """The parts of SubscriptionStore the index uses, backed by a dict."""
+
+    def __init__(self, subscriptions: dict):
+        self.subscriptions = subscriptions
+        self.changed = []  # IDs written since the index loaded
+
+    async def entitlements(self):
+        for n, (subscription_id, subscription) in enumerate(self.subscriptions.items()):
+            if subscription["status"] == "active" and subscription.get("last_payment_id"):
+                yield subscription_id, subscription["robot_id"], subscription["item_id"]
+            if n % 10000 == 0:
+                await asyncio.sleep(0)
+
+    async def changes(self, since):
+        for subscription_id in self.changed:
+            subscription = self.subscriptions[subscription_id]
+            if subscription["updated_at"] >= since - CHANGE_OVERLAP:
+                yield subscription_id, subscription
+
+    def write(self, subscription_id: str, **fields):
+        self.subscriptions[subscription_id].update(fields, updated_at=datetime.now(timezone.utc))
+        self.changed.append(subscription_id)
+
+
+def make_subscriptions(args, rng) -> dict:
+    return {
+        f"sub-{n}": {
+            "robot_id": f"robot-{rng.randrange(args.robots)}",
+            "item_id": f"software-{rng.randrange(args.software)}",
+            "status": "active",
+            "last_payment_id": f"payment-{n}",
+        }
+        for n in range(args.subscriptions)
+    }
+
+
+def per_check_ns(fn, items, repeats=1) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(items)
+    return (time.perf_counter() - start) / (len(items) * repeats) * 1e9
+
+
+async def main(args):
+    rng = random.Random(42)
+    store = MemoryStore(make_subscriptions(args, rng))
+    index = EntitlementIndex(store, poll_interval=0)
+
+    started = time.perf_counter()
+    await index.load()
+    loaded = time.perf_counter() - started
+
+    # Half the checks are for pairs that exist, half for random pairs
+    held = rng.sample(list(store.subscriptions.values()), args.checks // 2)
+    pairs = [(s["robot_id"], s["item_id"]) for s in held] + [
+        (f"robot-{rng.randrange(args.robots)}", f"software-{rng.randrange(args.software)}")
+        for _ in range(args.checks - len(held))
+    ]
+    rng.shuffle(pairs)
+    single_ns = per_check_ns(lambda items: [index.check(r, s) for r, s in items], pairs)
+    batch = pairs[:1000]
+    batch_ns = per_check_ns(index.check_many, batch, repeats=max(1, args.checks // 1000))
+
+    # A round of changes made elsewhere: cancellations and new subscriptions
+    for subscription_id in rng.sample(list(store.subscriptions), args.changes // 2):
+        store.write(subscription_id, status="cancelled")
+    for n in range(args.changes - args.changes // 2):
+        store.subscriptions[f"new-{n}"] = {
+            "robot_id": f"robot-{rng.randrange(args.robots)}",
+            "item_id": f"software-{rng.randrange(args.software)}",
+            "status": "active",
+            "last_payment_id": f"payment-new-{n}",
+        }
+        store.write(f"new-{n}")
+    started = time.perf_counter()
+    await index.poll()
+    polled = time.perf_counter() - started
+    entitlements = index.stats()["entitlements"]
+    started = time.perf_counter()
+    await index.load()
+    reloaded = time.perf_counter() - started
+    assert index.stats()["entitlements"] == entitlements, "poll and reload disagree"
+
+    print(f"{args.subscriptions} subscriptions loaded in {loaded:.2f}s")
+    print(f"check:        {single_ns:8.0f} ns/check")
+    print(f"check_many:   {batch_ns:8.0f} ns/check (batches of {len(batch)})")
+    print(f"{args.changes} changes: poll {polled * 1000:.1f}ms, full reload {reloaded * 1000:.0f}ms")
+    print(json.dumps(index.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscriptions", type=int, default=1000000)
+    parser.add_argument("--robots", type=int, default=200000)
+    parser.add_argument("--software", type=int, default=1000)
+    parser.add_argument("--checks", type=int, default=200000)
+    parser.add_argument("--changes", type=int, default=1000, help="Changes applied by one poll")
+    asyncio.run(main(parser.parse_args()))
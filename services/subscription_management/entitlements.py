@@ -0,0 +1,209 @@
+"""
+Entitlement index
+
+Answers "is this robot entitled to this software right now?" from memory.
+Robot IDs are interned to small integers and each software item keeps the
+set of entitled robots as a roaring bitmap when pyroaring is installed, or
+as a sorted array of 32-bit ints otherwise, so a check is a dict lookup and
+a bitmap or binary search, with no Firestore read.
+
+A subscription entitles its robot once its first charge has succeeded, so
+starting one does not unlock anything until it is paid for. The index
+follows subscription events on this instance (charged, cancelled, lapsed)
+as they happen. It is loaded from Firestore once, then picks up
+changes made elsewhere by querying every `poll_interval` seconds for
+subscriptions written since the last change it applied, so keeping it
+current costs in proportion to the changes rather than the whole collection.
+"""
+import asyncio
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import SubscriptionStatus
+
+try:
+    from pyroaring import BitMap
+except ImportError:  # Roaring bitmaps are optional; sorted arrays are used instead
+    BitMap = None
+
+
+class SortedIds:
+    """A set of uint32 kept as a sorted array."""
+
+    __slots__ = ("ids",)
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self.ids = array("I", sorted(set(ids)))
+
+    def add(self, value: int):
+        i = bisect_left(self.ids, value)
+        if i == len(self.ids) or self.ids[i] != value:
+            self.ids.insert(i, value)
+
+    def discard(self, value: int):
+        i = bisect_left(self.ids, value)
+        if i < len(self.ids) and self.ids[i] == value:
+            del self.ids[i]
+
+    def __contains__(self, value: int) -> bool:
+        i = bisect_left(self.ids, value)
+        return i < len(self.ids) and self.ids[i] == value
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def nbytes(self) -> int:
+        return self.ids.itemsize * len(self.ids)
+
+
+def _id_set(ids: Iterable[int] = ()):
+    return BitMap(ids) if BitMap is not None else SortedIds(ids)
+
+
+class EntitlementIndex:
+    def __init__(self, store, poll_interval: float):
+        self.store = store
+        self.poll_interval = poll_interval
+        self._robot_ids: Dict[str, int] = {}
+        self._software: Dict[str, object] = {}
+        # subscription ID -> (robot, software), so a robot holding the same
+        # software through two subscriptions keeps it until both end
+        self._grants: Dict[str, Tuple[int, str]] = {}
+        self._holders: Dict[Tuple[int, str], int] = defaultdict(int)
+        self._changes_during_load = None
+        self._task = None
+        # updated_at of the newest change applied; None until loaded
+        self._watermark: Optional[datetime] = None
+        self.loaded_at = None
+        self.polled_at = None
+        self.checks = 0
+
+    def _intern(self, robot_id: str) -> int:
+        robot = self._robot_ids.get(robot_id)
+        if robot is None:
+            robot = self._robot_ids[robot_id] = len(self._robot_ids)
+        return robot
+
+    def grant(self, subscription_id: str, robot_id: str, software_id: str):
+        if self._changes_during_load is not None:
+            self._changes_during_load.append((self.grant, (subscription_id, robot_id, software_id)))
+        if subscription_id in self._grants:
+            return
+        robot = self._intern(robot_id)
+        self._grants[subscription_id] = (robot, software_id)
+        self._holders[robot, software_id] += 1
+        robots = self._software.get(software_id)
+        if robots is None:
+            robots = self._software[software_id] = _id_set()
+        robots.add(robot)
+
+    def revoke(self, subscription_id: str):
+        if self._changes_during_load is not None:
+            self._changes_during_load.append((self.revoke, (subscription_id,)))
+        grant = self._grants.pop(subscription_id, None)
+        if grant is None:
+            return
+        self._holders[grant] -= 1
+        if self._holders[grant] == 0:
+            del self._holders[grant]
+            self._software[grant[1]].discard(grant[0])
+
+    def check(self, robot_id: str, software_id: str) -> bool:
+        self.checks += 1
+        robot = self._robot_ids.get(robot_id)
+        robots = self._software.get(software_id)
+        return robot is not None and robots is not None and robot in robots
+
+    def check_many(self, pairs: List[Tuple[str, str]]) -> List[bool]:
+        robot_ids, software = self._robot_ids, self._software
+        results = []
+        for robot_id, software_id in pairs:
+            robot = robot_ids.get(robot_id)
+            robots = software.get(software_id)
+            results.append(robot is not None and robots is not None and robot in robots)
+        self.checks += len(pairs)
+        return results
+
+    async def load(self):
+        """Rebuild the index from the active subscriptions in Firestore."""
+        started = time.perf_counter()
+        # Polling resumes from before the scan, so writes made during it are seen
+        watermark = datetime.now(timezone.utc)
+        robot_ids = dict(self._robot_ids)  # Keep existing numbering; it is only ever added to
+        grants, holders = {}, defaultdict(int)
+        members = defaultdict(list)
+        self._changes_during_load = []
+        try:
+            async for subscription_id, robot_id, software_id in self.store.entitlements():
+                robot = robot_ids.setdefault(robot_id, len(robot_ids))
+                grants[subscription_id] = (robot, software_id)
+                holders[robot, software_id] += 1
+                members[software_id].append(robot)
+        except BaseException:
+            self._changes_during_load = None
+            raise
+        changes, self._changes_during_load = self._changes_during_load, None
+        self._robot_ids = robot_ids
+        self._grants, self._holders = grants, holders
+        self._software = {software_id: _id_set(robots) for software_id, robots in members.items()}
+        # Events seen while streaming may not be in the results; both are idempotent
+        for change, args in changes:
+            change(*args)
+        self._watermark = watermark
+        self.loaded_at = self.polled_at = time.time()
+        print(f"Loaded {len(grants)} entitlements in {time.perf_counter() - started:.1f}s")
+
+    async def poll(self):
+        """Apply subscriptions written since the last change seen."""
+        watermark = self._watermark
+        async for subscription_id, fields in self.store.changes(self._watermark):
+            if (
+                fields.get("status") == SubscriptionStatus.active.value
+                and fields.get("robot_id")
+                and fields.get("last_payment_id")
+            ):
+                self.grant(subscription_id, fields["robot_id"], fields["item_id"])
+            else:
+                self.revoke(subscription_id)
+            watermark = max(watermark, fields["updated_at"])
+        self._watermark = watermark
+        self.polled_at = time.time()
+
+    def start(self):
+        self._task = asyncio.create_task(self._poll(), name="entitlement-poll")
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if self._watermark is None:
+                    await self.load()
+                else:
+                    await self.poll()
+            except Exception as exc:
+                # Keep serving the current index; the next poll resumes from the same change
+                print(f"Error polling entitlements: {exc}")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "roaring" if BitMap is not None else "sorted_array",
+            "entitlements": len(self._grants),
+            "robots": len(self._robot_ids),
+            "software": len(self._software),
+            "index_bytes": sum(
+                robots.get_serialized_size_in_bytes() if BitMap is not None else robots.nbytes()
+                for robots in self._software.values()
+            ),
+            "checks": self.checks,
+            "loaded_at": self.loaded_at,
+            "polled_at": self.polled_at,
+        }
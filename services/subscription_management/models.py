@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from datetime import datetime
+from enum import Enum
+from pydantic import BaseModel, Field
 from typing import Dict, List
 
 class ServiceDetails(BaseModel):
@@ -10,3 +12,68 @@ class ServiceDetails(BaseModel):
     price: Dict | None = None
     providerId: str | None = None
     reviewsId: str | None = None
+
+
+class BillingPeriod(str, Enum):
+    weekly = "weekly"
+    monthly = "monthly"
+    yearly = "yearly"
+
+
+class SubscriptionStatus(str, Enum):
+    active = "active"
+    past_due = "past_due"
+    cancelled = "cancelled"
+
+
+class SubscriptionCreate(BaseModel):
+    customer_id: str
+    item_id: str = Field(..., description="Robot or service the subscription is for")
+    robot_id: str | None = Field(None, description="Robot entitled to the item while the subscription is active")
+    price: float = Field(..., gt=0, description="Charged every billing period")
+    currency: str = "USD"
+    period: BillingPeriod = BillingPeriod.monthly
+    start_at: datetime | None = Field(None, description="First charge; defaults to now")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "customer_id": "100154678",
+                "item_id": "software-navigation",
+                "robot_id": "robot-12987",
+                "price": 49.99,
+                "currency": "USD",
+                "period": "monthly",
+            }
+        }
+
+
+class Subscription(BaseModel):
+    id: str
+    customer_id: str
+    item_id: str
+    robot_id: str | None = None
+    price: float
+    currency: str
+    period: BillingPeriod
+    status: SubscriptionStatus
+    billing_day: int = Field(..., description="Day of the month renewals fall on")
+    next_due: datetime
+    retry_at: datetime | None = None
+    failures: int = 0
+    last_payment_id: str | None = None
+    last_renewed_at: datetime | None = None
+    created_at: datetime
+
+
+class EntitlementCheck(BaseModel):
+    robot_id: str
+    software_id: str
+
+
+class EntitlementResult(EntitlementCheck):
+    entitled: bool
+
+
+class EntitlementBatch(BaseModel):
+    checks: List[EntitlementCheck] = Field(..., max_items=1000)
@@ -0,0 +1,65 @@
+"""
+Payment backends
+
+A backend charges a customer for one renewal. Every charge carries an
+idempotency key derived from the subscription and the billing period, so a
+renewal retried after a crash or a timeout is not charged twice.
+"""
+import asyncio
+import random
+import uuid
+from abc import ABC, abstractmethod
+from typing import Dict
+
+
+class PaymentError(Exception):
+    """A charge failed. Declines are final for the attempt; others may succeed on retry."""
+
+    def __init__(self, message: str, declined: bool = False):
+        super().__init__(message)
+        self.declined = declined
+
+
+class PaymentBackend(ABC):
+    """Base class for payment backends"""
+
+    name = "backend"
+
+    @abstractmethod
+    async def charge(self, customer_id: str, amount: float, currency: str, idempotency_key: str) -> str:
+        """Charge the customer; return the payment ID or raise PaymentError."""
+
+    async def close(self):
+        pass
+
+
+class StubPaymentBackend(PaymentBackend):
+    """
+    Simulates a payment provider for local runs and benchmarks.
+
+    Each charge takes `latency` seconds and is declined with probability
+    `decline_rate`. Repeating an idempotency key returns the original payment.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float, decline_rate: float):
+        self.latency = latency
+        self.decline_rate = decline_rate
+        self.payments: Dict[str, str] = {}
+
+    async def charge(self, customer_id: str, amount: float, currency: str, idempotency_key: str) -> str:
+        await asyncio.sleep(self.latency)
+        if idempotency_key in self.payments:
+            return self.payments[idempotency_key]
+        if random.random() < self.decline_rate:
+            raise PaymentError("Simulated card decline", declined=True)
+        payment_id = uuid.uuid4().hex
+        self.payments[idempotency_key] = payment_id
+        return payment_id
+
+
+def create_backend(settings) -> PaymentBackend:
+    if settings.payment_backend == "stub":
+        return StubPaymentBackend(settings.stub_latency, settings.stub_decline_rate)
+    raise ValueError(f"Unknown payment backend {settings.payment_backend}")
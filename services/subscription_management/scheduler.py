@@ -0,0 +1,261 @@
+"""
+Renewal scheduler
+
+Active subscriptions sit in a min-heap keyed by the epoch second their next
+renewal is due, so finding due work is O(log N) per renewal rather than a
+scan of every subscription. A dict holds the current due time per ID; heap
+entries that no longer match it (cancelled or rescheduled subscriptions) are
+skipped when they reach the top instead of being removed in place.
+
+The heap is built from Firestore on startup, so it survives restarts, and
+is then kept current by polling for subscriptions written since the last
+change seen, so subscriptions created or cancelled on other instances are
+picked up without rescanning the collection.
+Due renewals are taken in batches: the documents are read in one call, still
+valid ones are charged with bounded concurrency, and the results are written
+back in one batch. Charges use an idempotency key per billing period, so a
+batch repeated after a crash does not charge anyone twice.
+"""
+import asyncio
+import calendar
+import heapq
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from models import BillingPeriod, SubscriptionStatus
+from payments import PaymentBackend, PaymentError
+from store import SubscriptionStore, due_at
+
+
+def next_period(due: datetime, period: str, billing_day: int) -> datetime:
+    """The renewal after `due`, keeping monthly and yearly renewals on `billing_day`."""
+    if period == BillingPeriod.weekly:
+        return due + timedelta(weeks=1)
+    months = 1 if period == BillingPeriod.monthly else 12
+    month = due.month - 1 + months
+    year, month = due.year + month // 12, month % 12 + 1
+    day = min(billing_day, calendar.monthrange(year, month)[1])
+    return due.replace(year=year, month=month, day=day)
+
+
+class RenewalScheduler:
+    def __init__(
+        self,
+        store: SubscriptionStore,
+        backend: PaymentBackend,
+        settings,
+        on_renewed: Optional[Callable[[str, str, str], None]] = None,
+        on_lapsed: Optional[Callable[[str], None]] = None,
+    ):
+        self.store = store
+        self.backend = backend
+        # Called with (ID, robot_id, item_id) after each successful charge of a subscription held by a robot
+        self.on_renewed = on_renewed
+        self.on_lapsed = on_lapsed  # Called with the ID of each subscription that becomes past due
+        self.batch_size = settings.renewal_batch_size
+        self.max_failures = settings.max_failures
+        self.retry_delay = settings.retry_delay
+        self.poll_interval = settings.schedule_poll_interval
+
+        self._due: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []
+        self._charge_slots = asyncio.Semaphore(settings.renewal_concurrency)
+        self._wakeup = asyncio.Event()
+        self._task = None
+        # updated_at of the newest change applied; None until loaded
+        self._watermark: Optional[datetime] = None
+        self._polled_at = 0.0
+        self._scheduled_during_load = None
+
+        self.counters = dict.fromkeys(
+            ("renewed", "declined", "errors", "past_due", "stale", "batches"), 0
+        )
+        self.last_batch = None
+
+    def schedule(self, subscription_id: str, due: int):
+        if self._scheduled_during_load is not None:
+            self._scheduled_during_load[subscription_id] = due
+        self._due[subscription_id] = due
+        if not self._heap or due < self._heap[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self._heap, (due, subscription_id))
+
+    def unschedule(self, subscription_id: str):
+        # Its heap entry is dropped lazily once it reaches the top
+        self._due.pop(subscription_id, None)
+        if self._scheduled_during_load is not None:
+            self._scheduled_during_load.pop(subscription_id, None)
+
+    async def load(self):
+        """Rebuild the schedule from the active subscriptions in Firestore."""
+        started = time.perf_counter()
+        # Polling resumes from before the scan, so writes made during it are seen
+        watermark = datetime.now(timezone.utc)
+        due = {}
+        self._scheduled_during_load = {}
+        try:
+            async for subscription_id, due_time in self.store.schedule():
+                due[subscription_id] = due_time
+            # Subscriptions created while streaming may be missing from the results
+            due.update(self._scheduled_during_load)
+        finally:
+            self._scheduled_during_load = None
+        heap = [(due_time, subscription_id) for subscription_id, due_time in due.items()]
+        heapq.heapify(heap)
+        self._due, self._heap = due, heap
+        self._watermark, self._polled_at = watermark, time.monotonic()
+        self._wakeup.set()
+        print(f"Loaded {len(due)} subscriptions in {time.perf_counter() - started:.1f}s")
+
+    async def poll(self):
+        """Apply subscriptions written since the last change seen."""
+        watermark = self._watermark
+        async for subscription_id, fields in self.store.changes(self._watermark):
+            if fields.get("status") == SubscriptionStatus.active.value:
+                due = due_at(fields)
+                if self._due.get(subscription_id) != due:
+                    self.schedule(subscription_id, due)
+            else:
+                self.unschedule(subscription_id)
+            watermark = max(watermark, fields["updated_at"])
+        self._watermark, self._polled_at = watermark, time.monotonic()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="renewal-scheduler")
+
+    async def _run(self):
+        while True:
+            try:
+                if self._watermark is None:
+                    await self.load()
+                elif time.monotonic() - self._polled_at >= self.poll_interval:
+                    await self.poll()
+                batch = self._take_due(int(time.time()))
+                if batch:
+                    await self._renew(batch)
+                    continue
+                timeout = self.poll_interval - (time.monotonic() - self._polled_at)
+                if self._heap:
+                    timeout = min(timeout, self._heap[0][0] - time.time())
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), max(timeout, 0))
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Keep the scheduler alive and rebuild the schedule from scratch
+                print(f"Error running renewals: {exc}")
+                self._watermark = None
+                await asyncio.sleep(5)
+
+    def _take_due(self, now: int) -> List[Tuple[str, int]]:
+        batch = []
+        while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+            due, subscription_id = heapq.heappop(self._heap)
+            if self._due.get(subscription_id) == due:
+                batch.append((subscription_id, due))
+        return batch
+
+    async def _renew(self, batch: List[Tuple[str, int]]):
+        started = time.perf_counter()
+        documents = await self.store.get_many([subscription_id for subscription_id, _ in batch])
+
+        renewals = []
+        for subscription_id, due in batch:
+            subscription = documents.get(subscription_id)
+            if (
+                subscription is None
+                or subscription["status"] != SubscriptionStatus.active.value
+                or due_at(subscription) != due
+            ):
+                # Changed since it was scheduled; the next poll picks up any new due time
+                self.counters["stale"] += 1
+                self._due.pop(subscription_id, None)
+                continue
+            renewals.append((subscription_id, due, subscription))
+
+        results = await asyncio.gather(*(self._charge(id, subscription) for id, _, subscription in renewals))
+
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        updates, reschedule = {}, {}
+        for (subscription_id, due, subscription), result in zip(renewals, results):
+            if isinstance(result, str):
+                next_due = next_period(subscription["next_due"], subscription["period"], subscription["billing_day"])
+                updates[subscription_id] = {
+                    "next_due": next_due,
+                    "retry_at": None,
+                    "failures": 0,
+                    "last_payment_id": result,
+                    "last_renewed_at": now,
+                }
+                reschedule[subscription_id] = int(next_due.timestamp())
+                self.counters["renewed"] += 1
+                if self.on_renewed and subscription.get("robot_id"):
+                    self.on_renewed(subscription_id, subscription["robot_id"], subscription["item_id"])
+                continue
+
+            self.counters["declined" if result.declined else "errors"] += 1
+            failures = subscription.get("failures", 0) + 1
+            if failures >= self.max_failures:
+                updates[subscription_id] = {
+                    "status": SubscriptionStatus.past_due.value,
+                    "retry_at": None,
+                    "failures": failures,
+                }
+                self.counters["past_due"] += 1
+                self._due.pop(subscription_id, None)
+                if self.on_lapsed:
+                    self.on_lapsed(subscription_id)
+            else:
+                retry_at = now + timedelta(seconds=self.retry_delay * 2 ** (failures - 1))
+                updates[subscription_id] = {"retry_at": retry_at, "failures": failures}
+                reschedule[subscription_id] = int(retry_at.timestamp())
+
+        await self.store.apply(updates)
+        for subscription_id, due in batch:
+            # Skip subscriptions cancelled while the batch was running
+            if subscription_id in reschedule and self._due.get(subscription_id) == due:
+                self.schedule(subscription_id, reschedule[subscription_id])
+
+        self.counters["batches"] += 1
+        elapsed = time.perf_counter() - started
+        self.last_batch = {
+            "size": len(batch),
+            "charged": len(renewals),
+            "seconds": round(elapsed, 3),
+            "renewals_per_second": round(len(renewals) / elapsed, 1) if elapsed else None,
+        }
+
+    async def _charge(self, subscription_id: str, subscription: dict):
+        # One key per billing period: retries of the same period reuse it
+        key = f"{subscription_id}:{int(subscription['next_due'].timestamp())}"
+        async with self._charge_slots:
+            try:
+                return await self.backend.charge(
+                    subscription["customer_id"], subscription["price"], subscription["currency"], key
+                )
+            except PaymentError as exc:
+                return exc
+            except Exception as exc:
+                print(f"Error charging subscription {subscription_id}: {exc}")
+                return PaymentError(str(exc))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        oldest = self._heap[0][0] if self._heap else None
+        return {
+            "scheduled": len(self._due),
+            "heap_entries": len(self._heap),
+            "next_due": datetime.fromtimestamp(oldest, timezone.utc) if oldest else None,
+            "lag_seconds": max(0, int(time.time()) - oldest) if oldest else 0,
+            **self.counters,
+            "last_batch": self.last_batch,
+        }
@@ -0,0 +1,133 @@
+"""
+Subscription storage
+
+Subscriptions are Firestore documents in `{ENVIR}_subscriptions`. The
+scheduler only keeps each active subscription's ID and due time in memory;
+the documents are read in bulk when their renewals come due, so they are
+also the persisted schedule the scheduler rebuilds from on startup.
+
+Every write stamps the document's `updated_at` with the server time, so
+in-memory views load the collection once and then follow it by querying
+for documents written since the last change they saw (`changes`).
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from google.cloud import firestore
+
+from models import Subscription, SubscriptionCreate, SubscriptionStatus
+
+# Firestore batched writes are limited to 500 operations
+WRITE_BATCH_LIMIT = 500
+
+# Change queries reach this far back past the newest change already seen, in
+# case writes commit slightly out of timestamp order; re-reading is harmless
+CHANGE_OVERLAP = timedelta(seconds=5)
+
+CHANGE_FIELDS = ["status", "next_due", "retry_at", "robot_id", "item_id", "last_payment_id", "updated_at"]
+
+
+def due_at(subscription: dict) -> int:
+    """Epoch second the subscription's next renewal attempt is due."""
+    return int((subscription.get("retry_at") or subscription["next_due"]).timestamp())
+
+
+class SubscriptionStore:
+    def __init__(self, collection: str):
+        self.collection = collection
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = firestore.AsyncClient()
+        return self._db
+
+    async def schedule(self) -> AsyncIterator[Tuple[str, int]]:
+        """Yield (id, due) for every active subscription."""
+        query = (
+            self.db.collection(self.collection)
+            .where("status", "==", SubscriptionStatus.active.value)
+            .select(["next_due", "retry_at"])
+        )
+        async for doc in query.stream():
+            yield doc.id, due_at(doc.to_dict())
+
+    async def entitlements(self) -> AsyncIterator[Tuple[str, str, str]]:
+        """Yield (id, robot_id, item_id) for every paid, active subscription held by a robot."""
+        query = (
+            self.db.collection(self.collection)
+            .where("status", "==", SubscriptionStatus.active.value)
+            .select(["robot_id", "item_id", "last_payment_id"])
+        )
+        async for doc in query.stream():
+            subscription = doc.to_dict()
+            if subscription.get("robot_id") and subscription.get("last_payment_id"):
+                yield doc.id, subscription["robot_id"], subscription["item_id"]
+
+    async def changes(self, since: datetime) -> AsyncIterator[Tuple[str, dict]]:
+        """Yield (id, fields) for subscriptions written since `since`, oldest first."""
+        query = (
+            self.db.collection(self.collection)
+            .where("updated_at", ">=", since - CHANGE_OVERLAP)
+            .order_by("updated_at")
+            .select(CHANGE_FIELDS)
+        )
+        async for doc in query.stream():
+            yield doc.id, doc.to_dict()
+
+    async def create(self, subscription: SubscriptionCreate) -> Subscription:
+        now = datetime.now(timezone.utc)
+        start = subscription.start_at or now
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        created = Subscription(
+            id=uuid.uuid4().hex,
+            **subscription.dict(exclude={"start_at"}),
+            status=SubscriptionStatus.active,
+            billing_day=start.day,
+            # Whole seconds, so due times compare exactly after a round trip
+            next_due=start.replace(microsecond=0),
+            created_at=now,
+        )
+        await self.db.collection(self.collection).document(created.id).set(
+            {**created.dict(exclude={"id"}), "updated_at": firestore.SERVER_TIMESTAMP}
+        )
+        return created
+
+    async def get(self, subscription_id: str) -> Optional[Subscription]:
+        doc = await self.db.collection(self.collection).document(subscription_id).get()
+        return Subscription(id=doc.id, **doc.to_dict()) if doc.exists else None
+
+    async def get_many(self, subscription_ids: List[str]) -> Dict[str, dict]:
+        refs = [self.db.collection(self.collection).document(id) for id in subscription_ids]
+        return {doc.id: doc.to_dict() async for doc in self.db.get_all(refs) if doc.exists}
+
+    async def cancel(self, subscription_id: str) -> Optional[Subscription]:
+        ref = self.db.collection(self.collection).document(subscription_id)
+        doc = await ref.get()
+        if not doc.exists:
+            return None
+        await ref.update(
+            {
+                "status": SubscriptionStatus.cancelled.value,
+                "retry_at": None,
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            }
+        )
+        return Subscription(
+            id=doc.id, **{**doc.to_dict(), "status": SubscriptionStatus.cancelled, "retry_at": None}
+        )
+
+    async def apply(self, updates: Dict[str, dict]):
+        """Write renewal results, one batch per 500 subscriptions."""
+        items = list(updates.items())
+        for i in range(0, len(items), WRITE_BATCH_LIMIT):
+            batch = self.db.batch()
+            for subscription_id, fields in items[i:i + WRITE_BATCH_LIMIT]:
+                batch.update(
+                    self.db.collection(self.collection).document(subscription_id),
+                    {**fields, "updated_at": firestore.SERVER_TIMESTAMP},
+                )
+            await batch.commit()
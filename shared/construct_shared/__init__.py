@@ -0,0 +1,3 @@
+"""
+Middleware and helpers shared by The Construct's Python services.
+"""
@@ -0,0 +1,449 @@
+"""
+Audit trail
+
+Any FastAPI app can record an audit trail by installing the middleware:
+
+    from construct_shared.audit import AuditLog, install_audit
+
+    install_audit(app, AuditLog.from_env(service="marketplace"))
+
+and record domain events (logins, listing changes, trades, admin actions)
+directly with `audit_log.record(...)`, reachable as `request.app.state.audit_log`.
+
+The middleware never trusts identity headers sent by the client. The acting
+user is whatever the app's authentication stored in `request.state.actor`
+after verifying the caller's token, and a caller authenticated as another
+service (`request.state.service`, see service_auth) is recorded as such.
+
+Recording only appends a tuple to an in-memory ring buffer, so it costs a
+few microseconds on the request path. A background task drains the buffer
+in batches, links each event to the previous one with a SHA-256 hash chain,
+and appends the batch to the sink. Changing, removing or reordering a stored
+event breaks the chain from that point, which `verify_chain` reports. If the
+buffer fills faster than the sink keeps up, the oldest unflushed events are
+dropped and counted.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+GENESIS_HASH = "0" * 64
+MUTATING_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+def event_hash(event: dict) -> str:
+    """SHA-256 over the event's canonical JSON, which includes `prev_hash`."""
+    body = {key: value for key, value in event.items() if key != "hash"}
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _chain_error(event: dict, prev_seq: int, prev_hash: str) -> Optional[str]:
+    if event.get("seq") != prev_seq + 1:
+        return f"expected seq {prev_seq + 1}"
+    if event.get("prev_hash") != prev_hash:
+        return "prev_hash does not match"
+    if event.get("hash") != event_hash(event):
+        return "hash does not match contents"
+    return None
+
+
+def verify_chain(events: Iterable[dict], prev_seq: int = 0, prev_hash: str = GENESIS_HASH) -> dict:
+    """Recompute the chain over `events` in order; report the first break."""
+    checked = 0
+    for event in events:
+        error = _chain_error(event, prev_seq, prev_hash)
+        if error:
+            return {"ok": False, "checked": checked, "seq": event.get("seq"), "reason": error}
+        prev_seq, prev_hash = event["seq"], event["hash"]
+        checked += 1
+    return {"ok": True, "checked": checked, "seq": prev_seq, "head": prev_hash}
+
+
+async def verify_sink(sink: "AuditSink") -> dict:
+    """verify_chain over everything stored in `sink`, streamed."""
+    prev_seq, prev_hash, checked = 0, GENESIS_HASH, 0
+    async for event in sink.read():
+        error = _chain_error(event, prev_seq, prev_hash)
+        if error:
+            return {"ok": False, "checked": checked, "seq": event.get("seq"), "reason": error}
+        prev_seq, prev_hash = event["seq"], event["hash"]
+        checked += 1
+    return {"ok": True, "checked": checked, "seq": prev_seq, "head": prev_hash}
+
+
+class AuditSink:
+    """Append-only storage for chained audit events"""
+
+    async def open(self) -> Tuple[int, str]:
+        """Prepare for writing; return the last stored (seq, hash)."""
+        return 0, GENESIS_HASH
+
+    async def write(self, events: List[dict]):
+        raise NotImplementedError
+
+    def read(self, after_seq: int = 0) -> AsyncIterator[dict]:
+        """Yield stored events with seq > `after_seq`, in order."""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class FileSink(AuditSink):
+    """
+    JSON lines in `directory`, one file per `max_bytes`, named by the first
+    sequence number in the file. Each batch is fsynced before it counts as
+    flushed, and a torn last line left by a crash is dropped on open.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._file = None
+
+    def _files(self) -> List[str]:
+        names = sorted(name for name in os.listdir(self.directory) if name.startswith("audit-"))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _open(self) -> Tuple[int, str]:
+        os.makedirs(self.directory, exist_ok=True)
+        files = self._files()
+        if not files:
+            return 0, GENESIS_HASH
+        with open(files[-1], "rb+") as file:
+            data = file.read()
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                print(f"Dropping torn audit record at the end of {files[-1]}")
+                file.truncate(end)
+        lines = data[:end].splitlines()
+        if not lines:
+            os.remove(files[-1])
+            return self._open()
+        last = json.loads(lines[-1])
+        return last["seq"], last["hash"]
+
+    async def open(self) -> Tuple[int, str]:
+        return await asyncio.to_thread(self._open)
+
+    def _write(self, events: List[dict]):
+        if self._file is None or self._file.tell() >= self.max_bytes:
+            if self._file is not None:
+                self._file.close()
+            path = os.path.join(self.directory, f"audit-{events[0]['seq']:012d}.jsonl")
+            self._file = open(path, "ab")
+        self._file.write(b"".join(
+            json.dumps(event, separators=(",", ":"), default=str).encode() + b"\n" for event in events
+        ))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def write(self, events: List[dict]):
+        await asyncio.to_thread(self._write, events)
+
+    async def read(self, after_seq: int = 0) -> AsyncIterator[dict]:
+        files = self._files()
+        firsts = [int(os.path.basename(path)[6:-6]) for path in files]
+        # Start at the last file beginning at or before the first wanted event
+        start = max([i for i, first in enumerate(firsts) if first <= after_seq + 1] or [0])
+        for path in files[start:]:
+            with open(path, "rb") as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break  # Being written
+                    event = json.loads(line)
+                    if event["seq"] > after_seq:
+                        yield event
+            await asyncio.sleep(0)
+
+    async def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class FirestoreSink(AuditSink):
+    """
+    One document per event in `collection`, written with create(), so an
+    existing event is never overwritten. A head document tracks the chain's
+    last (seq, hash) and is updated in the same batch as the events.
+
+    Each running instance of a service keeps its own chain, named by service
+    and `instance`, since instances cannot share one sequence without a
+    transaction per batch. `instance` defaults to AUDIT_INSTANCE_ID, or else
+    a random ID, which starts a new chain each time the process starts. Set
+    AUDIT_INSTANCE_ID to continue a chain across restarts, but never give
+    two running instances the same ID.
+    """
+
+    def __init__(self, collection: str, service: str, instance: Optional[str] = None, db=None):
+        if db is None:
+            from google.cloud import firestore
+
+            db = firestore.AsyncClient()
+        self.collection = collection
+        self.service = service
+        self.instance = instance or os.getenv("AUDIT_INSTANCE_ID") or uuid.uuid4().hex[:12]
+        self.chain = f"{service}-{self.instance}"
+        self.db = db
+        self._heads = self.db.collection(f"{collection}_heads")
+        self._head = self._heads.document(self.chain)
+        self._written_seq = 0
+
+    async def open(self) -> Tuple[int, str]:
+        doc = await self._head.get()
+        if not doc.exists:
+            return 0, GENESIS_HASH
+        head = doc.to_dict()
+        self._written_seq = head["seq"]
+        return head["seq"], head["hash"]
+
+    async def write(self, events: List[dict]):
+        # A retried batch may be partly committed already
+        events = [event for event in events if event["seq"] > self._written_seq]
+        # Firestore batches hold 500 writes; one is the head
+        for i in range(0, len(events), 499):
+            chunk = events[i:i + 499]
+            batch = self.db.batch()
+            for event in chunk:
+                batch.create(
+                    self.db.collection(self.collection).document(f"{self.chain}-{event['seq']:012d}"),
+                    {**event, "chain": self.chain},
+                )
+            batch.set(self._head, {
+                "service": self.service,
+                "instance": self.instance,
+                "seq": chunk[-1]["seq"],
+                "hash": chunk[-1]["hash"],
+            })
+            await batch.commit()
+            self._written_seq = chunk[-1]["seq"]
+
+    async def read(self, after_seq: int = 0) -> AsyncIterator[dict]:
+        query = (
+            self.db.collection(self.collection)
+            .where("chain", "==", self.chain)
+            .where("seq", ">", after_seq)
+            .order_by("seq")
+        )
+        async for doc in query.stream():
+            event = doc.to_dict()
+            del event["chain"]  # Added on write; not part of the hashed event
+            yield event
+
+    async def instances(self) -> List[str]:
+        """IDs of every instance of this service with a stored chain."""
+        query = self._heads.where("service", "==", self.service).select(["instance"])
+        return sorted([doc.get("instance") async for doc in query.stream()])
+
+    def for_instance(self, instance: str) -> "FirestoreSink":
+        """A sink over another instance's chain, for reading and verifying it."""
+        return FirestoreSink(self.collection, self.service, instance, db=self.db)
+
+
+class AuditLog:
+    """Ring buffer of audit events and the task that flushes it to a sink."""
+
+    def __init__(
+        self,
+        sink: AuditSink,
+        service: str,
+        capacity: int = 65536,
+        batch_size: int = 500,
+        flush_interval: float = 0.2,
+    ):
+        self.sink = sink
+        self.service = service
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Sync endpoints record from threadpool threads, so appends and
+        # counter updates share a lock
+        self._lock = threading.Lock()
+        self._buffer = deque(maxlen=capacity)
+        self._seq = 0
+        self._head = GENESIS_HASH
+        self._pending: List[dict] = []  # Chained but not yet written
+        self._task = None
+        self.counters = dict.fromkeys(("recorded", "dropped", "flushed", "batches", "sink_errors"), 0)
+
+    @classmethod
+    def from_env(cls, service: str) -> "AuditLog":
+        """
+        An audit log configured from AUDIT_* environment variables:
+        AUDIT_SINK ("file" or "firestore"), AUDIT_DIR, AUDIT_MAX_FILE_BYTES,
+        AUDIT_COLLECTION (default `{ENVIR}_audit_events`), AUDIT_INSTANCE_ID,
+        AUDIT_BUFFER_SIZE, AUDIT_BATCH_SIZE and AUDIT_FLUSH_INTERVAL.
+        """
+        if os.getenv("AUDIT_SINK", "file") == "firestore":
+            collection = os.getenv("AUDIT_COLLECTION", f"{os.getenv('ENVIR', 'dev')}_audit_events")
+            sink = FirestoreSink(collection, service)
+        else:
+            sink = FileSink(
+                os.getenv("AUDIT_DIR", "audit_log"),
+                int(os.getenv("AUDIT_MAX_FILE_BYTES", str(64 * 2 ** 20))),
+            )
+        return cls(
+            sink,
+            service=service,
+            capacity=int(os.getenv("AUDIT_BUFFER_SIZE", "65536")),
+            batch_size=int(os.getenv("AUDIT_BATCH_SIZE", "500")),
+            flush_interval=float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.2")),
+        )
+
+    def record(
+        self,
+        action: str,
+        actor: Optional[str] = None,
+        resource: Optional[str] = None,
+        outcome: str = "success",
+        **details,
+    ):
+        """Queue an audit event; never blocks or raises on the caller's path."""
+        event = (time.time(), action, actor, resource, outcome, details)
+        with self._lock:
+            if len(self._buffer) == self.capacity:
+                self.counters["dropped"] += 1
+            self._buffer.append(event)
+            self.counters["recorded"] += 1
+
+    async def start(self):
+        self._seq, self._head = await self.sink.open()
+        self._task = asyncio.create_task(self._run(), name="audit-flusher")
+
+    async def _run(self):
+        while True:
+            if not await self.flush():
+                await asyncio.sleep(self.flush_interval)
+
+    def _chain(self) -> List[dict]:
+        with self._lock:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+        events = []
+        for timestamp, action, actor, resource, outcome, details in batch:
+            self._seq += 1
+            event = {
+                "seq": self._seq,
+                "ts": timestamp,
+                "service": self.service,
+                "action": action,
+                "actor": actor,
+                "resource": resource,
+                "outcome": outcome,
+                "details": details,
+                "prev_hash": self._head,
+            }
+            event["hash"] = self._head = event_hash(event)
+            events.append(event)
+        return events
+
+    async def flush(self) -> bool:
+        """Write one batch; return True if a full batch went out."""
+        if not self._pending:
+            self._pending = self._chain()
+        if not self._pending:
+            return False
+        try:
+            await self.sink.write(self._pending)
+        except Exception as exc:
+            # Keep the batch and retry it as is, so the stored chain has no gaps
+            print(f"Error writing audit batch: {exc}")
+            with self._lock:
+                self.counters["sink_errors"] += 1
+            return False
+        full = len(self._pending) == self.batch_size
+        with self._lock:
+            self.counters["flushed"] += len(self._pending)
+            self.counters["batches"] += 1
+        self._pending = []
+        return full
+
+    async def stop(self):
+        """Stop the flusher and write out everything still buffered."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        while self._buffer or self._pending:
+            if not await self.flush() and self._pending:
+                break  # Sink is failing; give up rather than hang shutdown
+        await self.sink.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {"buffered": len(self._buffer), "pending": len(self._pending), "seq": self._seq, **counters}
+
+
+class AuditMiddleware:
+    """
+    ASGI middleware recording one audit event per request: method, path,
+    status, duration, client address, and the acting user and calling service
+    as verified by the app's authentication (`request.state.<actor_key>` and
+    `request.state.service`). Only `methods` are recorded (writes by
+    default), and paths starting with any of `exclude_prefixes` are skipped.
+    """
+
+    def __init__(
+        self,
+        app,
+        audit_log: AuditLog,
+        methods: Iterable[str] = MUTATING_METHODS,
+        exclude_prefixes: Iterable[str] = ("/static", "/docs", "/openapi.json"),
+        actor_key: str = "actor",
+    ):
+        self.app = app
+        self.audit_log = audit_log
+        self.methods = frozenset(methods)
+        self.exclude_prefixes = tuple(exclude_prefixes)
+        self.actor_key = actor_key
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in self.methods
+            or scope["path"].startswith(self.exclude_prefixes)
+        ):
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+        # Shared with request.state, which the app fills in once it has
+        # authenticated the caller
+        state = scope.setdefault("state", {})
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            actor = state.get(self.actor_key)
+            client = scope.get("client")
+            self.audit_log.record(
+                f"http.{scope['method'].lower()}",
+                actor=str(actor) if actor is not None else None,
+                resource=scope["path"],
+                outcome="success" if status < 400 else "denied" if status in (401, 403) else "failure",
+                status=status,
+                duration_ms=round((time.perf_counter() - started) * 1000, 3),
+                client=client[0] if client else None,
+                service=state.get("service"),
+            )
+
+
+def install_audit(app, audit_log: AuditLog, **options):
+    """Add the audit middleware to a FastAPI app and run the flusher with it."""
+    app.add_middleware(AuditMiddleware, audit_log=audit_log, **options)
+    app.state.audit_log = audit_log
+    app.add_event_handler("startup", audit_log.start)
+    app.add_event_handler("shutdown", audit_log.stop)
@@ -0,0 +1,252 @@
+"""
+Token-bucket rate limiting middleware
+
+Buckets can be kept per API key, per client IP and per client on a given
+route prefix. Each bucket holds `burst` tokens and refills at `rate` tokens
+per second. A request is allowed only when every bucket that applies to it
+has a token, and only then takes one from each; a rejected request spends
+nothing, so a client blocked on one route keeps its general allowance.
+
+State is O(1) per active key. `MemoryBackend` suits a single instance and
+evicts idle keys; `RedisBackend` shares the buckets across a cluster through
+one atomic script call per request.
+
+Add the middleware before CORS (`add_middleware` wraps the app, so the
+middleware added last runs first) so 429 responses still carry CORS headers.
+"""
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+SCOPES = ("api_key", "ip", "route")
+
+
+@dataclass
+class RateLimit:
+    """A token bucket applied to every request in `scope`."""
+
+    scope: str  # "api_key", "ip" or "route"
+    rate: float  # tokens refilled per second
+    burst: int  # bucket capacity
+    path_prefix: Optional[str] = None  # required for "route" limits
+
+    def __post_init__(self):
+        if self.scope not in SCOPES:
+            raise ValueError(f"Unknown rate limit scope {self.scope!r}")
+        if self.scope == "route" and not self.path_prefix:
+            raise ValueError("Route rate limits need a path_prefix")
+        if self.rate <= 0 or self.burst < 1:
+            raise ValueError("Rate limits need a positive rate and a burst of at least 1")
+
+
+class MemoryBackend:
+    """
+    In-process buckets in an LRU ordered by last use.
+
+    Keys untouched for `idle_ttl` seconds are evicted as new requests arrive,
+    and `max_keys` caps memory under a flood of distinct clients.
+    """
+
+    def __init__(self, idle_ttl: float = 600, max_keys: int = 100_000):
+        self.idle_ttl = idle_ttl
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [tokens, last_refill]
+
+    async def acquire(self, buckets: list):
+        """Take a token from every (key, rate, burst) bucket, or from none.
+
+        Returns whether the request is allowed and the tokens left in each
+        bucket, in order.
+        """
+        now = time.monotonic()
+        levels = []
+        for key, rate, burst in buckets:
+            bucket = self._buckets.get(key)
+            levels.append(burst if bucket is None else min(burst, bucket[0] + (now - bucket[1]) * rate))
+
+        allowed = all(tokens >= 1 for tokens in levels)
+        if allowed:
+            levels = [tokens - 1 for tokens in levels]
+        for (key, _, _), tokens in zip(buckets, levels):
+            self._buckets.pop(key, None)
+            self._buckets[key] = [tokens, now]
+        self._evict(now)
+        return allowed, levels
+
+    def _evict(self, now: float):
+        while self._buckets:
+            key, (_, last) = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.max_keys and now - last < self.idle_ttl:
+                break
+            del self._buckets[key]
+
+
+# Refill every bucket, then take a token from each only if all have one,
+# atomically on the server. Redis TIME is used so all instances agree on the
+# clock, and each key expires once it would be full again, which is the
+# Redis-side idle eviction. ARGV holds a rate and burst per key.
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local allowed = 1
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    if tokens < 1 then
+        allowed = 0
+    end
+    levels[i] = tokens
+end
+local result = {allowed}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    local tokens = levels[i] - allowed
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000) + 1000)
+    result[i + 1] = tostring(tokens)
+end
+return result
+"""
+
+
+class RedisBackend:
+    """
+    Buckets shared through any Redis-compatible server.
+
+    `client` is a `redis.asyncio.Redis` (or compatible stand-in such as
+    fakeredis for local testing).
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(self, buckets: list):
+        """Take a token from every (key, rate, burst) bucket, or from none."""
+        keys = [self.prefix + key for key, _, _ in buckets]
+        args = [value for _, rate, burst in buckets for value in (rate, burst)]
+        allowed, *levels = await self._script(keys=keys, args=args)
+        return bool(int(allowed)), [float(tokens) for tokens in levels]
+
+
+def create_backend(redis_url: Optional[str] = None):
+    """Use Redis when a URL is configured, otherwise in-process buckets."""
+    if not redis_url:
+        return MemoryBackend()
+    import redis.asyncio as redis
+
+    return RedisBackend(redis.from_url(redis_url))
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware enforcing `limits` and adding `RateLimit-*` headers.
+
+    The headers describe the most constrained bucket for the request.
+    Rejected requests get a 429 with `Retry-After`.
+
+    `trust_forwarded` is the number of proxies in front of the service whose
+    `X-Forwarded-For` entries are trusted (`True` counts as one, e.g. the
+    API gateway). The client is the address that many hops from the right of
+    the chain, so entries a client prepends are never used.
+
+    The `X-API-Key` header is not verified here, so API key buckets are only
+    ever applied on top of the IP bucket, and route buckets are per IP.
+    """
+
+    def __init__(
+        self,
+        app,
+        limits: list,
+        backend=None,
+        api_key_header: str = "x-api-key",
+        trust_forwarded: int = 0,
+        exempt_paths: tuple = ("/static",),
+    ):
+        self.app = app
+        self.limits = limits
+        self.backend = backend or MemoryBackend()
+        self.api_key_header = api_key_header
+        self.trusted_proxies = int(trust_forwarded)
+        self.exempt_paths = exempt_paths
+
+    def _client_ip(self, scope, headers: Headers) -> str:
+        client = scope.get("client")
+        chain = [client[0]] if client else []
+        if self.trusted_proxies:
+            forwarded = headers.getlist("x-forwarded-for")
+            chain = [ip.strip() for value in forwarded for ip in value.split(",") if ip.strip()] + chain
+            return chain[max(len(chain) - 1 - self.trusted_proxies, 0)] if chain else "unknown"
+        return chain[0] if chain else "unknown"
+
+    def _key(self, limit: RateLimit, path: str, ip: str, api_key: Optional[str]):
+        if limit.scope == "api_key":
+            return f"key:{api_key}" if api_key else None
+        if limit.scope == "ip":
+            return f"ip:{ip}"
+        if limit.scope == "route" and path.startswith(limit.path_prefix):
+            # Per IP: an unverified key would give each made-up value a fresh bucket
+            return f"route:{limit.path_prefix}:{ip}"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        ip = self._client_ip(scope, headers)
+        api_key = headers.get(self.api_key_header)
+
+        applied = []  # (limit, key) for every bucket this request draws from
+        for limit in self.limits:
+            key = self._key(limit, scope["path"], ip, api_key)
+            if key is not None:
+                applied.append((limit, key))
+
+        if not applied:
+            await self.app(scope, receive, send)
+            return
+
+        allowed, levels = await self.backend.acquire(
+            [(key, limit.rate, limit.burst) for limit, key in applied]
+        )
+        # Report the bucket with the fewest requests left
+        limit, tokens = min(zip((limit for limit, _ in applied), levels), key=lambda item: item[1])
+        rate_headers = {
+            "RateLimit-Limit": str(limit.burst),
+            "RateLimit-Remaining": str(int(tokens)),
+            "RateLimit-Reset": str(math.ceil((limit.burst - tokens) / limit.rate)),
+        }
+
+        if not allowed:
+            rate_headers["Retry-After"] = str(max(1, math.ceil((1 - tokens) / limit.rate)))
+            response = JSONResponse(
+                {"detail": "Rate limit exceeded"}, status_code=429, headers=rate_headers
+            )
+            await response(scope, receive, send)
+            return
+
+        raw_headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in rate_headers.items()
+        ]
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + raw_headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,70 @@
+"""
+Service-to-service authentication
+
+Internal endpoints (dead-letter replay, audit writes, ...) are called by
+other services, not end users, and are protected with shared service
+tokens. Each caller sends its token as `Authorization: Bearer <token>`.
+
+Tokens are configured as `name:token` pairs, comma separated, usually from
+the SERVICE_AUTH_TOKENS environment variable:
+
+    SERVICE_AUTH_TOKENS="gateway:3f9c...,notifications:a71e..."
+
+Several tokens may be valid at once, which is how a token is rotated. With
+no tokens configured every request is rejected, so an unconfigured service
+fails closed.
+"""
+import hmac
+import os
+from typing import Dict, Optional
+
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+
+
+def parse_tokens(value: Optional[str]) -> Dict[str, str]:
+    """Map each token in a `name:token,...` string to its service name."""
+    tokens = {}
+    for entry in (value or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, token = entry.rpartition(":")
+        tokens[token] = name or "service"
+    return tokens
+
+
+class ServiceAuth:
+    """
+    FastAPI dependency admitting only requests with a configured token.
+
+    Returns the calling service's name and stores it on
+    `request.state.service`. Missing or unknown tokens get a 401.
+    """
+
+    def __init__(self, tokens: Dict[str, str]):
+        self.tokens = tokens
+
+    @classmethod
+    def from_env(cls, variable: str = "SERVICE_AUTH_TOKENS") -> "ServiceAuth":
+        return cls(parse_tokens(os.getenv(variable)))
+
+    def authenticate(self, token: str) -> Optional[str]:
+        # Compare against every token so timing does not reveal which matched
+        name = None
+        for candidate, service in self.tokens.items():
+            if hmac.compare_digest(candidate.encode(), token.encode()):
+                name = service
+        return name
+
+    async def __call__(self, request: Request) -> str:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        name = self.authenticate(token) if scheme.lower() == "bearer" and token else None
+        if name is None:
+            raise HTTPException(
+                status_code=401,
+                detail="Service authentication required",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        request.state.service = name
+        return name
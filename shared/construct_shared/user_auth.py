@@ -0,0 +1,114 @@
+"""
+End-user authentication
+
+Services other than the application layer accept the access tokens it
+issues (`POST /users/login`), so a user can call them directly through the
+gateway. Tokens are verified with the same keys the application layer signs
+with, from the environment:
+
+    JWT_JWKS      a JWK Set (JSON), when keys are rotated
+    SECRET_KEY    otherwise, the single HS256 key
+
+Endpoints that both users and other services call take a `Caller` from
+`UserAuth`, which also admits service tokens when given a ServiceAuth:
+
+    user_auth = UserAuth.from_env(services=ServiceAuth.from_env())
+
+    @app.get("/preferences/{user_id}")
+    async def get_preferences(user_id: str, caller: Caller = Depends(user_auth)):
+        caller.require(user_id)
+
+Needs python-jose (the `jwt` extra). With no keys configured every user
+token is rejected, so an unconfigured service fails closed.
+"""
+import json
+import os
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+
+from construct_shared.service_auth import ServiceAuth
+
+ALGORITHM = "HS256"
+
+
+class Caller(NamedTuple):
+    """An authenticated user, or another service acting on users' behalf."""
+
+    user_id: Optional[str] = None
+    service: Optional[str] = None
+
+    def may_act_for(self, user_id: str) -> bool:
+        return self.service is not None or self.user_id == str(user_id)
+
+    def require(self, user_id: str):
+        """Raise a 403 unless the caller is `user_id` or a service."""
+        if not self.may_act_for(user_id):
+            raise HTTPException(status_code=403, detail="Not allowed to act for this user")
+
+
+class UserAuth:
+    """
+    FastAPI dependency admitting callers with a valid user token.
+
+    Returns a Caller. The user's ID (the token's `sub`) is stored on
+    `request.state.actor` for the audit trail. With `services`, service
+    tokens are admitted as well and the Caller names the service. Missing,
+    invalid or expired tokens get a 401.
+    """
+
+    def __init__(self, keys: Dict[str, Tuple[object, str]], services: Optional[ServiceAuth] = None):
+        self.keys = keys
+        self.services = services
+
+    @classmethod
+    def from_env(cls, services: Optional[ServiceAuth] = None) -> "UserAuth":
+        from jose import jwk
+
+        keys = {}
+        jwks = os.getenv("JWT_JWKS")
+        secret = os.getenv("SECRET_KEY")
+        if jwks:
+            for data in json.loads(jwks)["keys"]:
+                if data.get("kty") == "oct" and not data.get("k"):
+                    continue  # An empty key would accept forged tokens
+                algorithm = data.get("alg", ALGORITHM)
+                keys[data.get("kid", "default")] = (jwk.construct(data, algorithm), algorithm)
+        elif secret:
+            keys[os.getenv("JWT_SIGNING_KID", "default")] = (jwk.construct(secret, ALGORITHM), ALGORITHM)
+        return cls(keys, services)
+
+    def verify(self, token: str) -> Optional[str]:
+        """Return the user ID a token was issued to, or None if it is not valid."""
+        from jose import jwt
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid", "default")
+            key = self.keys.get(kid)
+            if key is None:
+                return None
+            claims = jwt.decode(token, key[0], algorithms=[key[1]])
+        except jwt.JWTError:
+            return None
+        # Tokens without an expiry are not accepted
+        if claims.get("exp") is None or not claims.get("sub"):
+            return None
+        return str(claims["sub"])
+
+    async def __call__(self, request: Request) -> Caller:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            service = self.services.authenticate(token) if self.services else None
+            if service is not None:
+                request.state.service = service
+                return Caller(service=service)
+            user_id = self.verify(token)
+            if user_id is not None:
+                request.state.actor = user_id
+                return Caller(user_id=user_id)
+        raise HTTPException(
+            status_code=401,
+            detail="Authentication required",
+            headers={"WWW-Authenticate": "Bearer"},
+        )